@@ -3,6 +3,17 @@ Advanced context compaction strategies
 """
 
 from .analyzer import TokenAnalyzer
+from .groups import TurnGroup, build_turn_groups, repair_tool_sequence, validate_tool_sequence
+from .index import TokenIndex
 from .strategy import CompactionManager, CompactionStrategy
 
-__all__ = ["TokenAnalyzer", "CompactionManager", "CompactionStrategy"]
+__all__ = [
+    "TokenAnalyzer",
+    "TokenIndex",
+    "TurnGroup",
+    "build_turn_groups",
+    "validate_tool_sequence",
+    "repair_tool_sequence",
+    "CompactionManager",
+    "CompactionStrategy",
+]
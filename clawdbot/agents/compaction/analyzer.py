@@ -5,6 +5,8 @@ Token analysis for context management
 import logging
 from typing import Any
 
+from ..tokenizers import Tokenizer, get_tokenizer
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,26 +14,20 @@ class TokenAnalyzer:
     """
     Analyze token usage in messages
 
-    Provides accurate token counting for different models
+    Counts tokens with the model's tokenizer (see clawdbot.agents.tokenizers):
+    a configured local BPE table, else tiktoken, otherwise an estimate.
     """
 
-    # Approximate tokens per character for different models
-    TOKENS_PER_CHAR = {
-        "claude": 0.25,  # Claude models
-        "gpt": 0.25,  # GPT models
-        "gemini": 0.25,  # Gemini models
-        "default": 0.25,  # Default estimate
-    }
-
-    def __init__(self, model_name: str = "default"):
+    def __init__(self, model_name: str = "default", tokenizer: Tokenizer | None = None):
         """
         Initialize analyzer
 
         Args:
             model_name: Model name for token estimation
+            tokenizer: Tokenizer to use (default: get_tokenizer(model_name))
         """
         self.model_name = model_name
-        self._tokenizer = None
+        self.tokenizer = tokenizer or get_tokenizer(model_name)
 
     def estimate_tokens(self, text: str) -> int:
         """
@@ -43,51 +39,33 @@ class TokenAnalyzer:
         Returns:
             Estimated token count
         """
-        if not text:
-            return 0
-
-        # Try to use actual tokenizer if available
-        if self._tokenizer:
-            try:
-                return len(self._tokenizer.encode(text))
-            except Exception:
-                pass
-
-        # Fall back to character-based estimation
-        model_family = self._get_model_family()
-        tokens_per_char = self.TOKENS_PER_CHAR.get(model_family, self.TOKENS_PER_CHAR["default"])
-
-        return int(len(text) * tokens_per_char)
+        return self.tokenizer.count(text)
 
     def estimate_messages_tokens(self, messages: list[dict[str, Any]]) -> int:
         """
         Estimate token count for list of messages
 
         Args:
-            messages: List of message dicts
+            messages: Message dicts, or session Messages (whose counts are cached)
 
         Returns:
             Estimated total token count
         """
-        total = 0
-
-        for msg in messages:
-            # Count role tokens (2-4 tokens per message overhead)
-            total += 4
-
-            # Count content tokens
-            content = msg.get("content", "")
-            if isinstance(content, str):
-                total += self.estimate_tokens(content)
-            elif isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict):
-                        if "text" in item:
-                            total += self.estimate_tokens(item["text"])
-                        elif "content" in item:
-                            total += self.estimate_tokens(str(item["content"]))
-
-        return total
+        return sum(self.message_tokens(msg) for msg in messages)
+
+    def message_tokens(self, message: Any) -> int:
+        """
+        Count tokens of one message
+
+        Args:
+            message: Message dict, or session Message (count cached on the message)
+
+        Returns:
+            Token count including per-message overhead
+        """
+        if isinstance(message, dict):
+            return self.tokenizer.count_message(message)
+        return message.count_tokens(self.tokenizer)
 
     def get_message_importance(self, message: dict[str, Any]) -> float:
         """
@@ -123,31 +101,3 @@ class TokenAnalyzer:
             score = 0.4
 
         return score
-
-    def _get_model_family(self) -> str:
-        """Determine model family from model name"""
-        model_lower = self.model_name.lower()
-
-        if "claude" in model_lower:
-            return "claude"
-        elif "gpt" in model_lower:
-            return "gpt"
-        elif "gemini" in model_lower:
-            return "gemini"
-        else:
-            return "default"
-
-    def _load_tokenizer(self):
-        """Load actual tokenizer if available"""
-        try:
-            model_family = self._get_model_family()
-
-            if model_family == "gpt":
-                import tiktoken
-
-                self._tokenizer = tiktoken.encoding_for_model("gpt-4")
-
-            # Add other tokenizers as needed
-
-        except Exception as e:
-            logger.debug(f"Could not load tokenizer: {e}")
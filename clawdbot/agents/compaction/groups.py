@@ -0,0 +1,259 @@
+"""
+Turn groups and tool-call sequence validation
+"""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Knapsack table size limit (groups x capacity cells); larger inputs use greedy selection
+KNAPSACK_MAX_CELLS = 1_000_000
+# Minimum and maximum number of capacity steps in the knapsack table
+KNAPSACK_MIN_RESOLUTION = 64
+KNAPSACK_MAX_RESOLUTION = 4096
+
+
+@dataclass
+class TurnGroup:
+    """
+    Messages that must be kept or dropped together
+
+    An assistant message with tool calls and all of its tool results form
+    one group; every other message is a group of its own.
+    """
+
+    start: int  # Rank of the first message (in the sequence grouped)
+    end: int  # Rank after the last message
+    tokens: int
+    value: float = 0.0
+    is_system: bool = False
+
+
+def message_field(message: Any, name: str) -> Any:
+    """Read a field of a message dict or session Message"""
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+def tool_call_ids(message: Any) -> list[str]:
+    """IDs of the tool calls made by an assistant message"""
+    calls = message_field(message, "tool_calls") or []
+    return [call.get("id") for call in calls if isinstance(call, dict)]
+
+
+def _is_tool(message: Any) -> bool:
+    """Whether a message is a tool result"""
+    return message_field(message, "role") == "tool"
+
+
+def build_turn_groups(
+    messages: list[Any],
+    positions: list[int],
+    counts: list[int],
+    importance: Callable[[Any], float] | None = None,
+) -> list[TurnGroup]:
+    """
+    Split a message sequence into turn groups
+
+    Args:
+        messages: Message dicts or session Messages
+        positions: Positions in messages forming the sequence (in order)
+        counts: Token count per position in messages
+        importance: Scores a message (0.0-1.0); a group is worth its best
+            member, weighted towards recent groups
+
+    Returns:
+        Groups in sequence order (start/end are ranks in positions)
+    """
+    groups: list[TurnGroup] = []
+    rank = 0
+    while rank < len(positions):
+        first = messages[positions[rank]]
+        end = rank + 1
+        if message_field(first, "role") == "assistant" and tool_call_ids(first):
+            while end < len(positions) and _is_tool(messages[positions[end]]):
+                end += 1
+
+        members = positions[rank:end]
+        groups.append(
+            TurnGroup(
+                start=rank,
+                end=end,
+                tokens=sum(counts[i] for i in members),
+                value=max(importance(messages[i]) for i in members) if importance else 1.0,
+                is_system=message_field(first, "role") == "system",
+            )
+        )
+        rank = end
+
+    # Recent groups are worth up to twice as much as the oldest
+    for i, group in enumerate(groups):
+        group.value *= 0.5 + 0.5 * (i + 1) / len(groups)
+    return groups
+
+
+def select_groups(groups: list[TurnGroup], budget: int) -> list[TurnGroup]:
+    """
+    Choose groups maximizing total value within a token budget (0/1 knapsack)
+
+    Token weights are rounded up to a coarse unit so the table stays small;
+    rounding up means a chosen set always fits. Space the rounding leaves
+    unused is then filled greedily by value per token. Inputs too large for
+    the table are selected greedily by value per token.
+
+    Args:
+        groups: Candidate groups
+        budget: Tokens available
+
+    Returns:
+        Chosen groups (in no particular order)
+    """
+    items = [g for g in groups if g.tokens <= budget]
+    if budget <= 0 or not items:
+        return [g for g in items if g.tokens == 0]
+
+    resolution = min(KNAPSACK_MAX_RESOLUTION, budget, KNAPSACK_MAX_CELLS // len(items))
+    if resolution < KNAPSACK_MIN_RESOLUTION and budget > resolution:
+        return _select_greedy(items, budget)
+
+    unit = -(-budget // resolution)
+    capacity = budget // unit
+    weights = [-(-g.tokens // unit) for g in items]
+
+    best = [0.0] * (capacity + 1)
+    taken: list[bytearray] = []
+    for item, weight in zip(items, weights, strict=True):
+        take = bytearray(capacity + 1)
+        value = item.value
+        for c in range(capacity, weight - 1, -1):
+            candidate = best[c - weight] + value
+            if candidate > best[c]:
+                best[c] = candidate
+                take[c] = 1
+        taken.append(take)
+
+    chosen = []
+    c = capacity
+    for i in range(len(items) - 1, -1, -1):
+        if taken[i][c]:
+            chosen.append(items[i])
+            c -= weights[i]
+
+    used = sum(g.tokens for g in chosen)
+    chosen_ids = {id(g) for g in chosen}
+    rest = [g for g in items if id(g) not in chosen_ids]
+    return chosen + _select_greedy(rest, budget - used)
+
+
+def _select_greedy(items: list[TurnGroup], budget: int) -> list[TurnGroup]:
+    """Take groups by value per token while they fit"""
+    chosen = []
+    for group in sorted(items, key=lambda g: g.value / max(g.tokens, 1), reverse=True):
+        if group.tokens <= budget:
+            chosen.append(group)
+            budget -= group.tokens
+    return chosen
+
+
+def check_tool_sequence(
+    messages: list[Any], positions: list[int] | None = None
+) -> tuple[list[int], list[str]]:
+    """
+    Check that tool calls and tool results pair up as providers require
+
+    Every assistant message with tool calls must be followed directly by a
+    result for each call, and every tool result must answer a call of the
+    assistant message before it. Offending messages are dropped: stray
+    results, and assistant messages with unanswered calls together with
+    their partial results.
+
+    Args:
+        messages: Message dicts or session Messages
+        positions: Subsequence of messages to check (default: all)
+
+    Returns:
+        (valid positions, problems found)
+    """
+    if positions is None:
+        positions = list(range(len(messages)))
+
+    valid: list[int] = []
+    problems: list[str] = []
+    rank = 0
+    while rank < len(positions):
+        position = positions[rank]
+        msg = messages[position]
+        role = message_field(msg, "role")
+
+        if role == "tool":
+            problems.append(f"message {position}: tool result without a matching tool call")
+            rank += 1
+            continue
+
+        call_ids = tool_call_ids(msg) if role == "assistant" else []
+        if not call_ids:
+            valid.append(position)
+            rank += 1
+            continue
+
+        pending = set(call_ids)
+        results = []
+        end = rank + 1
+        while end < len(positions) and _is_tool(messages[positions[end]]):
+            result_position = positions[end]
+            call_id = message_field(messages[result_position], "tool_call_id")
+            if call_id in pending:
+                pending.discard(call_id)
+                results.append(result_position)
+            else:
+                problems.append(
+                    f"message {result_position}: tool result {call_id!r} does not answer "
+                    f"message {position}"
+                )
+            end += 1
+
+        if pending:
+            problems.append(
+                f"message {position}: tool calls without results: {', '.join(sorted(pending))}"
+            )
+        else:
+            valid.append(position)
+            valid.extend(results)
+        rank = end
+
+    return valid, problems
+
+
+def validate_tool_sequence(messages: list[Any]) -> list[str]:
+    """
+    List tool-call pairing problems in a message sequence
+
+    Args:
+        messages: Message dicts or session Messages
+
+    Returns:
+        Problems found (empty if the sequence is valid)
+    """
+    return check_tool_sequence(messages)[1]
+
+
+def repair_tool_sequence(messages: list[Any]) -> list[Any]:
+    """
+    Drop messages that break tool-call pairing
+
+    Args:
+        messages: Message dicts or session Messages
+
+    Returns:
+        A provider-valid sequence (the same list if nothing was wrong)
+    """
+    valid, problems = check_tool_sequence(messages)
+    if not problems:
+        return messages
+    for problem in problems:
+        logger.warning(f"Dropping invalid tool message sequence: {problem}")
+    return [messages[i] for i in valid]
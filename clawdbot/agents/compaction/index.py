@@ -0,0 +1,107 @@
+"""
+Incremental token accounting for compaction
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class TokenIndex:
+    """
+    Per-message token counts with prefix sums, maintained incrementally
+
+    Appending a message is O(1), the total (and so the "do we need to
+    compact" check) is O(1), and the token count of any range or the
+    longest prefix/suffix of non-system messages fitting a budget is found
+    by binary search. System and non-system messages are indexed
+    separately because strategies keep system messages unconditionally.
+
+    Example:
+        index = TokenIndex()
+        for msg in messages:
+            index.append(tokenizer.count_message(msg), msg["role"] == "system")
+        if index.needs_compaction(budget):
+            keep_from = index.recent_others(budget - index.system_tokens)
+    """
+
+    def __init__(self):
+        self.counts: list[int] = []
+        self._prefix = [0]  # _prefix[i] = tokens of messages[:i]
+        self.system_positions: list[int] = []
+        self.system_tokens = 0
+        self.other_positions: list[int] = []
+        self._other_prefix = [0]  # same, over non-system messages only
+
+    def append(self, tokens: int, is_system: bool = False) -> None:
+        """
+        Add the next message
+
+        Args:
+            tokens: Token count of the message
+            is_system: Whether it is a system message
+        """
+        position = len(self.counts)
+        self.counts.append(tokens)
+        self._prefix.append(self._prefix[-1] + tokens)
+        if is_system:
+            self.system_positions.append(position)
+            self.system_tokens += tokens
+        else:
+            self.other_positions.append(position)
+            self._other_prefix.append(self._other_prefix[-1] + tokens)
+
+    def __len__(self) -> int:
+        """Number of indexed messages"""
+        return len(self.counts)
+
+    @property
+    def total(self) -> int:
+        """Token count of all messages"""
+        return self._prefix[-1]
+
+    @property
+    def other_tokens(self) -> int:
+        """Token count of non-system messages"""
+        return self._other_prefix[-1]
+
+    def tokens_between(self, start: int, end: int) -> int:
+        """Token count of messages[start:end]"""
+        return self._prefix[end] - self._prefix[start]
+
+    def needs_compaction(self, target_tokens: int) -> bool:
+        """Whether the messages exceed a token budget"""
+        return self._prefix[-1] > target_tokens
+
+    def leading_others(self, budget: int, start: int = 0) -> int:
+        """
+        Count non-system messages that fit a budget, taken from the start
+
+        Args:
+            budget: Tokens available
+            start: Skip this many non-system messages first
+
+        Returns:
+            Number of non-system messages (from ``start``) whose total fits
+        """
+        prefix = self._other_prefix
+        end = bisect_right(prefix, prefix[start] + budget) - 1
+        return max(0, end - start)
+
+    def leading_others_tokens(self, count: int) -> int:
+        """Token count of the first ``count`` non-system messages"""
+        return self._other_prefix[count]
+
+    def recent_others(self, budget: int, stop: int = 0) -> int:
+        """
+        Find how far back the non-system messages fitting a budget reach
+
+        Args:
+            budget: Tokens available
+            stop: Do not go before this non-system message
+
+        Returns:
+            Rank of the first non-system message kept; messages from there
+            to the end fit the budget (equals the count when none fit)
+        """
+        prefix = self._other_prefix
+        start = bisect_left(prefix, prefix[-1] - budget, lo=stop)
+        return min(start, len(prefix) - 1)
@@ -7,6 +7,8 @@ from enum import Enum
 from typing import Any
 
 from .analyzer import TokenAnalyzer
+from .groups import build_turn_groups, check_tool_sequence, select_groups
+from .index import TokenIndex
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +19,7 @@ class CompactionStrategy(str, Enum):
     KEEP_RECENT = "recent"  # Keep last N messages
     KEEP_IMPORTANT = "important"  # Keep system + high importance
     SLIDING_WINDOW = "sliding"  # Keep first + last messages
-    SUMMARIZE = "summarize"  # Summarize old messages (future)
+    SUMMARIZE = "summarize"  # Summarize old messages (see BackgroundSummarizer)
 
 
 class CompactionManager:
@@ -45,8 +47,27 @@ class CompactionManager:
         self.analyzer = analyzer
         self.strategy = strategy
 
+    def build_index(self, messages: list[Any]) -> TokenIndex:
+        """
+        Index token counts of a message list
+
+        Args:
+            messages: Message dicts or session Messages (whose counts are cached)
+
+        Returns:
+            TokenIndex aligned with messages
+        """
+        index = TokenIndex()
+        for msg in messages:
+            index.append(self.analyzer.message_tokens(msg), _role(msg) == "system")
+        return index
+
     def compact(
-        self, messages: list[dict[str, Any]], target_tokens: int, preserve_system: bool = True
+        self,
+        messages: list[dict[str, Any]],
+        target_tokens: int,
+        preserve_system: bool = True,
+        index: TokenIndex | None = None,
     ) -> list[dict[str, Any]]:
         """
         Compact messages to fit token budget
@@ -55,141 +76,147 @@ class CompactionManager:
             messages: List of messages
             target_tokens: Target token count
             preserve_system: Always keep system messages
+            index: Token index of messages, if already maintained by the caller
 
         Returns:
             Compacted message list
         """
-        current_tokens = self.analyzer.estimate_messages_tokens(messages)
+        if index is None:
+            index = self.build_index(messages)
 
-        if current_tokens <= target_tokens:
-            logger.debug(f"No compaction needed: {current_tokens}/{target_tokens} tokens")
+        if not index.needs_compaction(target_tokens):
+            logger.debug(f"No compaction needed: {index.total}/{target_tokens} tokens")
             return messages
 
-        logger.info(
-            f"Compacting from {current_tokens} to {target_tokens} tokens using {self.strategy.value}"
-        )
+        return [messages[i] for i in self.select(index, messages, target_tokens, preserve_system)]
+
+    def select(
+        self,
+        index: TokenIndex,
+        messages: list[Any],
+        target_tokens: int,
+        preserve_system: bool = True,
+    ) -> list[int]:
+        """
+        Choose which messages to keep
 
-        if self.strategy == CompactionStrategy.KEEP_RECENT:
-            return self._compact_keep_recent(messages, target_tokens, preserve_system)
+        Selection works on the index's counts and prefix sums and never
+        re-counts message content. An assistant message with tool calls is
+        kept or dropped together with its tool results, so the result never
+        holds a tool call without its result or a result without its call.
 
-        elif self.strategy == CompactionStrategy.KEEP_IMPORTANT:
-            return self._compact_keep_important(messages, target_tokens, preserve_system)
+        Args:
+            index: Token index aligned with messages
+            messages: Message dicts or session Messages
+            target_tokens: Target token count
+            preserve_system: Always keep system messages
 
-        elif self.strategy == CompactionStrategy.SLIDING_WINDOW:
-            return self._compact_sliding_window(messages, target_tokens, preserve_system)
+        Returns:
+            Positions of kept messages, in output order
+        """
+        logger.info(
+            f"Compacting from {index.total} to {target_tokens} tokens using {self.strategy.value}"
+        )
 
+        if self.strategy == CompactionStrategy.KEEP_IMPORTANT:
+            kept = self._compact_keep_important(index, messages, target_tokens, preserve_system)
+        elif self.strategy == CompactionStrategy.SLIDING_WINDOW:
+            kept = self._compact_sliding_window(index, messages, target_tokens, preserve_system)
         else:
-            # Default to keep recent
-            return self._compact_keep_recent(messages, target_tokens, preserve_system)
+            # KEEP_RECENT, and SUMMARIZE before a summary is ready (see BackgroundSummarizer)
+            kept = self._compact_keep_recent(index, messages, target_tokens, preserve_system)
+
+        # Catches pairing broken before compaction, e.g. an interrupted tool call
+        kept, problems = check_tool_sequence(messages, kept)
+        for problem in problems:
+            logger.warning(f"Dropping invalid tool message sequence: {problem}")
+
+        kept_tokens = sum(index.counts[i] for i in kept)
+        logger.debug(f"Kept {len(kept)}/{len(index)} messages ({kept_tokens} tokens)")
+        return kept
 
     def _compact_keep_recent(
-        self, messages: list[dict[str, Any]], target_tokens: int, preserve_system: bool
-    ) -> list[dict[str, Any]]:
-        """Keep most recent messages that fit"""
-        # Separate system messages
-        system_msgs = [m for m in messages if m.get("role") == "system"]
-        other_msgs = [m for m in messages if m.get("role") != "system"]
-
-        # Start with system messages if preserving
-        result = system_msgs.copy() if preserve_system else []
-        current_tokens = self.analyzer.estimate_messages_tokens(result)
-
-        # Add messages from end until we hit token limit
-        for msg in reversed(other_msgs):
-            msg_tokens = self.analyzer.estimate_messages_tokens([msg])
-            if current_tokens + msg_tokens <= target_tokens:
-                result.insert(len(system_msgs) if preserve_system else 0, msg)
-                current_tokens += msg_tokens
-            else:
-                break
-
-        logger.debug(f"Kept {len(result)}/{len(messages)} messages ({current_tokens} tokens)")
-        return result
+        self, index: TokenIndex, messages: list[Any], target_tokens: int, preserve_system: bool
+    ) -> list[int]:
+        """Keep the longest run of recent messages that fits, after system messages"""
+        system = index.system_positions if preserve_system else []
+        budget = target_tokens - (index.system_tokens if preserve_system else 0)
+
+        start = _group_start_after(index, messages, index.recent_others(budget))
+        return system + index.other_positions[start:]
 
     def _compact_keep_important(
-        self, messages: list[dict[str, Any]], target_tokens: int, preserve_system: bool
-    ) -> list[dict[str, Any]]:
-        """Keep important messages based on score"""
-        # Calculate importance for each message
-        scored = [
-            (
-                msg,
-                self.analyzer.get_message_importance(msg),
-                self.analyzer.estimate_messages_tokens([msg]),
-            )
-            for msg in messages
-        ]
+        self, index: TokenIndex, messages: list[Any], target_tokens: int, preserve_system: bool
+    ) -> list[int]:
+        """Keep the most valuable turn groups that fit (0/1 knapsack)"""
+        kept = []
+        budget = target_tokens
 
         # Always include system messages if preserving
-        result = []
-        current_tokens = 0
-
         if preserve_system:
-            system_msgs = [(m, s, t) for m, s, t in scored if m.get("role") == "system"]
-            result.extend([m for m, _, _ in system_msgs])
-            current_tokens = sum(t for _, _, t in system_msgs)
-
-        # Sort remaining by importance (descending)
-        non_system = [(m, s, t) for m, s, t in scored if m.get("role") != "system"]
-        non_system.sort(key=lambda x: x[1], reverse=True)
-
-        # Add messages by importance until token limit
-        for msg, importance, tokens in non_system:
-            if current_tokens + tokens <= target_tokens:
-                result.append(msg)
-                current_tokens += tokens
+            kept.extend(index.system_positions)
+            budget -= index.system_tokens
+
+        others = index.other_positions
+        groups = build_turn_groups(
+            messages,
+            others,
+            index.counts,
+            lambda msg: self.analyzer.get_message_importance(_as_dict(msg)),
+        )
+        for group in select_groups(groups, budget):
+            kept.extend(others[group.start : group.end])
 
         # Restore original order
-        result_set = set(id(m) for m in result)
-        result = [m for m in messages if id(m) in result_set]
-
-        logger.debug(
-            f"Kept {len(result)}/{len(messages)} important messages ({current_tokens} tokens)"
-        )
-        return result
+        kept.sort()
+        return kept
 
     def _compact_sliding_window(
-        self, messages: list[dict[str, Any]], target_tokens: int, preserve_system: bool
-    ) -> list[dict[str, Any]]:
-        """Keep first N and last M messages"""
-        # Separate system messages
-        system_msgs = [m for m in messages if m.get("role") == "system"]
-        other_msgs = [m for m in messages if m.get("role") != "system"]
-
-        if not other_msgs:
-            return system_msgs
-
-        result = system_msgs.copy() if preserve_system else []
-        current_tokens = self.analyzer.estimate_messages_tokens(result)
-        target_tokens - current_tokens
-
-        # Calculate how many messages we can fit
-        # Try to balance between first and last
-        first_count = 0
-        last_count = 0
-
-        # Add messages from start
-        for msg in other_msgs:
-            msg_tokens = self.analyzer.estimate_messages_tokens([msg])
-            if current_tokens + msg_tokens <= target_tokens:
-                result.append(msg)
-                current_tokens += msg_tokens
-                first_count += 1
-            else:
-                break
-
-        # Add messages from end
-        for msg in reversed(other_msgs[first_count:]):
-            msg_tokens = self.analyzer.estimate_messages_tokens([msg])
-            if current_tokens + msg_tokens <= target_tokens:
-                result.append(msg)
-                current_tokens += msg_tokens
-                last_count += 1
-            else:
-                break
-
-        logger.debug(
-            f"Kept {len(result)}/{len(messages)} messages "
-            f"(first {first_count}, last {last_count}, {current_tokens} tokens)"
+        self, index: TokenIndex, messages: list[Any], target_tokens: int, preserve_system: bool
+    ) -> list[int]:
+        """Keep the first and last messages that fit"""
+        if not index.other_positions:
+            return list(index.system_positions)
+
+        system = index.system_positions if preserve_system else []
+        budget = target_tokens - (index.system_tokens if preserve_system else 0)
+
+        # Messages from the start, then from the end with what is left
+        first_count = _group_start_before(index, messages, index.leading_others(budget))
+        budget -= index.leading_others_tokens(first_count)
+        last_start = _group_start_after(
+            index, messages, index.recent_others(budget, stop=first_count)
         )
-        return result
+
+        others = index.other_positions
+        return system + others[:first_count] + others[last_start:]
+
+
+def _group_start_after(index: TokenIndex, messages: list[Any], rank: int) -> int:
+    """Move a non-system rank forward past tool results to the next turn group"""
+    others = index.other_positions
+    while rank < len(others) and _role(messages[others[rank]]) == "tool":
+        rank += 1
+    return rank
+
+
+def _group_start_before(index: TokenIndex, messages: list[Any], rank: int) -> int:
+    """Move a non-system rank back to the start of the turn group it splits"""
+    others = index.other_positions
+    while 0 < rank < len(others) and _role(messages[others[rank]]) == "tool":
+        rank -= 1
+    return rank
+
+
+def _role(message: Any) -> str | None:
+    """Role of a message dict or session Message"""
+    if isinstance(message, dict):
+        return message.get("role")
+    return message.role
+
+
+def _as_dict(message: Any) -> dict[str, Any]:
+    """API-format dict of a message dict or session Message"""
+    if isinstance(message, dict):
+        return message
+    return message.to_api_format()
@@ -5,6 +5,8 @@ Context management for agent conversations
 import logging
 from dataclasses import dataclass
 
+from .tokenizers import get_tokenizer
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +46,7 @@ class ContextManager:
         self.model = model
         self.max_tokens = max_tokens or self._get_model_limit(model)
         self.buffer_tokens = max(4000, int(self.max_tokens * 0.1))  # 10% buffer
+        self.tokenizer = get_tokenizer(model)
 
     def _get_model_limit(self, model: str) -> int:
         """Get context window limit for model"""
@@ -58,30 +61,12 @@ class ContextManager:
         return 128000
 
     def estimate_tokens(self, text: str) -> int:
-        """
-        Estimate token count for text
-
-        Simple estimation: ~4 chars per token for English
-        This is a rough approximation
-        """
-        return len(text) // 4
+        """Count tokens in text with the model's tokenizer"""
+        return self.tokenizer.count(text)
 
     def estimate_messages_tokens(self, messages: list[dict]) -> int:
-        """Estimate total tokens for message list"""
-        total = 0
-        for msg in messages:
-            # Count content tokens
-            if isinstance(msg.get("content"), str):
-                total += self.estimate_tokens(msg["content"])
-            elif isinstance(msg.get("content"), list):
-                for item in msg["content"]:
-                    if isinstance(item, dict) and "text" in item:
-                        total += self.estimate_tokens(item["text"])
-
-            # Add overhead for message structure (~50 tokens per message)
-            total += 50
-
-        return total
+        """Count tokens for a message list, including per-message overhead"""
+        return self.tokenizer.count_messages(messages)
 
     def check_context(self, current_tokens: int) -> ContextWindow:
         """
@@ -0,0 +1,21 @@
+"""
+Session persistence backends
+"""
+
+from .blobs import BlobStore
+from .cache import SessionCache
+from .journal import SessionJournal
+from .sqlite_store import SQLiteSessionStore
+from .store import FileSessionStore, SessionStore, SessionSummary
+from .writer import WriteBehindFlusher
+
+__all__ = [
+    "SessionJournal",
+    "SessionCache",
+    "SessionStore",
+    "SessionSummary",
+    "FileSessionStore",
+    "SQLiteSessionStore",
+    "WriteBehindFlusher",
+    "BlobStore",
+]
@@ -0,0 +1,119 @@
+"""
+Content-addressed storage for large tool outputs
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_HANDLE_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    """
+    Store text blobs by SHA-256 of their content
+
+    Blobs live under ``root/<first 2 hex digits>/<hash>``. Storing the same
+    content twice writes it once, and writes are atomic (temp file +
+    rename), so a handle always refers to complete content.
+
+    Example:
+        store = BlobStore.for_workspace(workspace_dir)
+        handle = store.put(html)
+        page = store.read(handle, offset=0, limit=8000)
+    """
+
+    def __init__(self, root: Path):
+        """
+        Initialize blob store
+
+        Args:
+            root: Directory holding the blobs (created on first write)
+        """
+        self.root = Path(root)
+
+    @classmethod
+    def for_workspace(cls, workspace_dir: Path) -> "BlobStore":
+        """Blob store of a workspace (``workspace_dir/.blobs``)"""
+        return cls(Path(workspace_dir) / ".blobs")
+
+    @staticmethod
+    def is_handle(handle: str) -> bool:
+        """Check that a handle is a well-formed content hash"""
+        return bool(_HANDLE_RE.match(handle or ""))
+
+    def put(self, content: str) -> str:
+        """
+        Store content
+
+        Args:
+            content: Text to store
+
+        Returns:
+            Handle (hex SHA-256 of the UTF-8 content)
+        """
+        data = content.encode("utf-8")
+        handle = hashlib.sha256(data).hexdigest()
+        path = self._path(handle)
+        if path.exists():
+            return handle
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        logger.debug(f"Stored blob {handle} ({len(data)} bytes)")
+        return handle
+
+    def get(self, handle: str) -> str | None:
+        """
+        Load content
+
+        Args:
+            handle: Handle returned by put()
+
+        Returns:
+            The content, or None for an unknown or malformed handle
+        """
+        if not self.is_handle(handle):
+            return None
+        try:
+            return self._path(handle).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def read(self, handle: str, offset: int = 0, limit: int | None = None) -> str | None:
+        """
+        Load part of the content
+
+        Args:
+            handle: Handle returned by put()
+            offset: First character to return
+            limit: Maximum characters to return (None for the rest)
+
+        Returns:
+            The characters requested, or None for an unknown handle
+        """
+        content = self.get(handle)
+        if content is None:
+            return None
+        offset = max(0, offset)
+        return content[offset:] if limit is None else content[offset : offset + max(0, limit)]
+
+    def exists(self, handle: str) -> bool:
+        """Check whether a blob is stored"""
+        return self.is_handle(handle) and self._path(handle).exists()
+
+    def _path(self, handle: str) -> Path:
+        """File holding a blob"""
+        return self.root / handle[:2] / handle
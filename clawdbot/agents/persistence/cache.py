@@ -0,0 +1,253 @@
+"""
+Bounded LRU cache of live sessions
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import Future
+from typing import Any
+
+from ...monitoring.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """
+    LRU cache of in-memory Session objects bounded by count and size
+
+    When either bound is exceeded the least recently used sessions are
+    evicted. Pinned sessions (those with an active turn, see Session.pin)
+    are never evicted; the cache may temporarily exceed its bounds if
+    everything is pinned.
+
+    In write-behind mode an evicted session is flushed before it is
+    dropped. Until that flush completes the session stays reachable through
+    ``get`` so that a concurrent reload never reads stale state from the
+    store. Once an evicted session is dropped the store is told to release
+    what it keeps for it (see SessionStore.release).
+
+    The byte total is kept as a running sum: cached sessions report size
+    changes through ``adjust_bytes`` (see Session.attach_cache), so a cache
+    hit is O(1) unless the byte bound is actually exceeded.
+
+    Metrics (exported through clawdbot.monitoring.metrics):
+    - session_cache_hits_total / session_cache_misses_total
+    - session_cache_evictions_total
+    - session_cache_size: sessions held in memory
+    - session_cache_bytes: approximate bytes held in memory
+    """
+
+    def __init__(
+        self,
+        max_sessions: int | None = 1000,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        writer: Any = None,
+        store: Any = None,
+    ):
+        """
+        Initialize cache
+
+        Args:
+            max_sessions: Maximum number of cached sessions (None for no limit)
+            max_bytes: Maximum approximate size of cached sessions (None for no limit)
+            writer: WriteBehindFlusher used to flush evicted sessions
+            store: SessionStore whose per-session state is released on eviction
+        """
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.writer = writer
+        self.store = store
+
+        self._sessions: OrderedDict[str, Any] = OrderedDict()
+        self._total_bytes = 0
+        # Evicted sessions whose write-behind flush has not finished yet
+        self._evicting: dict[str, Any] = {}
+        self._evicting_lock = threading.Lock()
+
+        metrics = get_metrics()
+        self._hits = metrics.counter("session_cache_hits_total", "Session cache hits")
+        self._misses = metrics.counter("session_cache_misses_total", "Session cache misses")
+        self._evictions = metrics.counter(
+            "session_cache_evictions_total", "Sessions evicted from memory"
+        )
+        self._size = metrics.gauge("session_cache_size", "Sessions held in memory")
+        self._bytes = metrics.gauge("session_cache_bytes", "Approximate bytes of cached sessions")
+
+    def get(self, session_id: str) -> Any | None:
+        """
+        Get a cached session and mark it as recently used
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Session or None on a miss
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            self._hits.inc()
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                # Sessions grow after insertion; evict once they exceed the bound
+                self.evict(keep=session_id)
+            return session
+
+        # Resurrect a session that is still being flushed after eviction
+        with self._evicting_lock:
+            session = self._evicting.pop(session_id, None)
+        if session is not None:
+            self._hits.inc()
+            self.put(session)
+            return session
+
+        self._misses.inc()
+        return None
+
+    def peek(self, session_id: str) -> Any | None:
+        """Get a cached session without touching LRU order or metrics"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            with self._evicting_lock:
+                session = self._evicting.get(session_id)
+        return session
+
+    def put(self, session: Any) -> None:
+        """
+        Insert a session and evict others if over capacity
+
+        Args:
+            session: Session to cache
+        """
+        previous = self._sessions.get(session.session_id)
+        if previous is not session:
+            if previous is not None:
+                self._detach(previous)
+            self._sessions[session.session_id] = session
+            self._total_bytes += session.approx_bytes
+            session.attach_cache(self)
+        self._sessions.move_to_end(session.session_id)
+        # Never evict the session the caller is about to use
+        self.evict(keep=session.session_id)
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        """Remove a session without flushing it"""
+        with self._evicting_lock:
+            evicting = self._evicting.pop(session_id, None)
+        cached = self._sessions.pop(session_id, None)
+        if cached is not None:
+            self._detach(cached)
+        session = cached or evicting
+        self._update_gauges()
+        return default if session is None else session
+
+    def evict(self, keep: str | None = None) -> int:
+        """
+        Evict least recently used, unpinned sessions until within bounds
+
+        Args:
+            keep: Session ID that must not be evicted
+
+        Returns:
+            Number of sessions evicted
+        """
+        evicted = 0
+
+        for session_id in list(self._sessions):
+            if not self._over_limit(len(self._sessions), self._total_bytes):
+                break
+            session = self._sessions[session_id]
+            if session.is_pinned or session_id == keep:
+                continue
+
+            del self._sessions[session_id]
+            self._detach(session)
+            self._release(session)
+            evicted += 1
+
+        if evicted:
+            self._evictions.inc(evicted)
+            logger.debug(f"Evicted {evicted} session(s) from memory")
+        self._update_gauges()
+        return evicted
+
+    def adjust_bytes(self, delta: int) -> None:
+        """
+        Account for a cached session growing or shrinking
+
+        Args:
+            delta: Change in the session's approximate size
+        """
+        self._total_bytes += delta
+
+    @property
+    def total_bytes(self) -> int:
+        """Approximate size of all cached sessions"""
+        return self._total_bytes
+
+    def values(self) -> list[Any]:
+        """Cached sessions, least recently used first"""
+        return list(self._sessions.values())
+
+    def clear(self) -> None:
+        """Drop all cached sessions without flushing"""
+        for session in self._sessions.values():
+            session.attach_cache(None)
+        self._sessions.clear()
+        self._total_bytes = 0
+        with self._evicting_lock:
+            self._evicting.clear()
+        self._update_gauges()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def _over_limit(self, count: int, total_bytes: int) -> bool:
+        """Check whether either bound is exceeded"""
+        if self.max_sessions is not None and count > self.max_sessions:
+            return True
+        return self.max_bytes is not None and total_bytes > self.max_bytes
+
+    def _detach(self, session: Any) -> None:
+        """Stop tracking the size of a session removed from the cache"""
+        session.attach_cache(None)
+        self._total_bytes -= session.approx_bytes
+
+    def _release(self, session: Any) -> None:
+        """Flush an evicted session (write-behind only) and drop it"""
+        session_id = session.session_id
+        if not self.writer:
+            self._release_store(session_id)
+            return
+
+        with self._evicting_lock:
+            self._evicting[session_id] = session
+        future: Future = self.writer.flush_session(session)
+
+        def _done(_: Future) -> None:
+            with self._evicting_lock:
+                dropped = self._evicting.get(session_id) is session
+                if dropped:
+                    del self._evicting[session_id]
+            if dropped:
+                self._release_store(session_id)
+
+        future.add_done_callback(_done)
+
+    def _release_store(self, session_id: str) -> None:
+        """Let the store forget an evicted session"""
+        if self.store is not None:
+            self.store.release(session_id)
+
+    def _update_gauges(self) -> None:
+        """Refresh size gauges"""
+        self._size.set(len(self._sessions))
+        self._bytes.set(self._total_bytes)
@@ -0,0 +1,213 @@
+"""
+Append-only session journal with periodic snapshots
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class SessionJournal:
+    """
+    Append-only journal for a single session
+
+    Each mutation is appended as one JSONL record to ``<session_id>.jsonl``.
+    Periodically the full state is written as a snapshot to ``<session_id>.json``
+    and the journal is truncated. Loading reads the snapshot and replays the
+    journal records that are newer than it.
+
+    The snapshot uses the same layout as the legacy full-rewrite session files,
+    so existing ``.json`` sessions load unchanged and are migrated on the next
+    snapshot.
+
+    Records carry a monotonically increasing ``seq``. The snapshot stores the
+    last ``seq`` it contains, so a crash between writing the snapshot and
+    truncating the journal never replays records twice.
+    """
+
+    SNAPSHOT_SUFFIX = ".json"
+    JOURNAL_SUFFIX = ".jsonl"
+
+    def __init__(self, sessions_dir: Path, session_id: str, snapshot_min_records: int = 500):
+        """
+        Initialize journal
+
+        Args:
+            sessions_dir: Directory holding session files
+            session_id: Session identifier
+            snapshot_min_records: Minimum journal records before a snapshot is taken
+        """
+        self.sessions_dir = Path(sessions_dir)
+        self.session_id = session_id
+        self.snapshot_min_records = snapshot_min_records
+        self.journal_records = 0
+
+    @property
+    def snapshot_path(self) -> Path:
+        """Path of the snapshot file"""
+        return self.sessions_dir / f"{self.session_id}{self.SNAPSHOT_SUFFIX}"
+
+    @property
+    def journal_path(self) -> Path:
+        """Path of the journal file"""
+        return self.sessions_dir / f"{self.session_id}{self.JOURNAL_SUFFIX}"
+
+    def exists(self) -> bool:
+        """Check whether any persisted state exists"""
+        return self.snapshot_path.exists() or self.journal_path.exists()
+
+    def append(self, records: list[dict[str, Any]], fsync: bool = False) -> int:
+        """
+        Append records to the journal
+
+        Args:
+            records: Journal records (each must carry ``seq`` and ``op``)
+            fsync: Force the data to stable storage before returning
+
+        Returns:
+            Number of bytes written
+        """
+        if not records:
+            return 0
+
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records
+        )
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.journal_records += len(records)
+        return len(data)
+
+    def sync(self) -> None:
+        """fsync the journal file if it exists"""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            os.fsync(f.fileno())
+
+    def needs_snapshot(self, message_count: int) -> bool:
+        """
+        Check whether the journal should be folded into a snapshot
+
+        The threshold grows with the session size so that snapshot cost stays
+        amortized O(1) per appended message.
+        """
+        return self.journal_records >= max(self.snapshot_min_records, message_count)
+
+    def write_snapshot(self, state: dict[str, Any], fsync: bool = False) -> int:
+        """
+        Write a full snapshot and truncate the journal
+
+        Args:
+            state: Full session state (must include ``seq``)
+            fsync: Force the data to stable storage before returning
+
+        Returns:
+            Number of bytes written
+        """
+        data = json.dumps(state, ensure_ascii=False, default=str)
+        tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Records up to state["seq"] are now in the snapshot
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self.journal_records = 0
+        return len(data)
+
+    def load(self) -> dict[str, Any] | None:
+        """
+        Load session state from snapshot + journal tail
+
+        Returns:
+            State dict with ``messages``, ``metadata``, ``created_at``,
+            ``updated_at`` and ``seq``, or None if nothing is persisted
+        """
+        if not self.exists():
+            return None
+
+        state: dict[str, Any] = {"messages": [], "metadata": {}, "seq": 0}
+
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            state.update(snapshot)
+            state["seq"] = snapshot.get("seq", 0)
+
+        self.journal_records = 0
+        if self.journal_path.exists():
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from an interrupted append
+                        logger.warning(
+                            f"Skipping corrupt journal record {line_no} in {self.journal_path}"
+                        )
+                        continue
+
+                    self.journal_records += 1
+                    if record.get("seq", 0) <= state["seq"]:
+                        continue
+                    apply_record(state, record)
+
+        return state
+
+    def delete(self) -> bool:
+        """
+        Delete snapshot and journal
+
+        Returns:
+            True if anything was deleted
+        """
+        deleted = False
+        for path in (self.snapshot_path, self.journal_path):
+            if path.exists():
+                path.unlink()
+                deleted = True
+        self.journal_records = 0
+        return deleted
+
+
+def apply_record(state: dict[str, Any], record: dict[str, Any]) -> None:
+    """
+    Apply a single journal record to a session state dict
+
+    Args:
+        state: State dict (modified in place)
+        record: Journal record
+    """
+    op = record.get("op")
+
+    if op == "message":
+        state["messages"].append(record["message"])
+    elif op == "metadata":
+        state["metadata"][record["key"]] = record["value"]
+    elif op == "clear":
+        state["messages"] = []
+    elif op == "replace":
+        state["messages"] = list(record["messages"])
+    else:
+        logger.warning(f"Unknown journal op: {op}")
+        return
+
+    state["seq"] = record["seq"]
+    if record.get("updated_at"):
+        state["updated_at"] = record["updated_at"]
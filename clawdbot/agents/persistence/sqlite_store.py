@@ -0,0 +1,390 @@
+"""
+SQLite-backed session store
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+
+from .store import FileSessionStore, SessionStore, SessionSummary
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TEXT,
+    updated_at TEXT,
+    updated_ts REAL NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_message_ts TEXT,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_ts ON sessions(updated_ts);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (session_id, idx)
+) WITHOUT ROWID;
+"""
+
+
+def _to_epoch(timestamp: str | None) -> float:
+    """Convert an ISO timestamp to epoch seconds (naive values are UTC)"""
+    if not timestamp:
+        return 0.0
+    try:
+        value = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a single SQLite database (WAL mode)
+
+    Keeps an indexed ``sessions`` table with per-session counters so that
+    listing, counting, age-based cleanup and history with ``limit`` are
+    index lookups instead of full scans. Messages are stored one row each,
+    keyed by (session_id, idx).
+
+    Writes go through a blocking sqlite3 connection (safe to call from the
+    write-behind flusher thread); async queries share one aiosqlite
+    connection, opened on first use.
+
+    Example:
+        store = SQLiteSessionStore(Path("workspace/.sessions/sessions.db"))
+        manager = SessionManager(Path("workspace"), store=store)
+    """
+
+    def __init__(self, db_path: Path, legacy_dir: Path | None = None):
+        """
+        Initialize store
+
+        Args:
+            db_path: Path of the SQLite database file
+            legacy_dir: Directory of file-store sessions (``*.json`` / ``*.jsonl``)
+                imported once if the database is empty
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        self._adb: aiosqlite.Connection | None = None
+        self._adb_lock = asyncio.Lock()
+
+        if legacy_dir is not None:
+            self._import_legacy(Path(legacy_dir))
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, updated_at, metadata, seq FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT data FROM messages WHERE session_id = ? ORDER BY idx", (session_id,)
+            ).fetchall()
+
+        return {
+            "session_id": session_id,
+            "messages": [json.loads(r[0]) for r in rows],
+            "metadata": json.loads(row[2]),
+            "created_at": row[0],
+            "updated_at": row[1],
+            "seq": row[3],
+        }
+
+    def append(self, session_id: str, records: list[dict[str, Any]], fsync: bool = False) -> None:
+        if not records:
+            return
+
+        with self._lock, self._conn:
+            self._ensure_row(session_id, records[0].get("updated_at"))
+            for record in records:
+                self._apply(session_id, record)
+        if fsync:
+            self.sync(session_id)
+
+    def write_snapshot(self, session_id: str, state: dict[str, Any], fsync: bool = False) -> None:
+        messages = state.get("messages", [])
+        updated_at = state.get("updated_at")
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, idx, data) VALUES (?, ?, ?)",
+                [
+                    (session_id, i, json.dumps(m, ensure_ascii=False, default=str))
+                    for i, m in enumerate(messages)
+                ],
+            )
+            self._conn.execute(
+                """
+                INSERT INTO sessions (session_id, created_at, updated_at, updated_ts,
+                                      message_count, last_message_ts, metadata, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    created_at = excluded.created_at,
+                    updated_at = excluded.updated_at,
+                    updated_ts = excluded.updated_ts,
+                    message_count = excluded.message_count,
+                    last_message_ts = excluded.last_message_ts,
+                    metadata = excluded.metadata,
+                    seq = excluded.seq
+                """,
+                (
+                    session_id,
+                    state.get("created_at"),
+                    updated_at,
+                    _to_epoch(updated_at),
+                    len(messages),
+                    messages[-1].get("timestamp") if messages else None,
+                    json.dumps(state.get("metadata", {}), ensure_ascii=False, default=str),
+                    state.get("seq", 0),
+                ),
+            )
+        if fsync:
+            self.sync(session_id)
+
+    def sync(self, session_id: str) -> None:
+        # Checkpointing syncs the WAL to disk
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def list_session_ids(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions ORDER BY session_id"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def list_summaries(self, limit: int | None = None, offset: int = 0) -> list[SessionSummary]:
+        query, params = self._summaries_query(limit, offset)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [SessionSummary(*row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get_messages(self, session_id: str, limit: int | None = None) -> list[dict[str, Any]]:
+        query, params = self._messages_query(session_id, limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def delete_older_than(self, cutoff: datetime) -> list[str]:
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=UTC)
+        with self._lock, self._conn:
+            return self._delete_before(self._conn, cutoff.timestamp())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        if self._adb is not None:
+            self._adb.stop()
+            self._adb = None
+
+    async def alist_summaries(
+        self, limit: int | None = None, offset: int = 0
+    ) -> list[SessionSummary]:
+        query, params = self._summaries_query(limit, offset)
+        db = await self._async_conn()
+        async with db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+        return [SessionSummary(*row) for row in rows]
+
+    async def acount(self) -> int:
+        db = await self._async_conn()
+        async with db.execute("SELECT COUNT(*) FROM sessions") as cursor:
+            row = await cursor.fetchone()
+        return row[0]
+
+    async def aget_messages(
+        self, session_id: str, limit: int | None = None
+    ) -> list[dict[str, Any]]:
+        query, params = self._messages_query(session_id, limit)
+        db = await self._async_conn()
+        async with db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    async def adelete_older_than(self, cutoff: datetime) -> list[str]:
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=UTC)
+        cutoff_ts = cutoff.timestamp()
+
+        db = await self._async_conn()
+        async with db.execute(
+            "SELECT session_id FROM sessions WHERE updated_ts < ?", (cutoff_ts,)
+        ) as cursor:
+            session_ids = [r[0] for r in await cursor.fetchall()]
+        if session_ids:
+            await db.execute(
+                "DELETE FROM messages WHERE session_id IN "
+                "(SELECT session_id FROM sessions WHERE updated_ts < ?)",
+                (cutoff_ts,),
+            )
+            await db.execute("DELETE FROM sessions WHERE updated_ts < ?", (cutoff_ts,))
+            await db.commit()
+        return session_ids
+
+    async def _async_conn(self) -> aiosqlite.Connection:
+        """Get the shared aiosqlite connection, opening it on first use"""
+        if self._adb is None:
+            async with self._adb_lock:
+                if self._adb is None:
+                    self._adb = await aiosqlite.connect(self.db_path)
+        return self._adb
+
+    def _import_legacy(self, sessions_dir: Path) -> None:
+        """Copy sessions from a file store directory into an empty database"""
+        if not sessions_dir.is_dir() or self.count():
+            return
+
+        legacy = FileSessionStore(sessions_dir)
+        imported = 0
+        for session_id in legacy.list_session_ids():
+            try:
+                state = legacy.load(session_id)
+            except Exception as e:
+                logger.error(f"Failed to import session {session_id}: {e}")
+                continue
+            if state is not None:
+                self.write_snapshot(session_id, state)
+                imported += 1
+            legacy.release(session_id)
+        if imported:
+            logger.info(f"Imported {imported} sessions from {sessions_dir}")
+
+    def _ensure_row(self, session_id: str, timestamp: str | None) -> None:
+        """Create the sessions row on first write"""
+        self._conn.execute(
+            "INSERT OR IGNORE INTO sessions (session_id, created_at, updated_at, updated_ts) "
+            "VALUES (?, ?, ?, ?)",
+            (session_id, timestamp, timestamp, _to_epoch(timestamp)),
+        )
+
+    def _apply(self, session_id: str, record: dict[str, Any]) -> None:
+        """Apply one journal record inside the current transaction"""
+        op = record.get("op")
+        updated_at = record.get("updated_at")
+
+        if op == "message":
+            message = record["message"]
+            self._conn.execute(
+                "INSERT INTO messages (session_id, idx, data) "
+                "SELECT ?, message_count, ? FROM sessions WHERE session_id = ?",
+                (session_id, json.dumps(message, ensure_ascii=False, default=str), session_id),
+            )
+            self._conn.execute(
+                "UPDATE sessions SET message_count = message_count + 1, last_message_ts = ? "
+                "WHERE session_id = ?",
+                (message.get("timestamp"), session_id),
+            )
+        elif op == "metadata":
+            row = self._conn.execute(
+                "SELECT metadata FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            metadata = json.loads(row[0]) if row else {}
+            metadata[record["key"]] = record["value"]
+            self._conn.execute(
+                "UPDATE sessions SET metadata = ? WHERE session_id = ?",
+                (json.dumps(metadata, ensure_ascii=False, default=str), session_id),
+            )
+        elif op in ("clear", "replace"):
+            messages = record.get("messages", []) if op == "replace" else []
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, idx, data) VALUES (?, ?, ?)",
+                [
+                    (session_id, i, json.dumps(m, ensure_ascii=False, default=str))
+                    for i, m in enumerate(messages)
+                ],
+            )
+            self._conn.execute(
+                "UPDATE sessions SET message_count = ?, last_message_ts = ? WHERE session_id = ?",
+                (len(messages), messages[-1].get("timestamp") if messages else None, session_id),
+            )
+        else:
+            logger.warning(f"Unknown journal op: {op}")
+            return
+
+        self._conn.execute(
+            "UPDATE sessions SET seq = ?, updated_at = ?, updated_ts = ? WHERE session_id = ?",
+            (record["seq"], updated_at, _to_epoch(updated_at), session_id),
+        )
+
+    @staticmethod
+    def _delete_before(conn: sqlite3.Connection, cutoff_ts: float) -> list[str]:
+        """Delete sessions updated before cutoff_ts using the updated_ts index"""
+        session_ids = [
+            r[0]
+            for r in conn.execute(
+                "SELECT session_id FROM sessions WHERE updated_ts < ?", (cutoff_ts,)
+            ).fetchall()
+        ]
+        if session_ids:
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN "
+                "(SELECT session_id FROM sessions WHERE updated_ts < ?)",
+                (cutoff_ts,),
+            )
+            conn.execute("DELETE FROM sessions WHERE updated_ts < ?", (cutoff_ts,))
+        return session_ids
+
+    @staticmethod
+    def _summaries_query(limit: int | None, offset: int) -> tuple[str, tuple]:
+        """Build the paginated listing query"""
+        query = (
+            "SELECT session_id, message_count, created_at, updated_at, last_message_ts "
+            "FROM sessions ORDER BY updated_ts DESC"
+        )
+        if limit is None:
+            return query + " LIMIT -1 OFFSET ?", (offset,)
+        return query + " LIMIT ? OFFSET ?", (limit, offset)
+
+    @staticmethod
+    def _messages_query(session_id: str, limit: int | None) -> tuple[str, tuple]:
+        """Build the newest-first message query (callers reverse the rows)"""
+        query = "SELECT data FROM messages WHERE session_id = ? ORDER BY idx DESC"
+        if limit is None:
+            return query, (session_id,)
+        return query + " LIMIT ?", (session_id, limit)
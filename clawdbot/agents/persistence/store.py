@@ -0,0 +1,263 @@
+"""
+Pluggable session storage backends
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from .journal import SessionJournal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionSummary:
+    """Lightweight session listing entry"""
+
+    session_id: str
+    message_count: int
+    created_at: str | None = None
+    updated_at: str | None = None
+    last_message_ts: str | None = None
+
+
+class SessionStore(ABC):
+    """
+    Base class for session storage backends
+
+    The write path (append / write_snapshot / load) is synchronous so it can
+    run inline or from the write-behind flusher thread. Query methods have
+    async variants for use on the event loop; by default they run the sync
+    implementation in a worker thread.
+    """
+
+    @abstractmethod
+    def exists(self, session_id: str) -> bool:
+        """Check whether a session is persisted"""
+        pass
+
+    @abstractmethod
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        """
+        Load full session state
+
+        Returns:
+            State dict with ``messages``, ``metadata``, ``created_at``,
+            ``updated_at`` and ``seq``, or None if not persisted
+        """
+        pass
+
+    @abstractmethod
+    def append(self, session_id: str, records: list[dict[str, Any]], fsync: bool = False) -> None:
+        """Append journal records (see journal.apply_record for the format)"""
+        pass
+
+    @abstractmethod
+    def write_snapshot(self, session_id: str, state: dict[str, Any], fsync: bool = False) -> None:
+        """Replace the persisted state with a full snapshot"""
+        pass
+
+    def needs_snapshot(self, session_id: str, message_count: int) -> bool:
+        """Whether the backend wants a full snapshot after the last append"""
+        return False
+
+    def sync(self, session_id: str) -> None:
+        """Force previously written data for a session to stable storage"""
+        pass
+
+    def release(self, session_id: str) -> None:
+        """Drop in-memory state kept for a session that is no longer cached"""
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a session, returning True if it existed"""
+        pass
+
+    @abstractmethod
+    def list_session_ids(self) -> list[str]:
+        """List all persisted session IDs, sorted"""
+        pass
+
+    @abstractmethod
+    def list_summaries(self, limit: int | None = None, offset: int = 0) -> list[SessionSummary]:
+        """List sessions, most recently updated first"""
+        pass
+
+    def count(self) -> int:
+        """Count persisted sessions"""
+        return len(self.list_session_ids())
+
+    @abstractmethod
+    def get_messages(self, session_id: str, limit: int | None = None) -> list[dict[str, Any]]:
+        """Get the last ``limit`` messages of a session (all if None)"""
+        pass
+
+    @abstractmethod
+    def delete_older_than(self, cutoff: datetime) -> list[str]:
+        """
+        Delete sessions last updated before ``cutoff``
+
+        Returns:
+            IDs of deleted sessions
+        """
+        pass
+
+    def close(self) -> None:
+        """Release backend resources"""
+        pass
+
+    async def alist_summaries(
+        self, limit: int | None = None, offset: int = 0
+    ) -> list[SessionSummary]:
+        """Async variant of list_summaries"""
+        return await asyncio.to_thread(self.list_summaries, limit, offset)
+
+    async def acount(self) -> int:
+        """Async variant of count"""
+        return await asyncio.to_thread(self.count)
+
+    async def aget_messages(
+        self, session_id: str, limit: int | None = None
+    ) -> list[dict[str, Any]]:
+        """Async variant of get_messages"""
+        return await asyncio.to_thread(self.get_messages, session_id, limit)
+
+    async def adelete_older_than(self, cutoff: datetime) -> list[str]:
+        """Async variant of delete_older_than"""
+        return await asyncio.to_thread(self.delete_older_than, cutoff)
+
+
+class FileSessionStore(SessionStore):
+    """
+    File-based store: one snapshot + append-only journal per session
+
+    Listing and age queries have to read every session file, so they are
+    O(total bytes); use SQLiteSessionStore for large deployments.
+    """
+
+    def __init__(self, sessions_dir: Path, snapshot_min_records: int = 500):
+        """
+        Initialize file store
+
+        Args:
+            sessions_dir: Directory holding session files
+            snapshot_min_records: Minimum journal records before a snapshot
+        """
+        self.sessions_dir = Path(sessions_dir)
+        self.snapshot_min_records = snapshot_min_records
+        self._journals: dict[str, SessionJournal] = {}
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+
+    def journal(self, session_id: str) -> SessionJournal:
+        """Get the journal for a session"""
+        journal = self._journals.get(session_id)
+        if journal is None:
+            journal = SessionJournal(
+                self.sessions_dir, session_id, snapshot_min_records=self.snapshot_min_records
+            )
+            self._journals[session_id] = journal
+        return journal
+
+    def exists(self, session_id: str) -> bool:
+        return self.journal(session_id).exists()
+
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        return self.journal(session_id).load()
+
+    def append(self, session_id: str, records: list[dict[str, Any]], fsync: bool = False) -> None:
+        self.journal(session_id).append(records, fsync=fsync)
+
+    def write_snapshot(self, session_id: str, state: dict[str, Any], fsync: bool = False) -> None:
+        self.journal(session_id).write_snapshot(state, fsync=fsync)
+
+    def needs_snapshot(self, session_id: str, message_count: int) -> bool:
+        return self.journal(session_id).needs_snapshot(message_count)
+
+    def sync(self, session_id: str) -> None:
+        self.journal(session_id).sync()
+
+    def release(self, session_id: str) -> None:
+        # The journal is recreated (and its record count re-read) on next load
+        self._journals.pop(session_id, None)
+
+    def delete(self, session_id: str) -> bool:
+        journal = self._journals.pop(session_id, None) or SessionJournal(
+            self.sessions_dir, session_id
+        )
+        return journal.delete()
+
+    def list_session_ids(self) -> list[str]:
+        if not self.sessions_dir.exists():
+            return []
+
+        # A session may exist only as a journal until its first snapshot
+        session_ids = set()
+        for suffix in (SessionJournal.SNAPSHOT_SUFFIX, SessionJournal.JOURNAL_SUFFIX):
+            for f in self.sessions_dir.glob(f"*{suffix}"):
+                session_ids.add(f.stem)
+
+        return sorted(session_ids)
+
+    def list_summaries(self, limit: int | None = None, offset: int = 0) -> list[SessionSummary]:
+        summaries = []
+        for session_id in self.list_session_ids():
+            state = self._load_quietly(session_id)
+            if state is None:
+                continue
+            messages = state.get("messages", [])
+            summaries.append(
+                SessionSummary(
+                    session_id=session_id,
+                    message_count=len(messages),
+                    created_at=state.get("created_at"),
+                    updated_at=state.get("updated_at"),
+                    last_message_ts=messages[-1].get("timestamp") if messages else None,
+                )
+            )
+
+        summaries.sort(key=lambda s: s.updated_at or "", reverse=True)
+        end = None if limit is None else offset + limit
+        return summaries[offset:end]
+
+    def get_messages(self, session_id: str, limit: int | None = None) -> list[dict[str, Any]]:
+        state = self._load_quietly(session_id)
+        if state is None:
+            return []
+        messages = state.get("messages", [])
+        return messages if limit is None else messages[-limit:]
+
+    def delete_older_than(self, cutoff: datetime) -> list[str]:
+        deleted = []
+        for summary in self.list_summaries():
+            if _is_older(summary.updated_at, cutoff) and self.delete(summary.session_id):
+                deleted.append(summary.session_id)
+        return deleted
+
+    def _load_quietly(self, session_id: str) -> dict[str, Any] | None:
+        """Load state without caching a journal object for the session"""
+        try:
+            return SessionJournal(self.sessions_dir, session_id).load()
+        except Exception as e:
+            logger.error(f"Failed to read session {session_id}: {e}")
+            return None
+
+
+def _is_older(timestamp: str | None, cutoff: datetime) -> bool:
+    """Compare an ISO timestamp (naive values are treated as UTC) with cutoff"""
+    if not timestamp:
+        return False
+    try:
+        value = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if value.tzinfo is None and cutoff.tzinfo is not None:
+        value = value.replace(tzinfo=cutoff.tzinfo)
+    elif value.tzinfo is not None and cutoff.tzinfo is None:
+        value = value.replace(tzinfo=None)
+    return value < cutoff
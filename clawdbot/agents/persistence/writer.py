@@ -0,0 +1,159 @@
+"""
+Write-behind flusher for session persistence
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from ...monitoring.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindFlusher:
+    """
+    Background flusher that persists dirty sessions off the event loop
+
+    Session mutations only queue journal records in memory and mark the
+    session dirty. A timer thread wakes every ``interval`` seconds and submits
+    one flush job per dirty session to a thread pool, where the queued
+    records are coalesced into a single journal append.
+
+    Callers that need durability (e.g. at the end of a turn) can request an
+    immediate flush with ``flush_session`` and optionally fsync it.
+
+    Metrics (exported through clawdbot.monitoring.metrics):
+    - session_write_queue_depth: journal records waiting to be written
+    - session_flush_lag_seconds: time from first mutation to write
+    - session_flushes_total: completed flush jobs
+    """
+
+    def __init__(self, interval: float = 1.0, max_workers: int = 2, fsync_on_end: bool = True):
+        """
+        Initialize flusher
+
+        Args:
+            interval: Seconds between background flushes
+            max_workers: Thread pool size for flush jobs
+            fsync_on_end: fsync when a turn ends (bounds the crash window)
+        """
+        self.interval = interval
+        self.fsync_on_end = fsync_on_end
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="session-flush"
+        )
+        self._dirty: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+
+        metrics = get_metrics()
+        self._queue_depth = metrics.gauge(
+            "session_write_queue_depth", "Session journal records waiting to be written"
+        )
+        self._flush_lag = metrics.histogram(
+            "session_flush_lag_seconds", "Time from first session mutation to disk write"
+        )
+        self._flushes = metrics.counter("session_flushes_total", "Completed session flush jobs")
+
+    def mark_dirty(self, session: Any, records: int = 1) -> None:
+        """
+        Mark a session as having unwritten records
+
+        Args:
+            session: Session with pending records
+            records: Number of records just queued
+        """
+        with self._lock:
+            self._dirty[session.session_id] = session
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(
+                    target=self._run, name="session-flush-timer", daemon=True
+                )
+                self._thread.start()
+        self._queue_depth.inc(records)
+
+    def discard(self, session: Any) -> None:
+        """Forget a session without writing its pending records"""
+        with self._lock:
+            self._dirty.pop(session.session_id, None)
+        dropped = session.drop_pending()
+        if dropped:
+            self._queue_depth.dec(dropped)
+
+    def flush_session(self, session: Any, fsync: bool = False) -> Future:
+        """
+        Schedule an immediate flush of one session
+
+        Args:
+            session: Session to flush
+            fsync: Force data to stable storage
+
+        Returns:
+            Future resolving to the number of records written
+        """
+        with self._lock:
+            self._dirty.pop(session.session_id, None)
+        return self._executor.submit(self._flush_one, session, fsync)
+
+    def flush_all(self, fsync: bool = False) -> list[Future]:
+        """
+        Schedule a flush of every dirty session
+
+        Returns:
+            List of futures, one per flushed session
+        """
+        with self._lock:
+            dirty = list(self._dirty.values())
+            self._dirty.clear()
+        return [self._executor.submit(self._flush_one, s, fsync) for s in dirty]
+
+    @property
+    def pending_sessions(self) -> int:
+        """Number of sessions waiting to be flushed"""
+        return len(self._dirty)
+
+    def close(self) -> None:
+        """Flush everything and stop the background thread"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+
+        for future in self.flush_all(fsync=True):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Final session flush failed: {e}")
+        self._executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        """Timer loop that periodically flushes dirty sessions"""
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped:
+                break
+            self.flush_all()
+
+    def _flush_one(self, session: Any, fsync: bool) -> int:
+        """Write one session's pending records (runs in the thread pool)"""
+        try:
+            written, dirty_since = session.write_pending(fsync=fsync)
+        except Exception as e:
+            # Records were requeued on the session; retry on the next tick
+            logger.error(f"Failed to flush session {session.session_id}: {e}")
+            self.mark_dirty(session, records=0)
+            return 0
+
+        if written:
+            self._queue_depth.dec(written)
+            self._flushes.inc()
+            if dirty_since is not None:
+                self._flush_lag.observe(time.monotonic() - dirty_since)
+        return written
@@ -4,10 +4,14 @@ LLM Provider implementations
 
 from .base import LLMMessage, LLMProvider, LLMResponse
 from .openai_provider import OpenAIProvider
+from .pool import ProviderPool, configure_provider_pool, get_provider_pool
 
 __all__ = [
     "LLMProvider",
     "LLMResponse",
     "LLMMessage",
     "OpenAIProvider",
+    "ProviderPool",
+    "get_provider_pool",
+    "configure_provider_pool",
 ]
@@ -4,7 +4,7 @@ Base LLM Provider interface
 
 from abc import ABC, abstractmethod
 from collections.abc import AsyncIterator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 
@@ -17,6 +17,24 @@ class LLMMessage:
     tool_calls: list[dict] | None = None
     tool_call_id: str | None = None
     name: str | None = None
+    _api: dict[str, Any] | None = field(default=None, init=False, repr=False, compare=False)
+
+    def to_api_format(self) -> dict[str, Any]:
+        """
+        Convert to OpenAI-style message dict
+
+        The dict is built once and reused, so callers must not modify it.
+        """
+        if self._api is None:
+            msg: dict[str, Any] = {"role": self.role, "content": self.content}
+            if self.tool_calls:
+                msg["tool_calls"] = self.tool_calls
+            if self.tool_call_id:
+                msg["tool_call_id"] = self.tool_call_id
+            if self.name:
+                msg["name"] = self.name
+            self._api = msg
+        return self._api
 
 
 @dataclass
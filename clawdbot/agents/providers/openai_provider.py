@@ -8,6 +8,7 @@ from collections.abc import AsyncIterator
 
 from openai import AsyncOpenAI
 
+from ...monitoring.capture import get_request_capture
 from .base import LLMMessage, LLMProvider, LLMResponse
 
 logger = logging.getLogger(__name__)
@@ -48,6 +49,11 @@ class OpenAIProvider(LLMProvider):
             if self.base_url:
                 kwargs["base_url"] = self.base_url
 
+            # Shared connection pool (see ProviderPool)
+            http_client = self.extra_params.get("http_client")
+            if http_client is not None:
+                kwargs["http_client"] = http_client
+
             self._client = AsyncOpenAI(**kwargs)
 
         return self._client
@@ -62,19 +68,8 @@ class OpenAIProvider(LLMProvider):
         """Stream responses from OpenAI"""
         client = self.get_client()
 
-        # Convert messages to OpenAI format
-        openai_messages = []
-        for msg in messages:
-            m = {"role": msg.role, "content": msg.content}
-            if msg.tool_calls:
-                m["tool_calls"] = msg.tool_calls
-            if msg.tool_call_id:
-                m["tool_call_id"] = msg.tool_call_id
-            if msg.name:
-                m["name"] = msg.name
-            openai_messages.append(m)
-
-        logger.debug(f"Sending messages to OpenAI: {openai_messages}")
+        # Convert messages to OpenAI format (dicts are cached on each LLMMessage)
+        openai_messages = [msg.to_api_format() for msg in messages]
 
         try:
             # Build request parameters
@@ -94,14 +89,8 @@ class OpenAIProvider(LLMProvider):
             params["stream_options"] = {"include_usage": True}
 
             # Start streaming
-            import json
-            logger.info(f"OpenAI Request | Model: {self.model} | Messages count: {len(openai_messages)}")
-            try:
-                with open("openai_request_debug.json", "w", encoding="utf-8") as f:
-                    json.dump(params, f, ensure_ascii=False, indent=2)
-                logger.info("Wrote OpenAI request params to openai_request_debug.json")
-            except Exception as e:
-                logger.error(f"Failed to write debug JSON: {e}")
+            logger.debug(f"OpenAI Request | Model: {self.model} | Messages count: {len(openai_messages)}")
+            get_request_capture().capture(self.provider_name, params)
             stream = await client.chat.completions.create(**params)
 
             # Track tool calls
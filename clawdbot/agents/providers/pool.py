@@ -0,0 +1,143 @@
+"""
+Shared provider instances and HTTP connection pools
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any
+
+import httpx
+
+from .base import LLMProvider
+from .openai_provider import OpenAIProvider
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderPool:
+    """
+    Pool of provider instances sharing one HTTP connection pool
+
+    Providers are cached by (model, base_url, api_key), so repeated requests
+    (and failover back to a model used before) reuse the same client. All
+    clients share a single ``httpx.AsyncClient``, giving keep-alive reuse
+    and TLS session reuse towards the backend across requests. At most
+    ``max_size`` providers are kept; the least recently used is dropped
+    (its connections stay in the shared client).
+
+    Example:
+        pool = ProviderPool(max_connections=200)
+        provider = pool.get_provider("model", base_url="http://vllm:8000/v1")
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 600.0,
+        max_size: int = 128,
+    ):
+        """
+        Initialize pool
+
+        Args:
+            max_connections: Maximum concurrent connections across all backends
+            max_keepalive_connections: Maximum idle connections kept open
+            keepalive_expiry: Seconds an idle connection is kept open
+            timeout: Request timeout in seconds
+            max_size: Maximum number of cached providers
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self._http_client: httpx.AsyncClient | None = None
+        self.max_size = max_size
+        self._providers: OrderedDict[tuple[str, str | None, str | None], LLMProvider] = (
+            OrderedDict()
+        )
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client (created on first use)"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._http_client
+
+    def get_provider(
+        self,
+        model: str,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        **kwargs: Any,
+    ) -> LLMProvider:
+        """
+        Get or create the provider for (model, base_url, api_key)
+
+        Args:
+            model: Model name
+            api_key: API key
+            base_url: Base URL for OpenAI-compatible APIs
+            **kwargs: Extra provider options (only used when the provider is created)
+
+        Returns:
+            Shared provider instance
+        """
+        key = (model, base_url, api_key)
+        provider = self._providers.get(key)
+        if provider is not None:
+            self._providers.move_to_end(key)
+            return provider
+
+        provider = OpenAIProvider(
+            model=model,
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self.http_client,
+            **kwargs,
+        )
+        self._providers[key] = provider
+        logger.debug(f"Created pooled provider for {model} ({base_url or 'default'})")
+        while len(self._providers) > self.max_size:
+            self._providers.popitem(last=False)
+        return provider
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and forget all providers"""
+        self._providers.clear()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+# Global provider pool
+_provider_pool: ProviderPool | None = None
+
+
+def get_provider_pool() -> ProviderPool:
+    """Get global provider pool"""
+    global _provider_pool
+    if _provider_pool is None:
+        _provider_pool = ProviderPool()
+    return _provider_pool
+
+
+def configure_provider_pool(**kwargs: Any) -> ProviderPool:
+    """
+    Replace the global provider pool
+
+    Args:
+        **kwargs: ProviderPool arguments (connection limits, timeout)
+
+    Returns:
+        The new global ProviderPool
+    """
+    global _provider_pool
+    _provider_pool = ProviderPool(**kwargs)
+    return _provider_pool
@@ -2,7 +2,16 @@
 Session and global queuing for concurrent request management
 """
 
+from .fair import DEFAULT_WEIGHTS, FairLane, Priority
 from .lane import Lane
-from .queue import QueueManager
+from .queue import QueueManager, configure_queue_manager, get_queue_manager
 
-__all__ = ["Lane", "QueueManager"]
+__all__ = [
+    "Lane",
+    "FairLane",
+    "Priority",
+    "DEFAULT_WEIGHTS",
+    "QueueManager",
+    "get_queue_manager",
+    "configure_queue_manager",
+]
@@ -0,0 +1,262 @@
+"""
+Weighted-fair lane with priority classes and per-tenant fairness
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from collections.abc import Callable, Coroutine
+from enum import Enum
+from typing import Any, TypeVar
+
+from .lane import Lane
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(str, Enum):
+    """Priority class of queued work"""
+
+    INTERACTIVE = "interactive"  # A person is waiting on the reply
+    BACKGROUND = "background"  # Long-running or batch work
+    CRON = "cron"  # Scheduled triggers
+
+
+DEFAULT_WEIGHTS: dict[Priority, int] = {
+    Priority.INTERACTIVE: 8,
+    Priority.BACKGROUND: 2,
+    Priority.CRON: 1,
+}
+
+
+class _ClassQueue:
+    """Waiters of one priority class, grouped by tenant"""
+
+    def __init__(self, weight: int):
+        self.weight = weight
+        # Stride-scheduling pass: advanced by 1/weight per dispatch
+        self.pass_value = 0.0
+        self.tenants: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self.size = 0
+
+    def push(self, tenant: str, waiter: asyncio.Future) -> None:
+        queue = self.tenants.get(tenant)
+        if queue is None:
+            queue = self.tenants[tenant] = deque()
+        queue.append(waiter)
+        self.size += 1
+
+    def pop(self) -> asyncio.Future:
+        """Take the next waiter, rotating round-robin over tenants"""
+        tenant, queue = next(iter(self.tenants.items()))
+        waiter = queue.popleft()
+        if queue:
+            self.tenants.move_to_end(tenant)
+        else:
+            del self.tenants[tenant]
+        self.size -= 1
+        return waiter
+
+    def remove(self, tenant: str, waiter: asyncio.Future) -> bool:
+        queue = self.tenants.get(tenant)
+        if queue is None:
+            return False
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return False
+        if not queue:
+            del self.tenants[tenant]
+        self.size -= 1
+        return True
+
+
+class FairLane(Lane):
+    """
+    Lane that shares its slots fairly instead of first-come first-served
+
+    Freed slots go to priority classes in proportion to their weights
+    (stride scheduling), and within a class round-robin across tenants
+    (API key, channel or session). A flood of background or cron work from
+    one tenant therefore cannot starve interactive turns or other tenants:
+    with the default weights, interactive traffic gets 8 of every 11 slots
+    whenever all classes are backlogged, and any share a class does not
+    use goes to the others.
+
+    Example:
+        lane = FairLane("global", max_concurrent=10)
+        async with lane.slot(tenant="key-1", priority=Priority.CRON):
+            ...
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = 1,
+        weights: dict[Priority, int] | None = None,
+        on_idle: Callable[[Lane], None] | None = None,
+    ):
+        """
+        Initialize fair lane
+
+        Args:
+            name: Lane identifier
+            max_concurrent: Maximum concurrent tasks
+            weights: Relative share per priority class (default: DEFAULT_WEIGHTS)
+            on_idle: Called whenever the lane becomes idle
+        """
+        super().__init__(name, max_concurrent, on_idle=on_idle)
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self._classes = {priority: _ClassQueue(max(1, weights[priority])) for priority in Priority}
+        self._queued = 0
+        # Pass value of the most recently dispatched class
+        self._vtime = 0.0
+
+    @property
+    def queued(self) -> int:
+        """Number of tasks waiting for a slot"""
+        return self._queued
+
+    @property
+    def is_idle(self) -> bool:
+        """Whether nothing is running or waiting"""
+        return self.active == 0 and self._queued == 0
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot if one is free right now, without queueing
+
+        Returns:
+            True if a slot was taken (pair with release())
+        """
+        if self.active < self.max_concurrent and self._queued == 0:
+            self._take_slot()
+            return True
+        return False
+
+    async def acquire(
+        self, tenant: str | None = None, priority: Priority = Priority.INTERACTIVE
+    ) -> None:
+        """
+        Wait for a slot in this lane
+
+        Args:
+            tenant: Fairness key (API key, channel, session); None shares one queue
+            priority: Priority class of the work
+        """
+        if self.try_acquire():
+            return
+
+        tenant = tenant or ""
+        queue = self._classes[Priority(priority)]
+        if queue.size == 0:
+            # A class returning from idle does not get credit for time it was away
+            queue.pass_value = max(queue.pass_value, self._vtime)
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.push(tenant, waiter)
+        self._queued += 1
+        self._idle.clear()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; pass it on
+                self.release()
+            elif queue.remove(tenant, waiter):
+                self._queued -= 1
+                if self.is_idle:
+                    self._mark_idle()
+            raise
+
+    def release(self) -> None:
+        """Release a slot, handing it to the next waiter in fair order"""
+        while self._queued:
+            waiter = self._pop_next()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self.active -= 1
+        if self.active == 0:
+            self._mark_idle()
+
+    def slot(
+        self, tenant: str | None = None, priority: Priority = Priority.INTERACTIVE
+    ) -> "_FairSlot":
+        """Context manager holding a slot for a tenant and priority"""
+        return _FairSlot(self, tenant, priority)
+
+    async def enqueue(
+        self,
+        task: Callable[[], Coroutine[Any, Any, T]],
+        timeout: float | None = None,
+        tenant: str | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> T:
+        """
+        Enqueue a task for execution
+
+        Args:
+            task: Async function to execute
+            timeout: Optional timeout in seconds (covers waiting and execution)
+            tenant: Fairness key
+            priority: Priority class
+
+        Returns:
+            Task result
+        """
+
+        async def run() -> T:
+            async with self.slot(tenant, priority):
+                return await task()
+
+        try:
+            if timeout:
+                return await asyncio.wait_for(run(), timeout=timeout)
+            return await run()
+        except TimeoutError:
+            logger.error(f"Task timed out in lane {self.name}")
+            raise
+
+    def _pop_next(self) -> asyncio.Future:
+        """Dequeue from the backlogged class with the lowest pass value"""
+        queue = min(
+            (q for q in self._classes.values() if q.size),
+            key=lambda q: q.pass_value,
+        )
+        self._vtime = queue.pass_value
+        queue.pass_value += 1.0 / queue.weight
+        self._queued -= 1
+        return queue.pop()
+
+    def get_stats(self) -> dict:
+        """Get lane statistics"""
+        stats = super().get_stats()
+        stats["classes"] = {
+            priority.value: {
+                "weight": queue.weight,
+                "queued": queue.size,
+                "tenants": len(queue.tenants),
+            }
+            for priority, queue in self._classes.items()
+        }
+        return stats
+
+
+class _FairSlot:
+    """Async context manager for FairLane.slot()"""
+
+    def __init__(self, lane: FairLane, tenant: str | None, priority: Priority):
+        self.lane = lane
+        self.tenant = tenant
+        self.priority = priority
+
+    async def __aenter__(self) -> FairLane:
+        await self.lane.acquire(self.tenant, self.priority)
+        return self.lane
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.lane.release()
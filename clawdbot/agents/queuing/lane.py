@@ -4,6 +4,8 @@ Queue lane for managing concurrent execution
 
 import asyncio
 import logging
+import time
+from collections import deque
 from collections.abc import Callable, Coroutine
 from typing import Any, TypeVar
 
@@ -18,22 +20,46 @@ class Lane:
 
     Lanes ensure that tasks are executed in order or with limited
     concurrency, preventing race conditions and managing resources.
+
+    Scheduling is event-driven: there is no worker task. A task runs
+    immediately if a slot is free, otherwise it waits in FIFO order and is
+    handed the slot the moment a running task finishes. An idle lane holds
+    no tasks, timers or wakeups.
     """
 
-    def __init__(self, name: str, max_concurrent: int = 1):
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = 1,
+        on_idle: Callable[["Lane"], None] | None = None,
+    ):
         """
         Initialize lane
 
         Args:
             name: Lane identifier
             max_concurrent: Maximum concurrent tasks (1 = sequential)
+            on_idle: Called whenever the lane becomes idle (nothing running or queued)
         """
         self.name = name
         self.max_concurrent = max_concurrent
-        self.queue: asyncio.Queue = asyncio.Queue()
         self.active = 0
-        self._worker_task: asyncio.Task | None = None
-        self._running = False
+        self.on_idle = on_idle
+        self.last_active = time.monotonic()
+
+        self._waiters: deque[asyncio.Future] = deque()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def queued(self) -> int:
+        """Number of tasks waiting for a slot"""
+        return len(self._waiters)
+
+    @property
+    def is_idle(self) -> bool:
+        """Whether nothing is running or waiting"""
+        return self.active == 0 and not self._waiters
 
     async def enqueue(
         self, task: Callable[[], Coroutine[Any, Any, T]], timeout: float | None = None
@@ -43,86 +69,106 @@ class Lane:
 
         Args:
             task: Async function to execute
-            timeout: Optional timeout in seconds
+            timeout: Optional timeout in seconds (covers waiting and execution;
+                the task is cancelled when it expires)
 
         Returns:
             Task result
         """
-        # Create future for result
-        future: asyncio.Future[T] = asyncio.Future()
-
-        # Add to queue
-        await self.queue.put((task, future))
-
-        # Start worker if not running
-        if not self._running:
-            self._start_worker()
-
-        # Wait for result
         try:
             if timeout:
-                return await asyncio.wait_for(future, timeout=timeout)
-            else:
-                return await future
+                return await asyncio.wait_for(self._run(task), timeout=timeout)
+            return await self._run(task)
         except TimeoutError:
             logger.error(f"Task timed out in lane {self.name}")
             raise
 
-    def _start_worker(self) -> None:
-        """Start background worker"""
-        if self._worker_task is None or self._worker_task.done():
-            self._running = True
-            self._worker_task = asyncio.create_task(self._worker())
+    def try_acquire(self) -> bool:
+        """
+        Take a slot if one is free right now, without queueing
 
-    async def _worker(self) -> None:
-        """Background worker that processes queue"""
-        logger.debug(f"Lane {self.name} worker started")
+        Returns:
+            True if a slot was taken (pair with release())
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self._take_slot()
+            return True
+        return False
 
+    async def acquire(self) -> None:
+        """
+        Wait for a slot in this lane (FIFO)
+
+        Must be paired with release(). Prefer enqueue() or ``async with lane``.
+        """
+        if self.try_acquire():
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._idle.clear()
         try:
-            while self._running:
-                try:
-                    # Get next task (with timeout to check _running)
-                    task, future = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-
-                    # Wait if max concurrent reached
-                    while self.active >= self.max_concurrent:
-                        await asyncio.sleep(0.1)
-
-                    # Execute task
-                    self.active += 1
-                    asyncio.create_task(self._execute_task(task, future))
-
-                except TimeoutError:
-                    # Check if queue is empty and no active tasks
-                    if self.queue.empty() and self.active == 0:
-                        self._running = False
-                        break
-
-        except Exception as e:
-            logger.error(f"Lane {self.name} worker error: {e}")
-        finally:
-            logger.debug(f"Lane {self.name} worker stopped")
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; pass it on
+                self.release()
+            else:
+                self._remove_waiter(waiter)
+            raise
 
-    async def _execute_task(
-        self, task: Callable[[], Coroutine[Any, Any, T]], future: asyncio.Future[T]
-    ) -> None:
-        """Execute a single task"""
+    def release(self) -> None:
+        """Release a slot, handing it directly to the next waiter"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Slot ownership moves to the waiter; active stays the same
+                waiter.set_result(None)
+                return
+
+        self.active -= 1
+        if self.active == 0:
+            self._mark_idle()
+
+    async def __aenter__(self) -> "Lane":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    async def _run(self, task: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """Acquire a slot, run the task, release the slot"""
+        await self.acquire()
         try:
-            result = await task()
-            if not future.done():
-                future.set_result(result)
-        except Exception as e:
-            if not future.done():
-                future.set_exception(e)
+            return await task()
         finally:
-            self.active -= 1
-            self.queue.task_done()
+            self.release()
+
+    def _take_slot(self) -> None:
+        """Claim a free slot"""
+        self.active += 1
+        self._idle.clear()
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        """Drop a cancelled waiter from the queue"""
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        if self.is_idle:
+            self._mark_idle()
+
+    def _mark_idle(self) -> None:
+        """Record that the lane became idle and notify the owner"""
+        self.last_active = time.monotonic()
+        self._idle.set()
+        if self.on_idle is not None:
+            self.on_idle(self)
 
     async def stop(self) -> None:
-        """Stop the worker"""
-        self._running = False
-        if self._worker_task:
-            await self._worker_task
+        """Wait until all running and queued tasks have finished"""
+        await self._idle.wait()
 
     def get_stats(self) -> dict:
         """Get lane statistics"""
@@ -130,6 +176,6 @@ class Lane:
             "name": self.name,
             "max_concurrent": self.max_concurrent,
             "active": self.active,
-            "queued": self.queue.qsize(),
-            "running": self._running,
+            "queued": self.queued,
+            "running": not self.is_idle,
         }
@@ -2,11 +2,14 @@
 Queue manager for session and global lanes
 """
 
+import asyncio
 import hashlib
 import logging
+import time
 from collections.abc import Callable, Coroutine
 from typing import Any, TypeVar
 
+from .fair import FairLane, Priority
 from .lane import Lane
 
 logger = logging.getLogger(__name__)
@@ -20,23 +23,35 @@ class QueueManager:
 
     Features:
     - Per-session sequential execution (prevents conflicts)
-    - Global concurrent limit (resource management)
-    - Automatic lane creation and cleanup
+    - Global concurrent limit (resource management), shared weighted-fairly
+      across priority classes and tenants
+    - Automatic lane creation and cleanup (idle session lanes are reaped
+      after ``idle_ttl`` seconds)
     """
 
-    def __init__(self, max_concurrent_per_session: int = 1, max_concurrent_global: int = 10):
+    def __init__(
+        self,
+        max_concurrent_per_session: int = 1,
+        max_concurrent_global: int = 10,
+        idle_ttl: float = 60.0,
+        priority_weights: dict[Priority, int] | None = None,
+    ):
         """
         Initialize queue manager
 
         Args:
             max_concurrent_per_session: Max concurrent per session
             max_concurrent_global: Max concurrent globally
+            idle_ttl: Seconds an idle session lane is kept before it is reaped
+            priority_weights: Global lane share per priority class
         """
         self.max_concurrent_per_session = max_concurrent_per_session
         self.max_concurrent_global = max_concurrent_global
+        self.idle_ttl = idle_ttl
 
         self._session_lanes: dict[str, Lane] = {}
-        self._global_lane = Lane("global", max_concurrent_global)
+        self._global_lane = FairLane("global", max_concurrent_global, weights=priority_weights)
+        self._reaped = 0
 
     def get_session_lane(self, session_id: str) -> Lane:
         """
@@ -51,12 +66,20 @@ class QueueManager:
         if session_id not in self._session_lanes:
             # Create deterministic lane name
             lane_name = f"session-{self._hash_session_id(session_id)}"
-            self._session_lanes[session_id] = Lane(lane_name, self.max_concurrent_per_session)
+            lane = Lane(
+                lane_name,
+                self.max_concurrent_per_session,
+                on_idle=lambda lane, sid=session_id: self._schedule_reap(sid, lane),
+            )
+            self._session_lanes[session_id] = lane
             logger.debug(f"Created lane for session: {session_id}")
 
+            # Reap the lane even if it is never used
+            self._schedule_reap(session_id, lane)
+
         return self._session_lanes[session_id]
 
-    def get_global_lane(self) -> Lane:
+    def get_global_lane(self) -> FairLane:
         """Get global lane"""
         return self._global_lane
 
@@ -81,7 +104,11 @@ class QueueManager:
         return await lane.enqueue(task, timeout)
 
     async def enqueue_global(
-        self, task: Callable[[], Coroutine[Any, Any, T]], timeout: float | None = None
+        self,
+        task: Callable[[], Coroutine[Any, Any, T]],
+        timeout: float | None = None,
+        tenant: str | None = None,
+        priority: Priority = Priority.INTERACTIVE,
     ) -> T:
         """
         Enqueue task in global lane
@@ -89,17 +116,21 @@ class QueueManager:
         Args:
             task: Async function to execute
             timeout: Optional timeout
+            tenant: Fairness key (API key, channel or session)
+            priority: Priority class
 
         Returns:
             Task result
         """
-        return await self._global_lane.enqueue(task, timeout)
+        return await self._global_lane.enqueue(task, timeout, tenant=tenant, priority=priority)
 
     async def enqueue_both(
         self,
         session_id: str,
         task: Callable[[], Coroutine[Any, Any, T]],
         timeout: float | None = None,
+        tenant: str | None = None,
+        priority: Priority = Priority.INTERACTIVE,
     ) -> T:
         """
         Enqueue task in both session and global lanes
@@ -112,6 +143,8 @@ class QueueManager:
             session_id: Session identifier
             task: Async function to execute
             timeout: Optional timeout
+            tenant: Fairness key in the global lane (default: session_id)
+            priority: Priority class in the global lane
 
         Returns:
             Task result
@@ -120,7 +153,9 @@ class QueueManager:
 
         # Enqueue in session lane, which then enqueues in global
         async def wrapped_task():
-            return await self._global_lane.enqueue(task, timeout)
+            return await self._global_lane.enqueue(
+                task, timeout, tenant=tenant or session_id, priority=priority
+            )
 
         return await session_lane.enqueue(wrapped_task, timeout)
 
@@ -134,7 +169,8 @@ class QueueManager:
         if session_id in self._session_lanes:
             lane = self._session_lanes[session_id]
             await lane.stop()
-            del self._session_lanes[session_id]
+            if self._session_lanes.get(session_id) is lane:
+                del self._session_lanes[session_id]
             logger.debug(f"Cleaned up lane for session: {session_id}")
 
     def get_stats(self) -> dict:
@@ -143,8 +179,59 @@ class QueueManager:
             "global": self._global_lane.get_stats(),
             "sessions": {sid: lane.get_stats() for sid, lane in self._session_lanes.items()},
             "total_sessions": len(self._session_lanes),
+            "reaped_sessions": self._reaped,
         }
 
+    def _schedule_reap(self, session_id: str, lane: Lane) -> None:
+        """Arrange for an idle session lane to be dropped after idle_ttl"""
+        if self.idle_ttl <= 0:
+            self._reap(session_id, lane)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop yet; the lane is reaped after its first use
+            return
+        loop.call_later(self.idle_ttl, self._reap, session_id, lane)
+
+    def _reap(self, session_id: str, lane: Lane) -> None:
+        """Drop a session lane if it is still idle and has been for idle_ttl"""
+        if self._session_lanes.get(session_id) is not lane or not lane.is_idle:
+            return
+        # A newer idle period has its own timer
+        if time.monotonic() - lane.last_active < self.idle_ttl * 0.99:
+            return
+        del self._session_lanes[session_id]
+        self._reaped += 1
+        logger.debug(f"Reaped idle lane for session: {session_id}")
+
     def _hash_session_id(self, session_id: str) -> str:
         """Create short hash of session ID"""
         return hashlib.md5(session_id.encode()).hexdigest()[:8]
+
+
+# Global queue manager
+_queue_manager: QueueManager | None = None
+
+
+def get_queue_manager() -> QueueManager:
+    """Get global queue manager"""
+    global _queue_manager
+    if _queue_manager is None:
+        _queue_manager = QueueManager()
+    return _queue_manager
+
+
+def configure_queue_manager(**kwargs: Any) -> QueueManager:
+    """
+    Replace the global queue manager
+
+    Args:
+        **kwargs: QueueManager arguments (concurrency limits, idle_ttl)
+
+    Returns:
+        The new global QueueManager
+    """
+    global _queue_manager
+    _queue_manager = QueueManager(**kwargs)
+    return _queue_manager
@@ -3,26 +3,35 @@ Enhanced Agent runtime with multi-provider support
 """
 
 import asyncio
+import contextlib
+import json
 import logging
 import time
+from collections import OrderedDict
 from collections.abc import AsyncIterator
 from typing import Any
 
+from ..monitoring.metrics import get_metrics
 from .auth import AuthProfile, ProfileStore, RotationManager
 from .compaction import CompactionManager, CompactionStrategy, TokenAnalyzer
 from .context import ContextManager
 from .errors import classify_error, format_error_message, is_retryable_error
 from .failover import FailoverReason, FallbackChain, FallbackManager
 from .formatting import FormatMode, ToolFormatter
+from .persistence import BlobStore
 from .providers import (
-    LLMMessage,
     LLMProvider,
     OpenAIProvider,
+    ProviderPool,
+    get_provider_pool,
 )
-from .queuing import QueueManager
+from .queuing import Lane, Priority, QueueManager
 from .session import Session
+from .summarization import BackgroundSummarizer, MessageSummarizer
 from .thinking import ThinkingExtractor, ThinkingMode
 from .tools.base import AgentTool
+from .tools.registry import format_tool_schema
+from .tools.tool_output import READ_TOOL_OUTPUT, offload_output
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +44,55 @@ class AgentEvent:
         self.data = data
 
 
+class _SummaryProvider:
+    """
+    Provider used by a runtime's background summarizer
+
+    Each call goes through the runtime's fallback chain and holds a slot of
+    the global lane at BACKGROUND priority while it runs, so summaries
+    count against the provider concurrency cap. Responses are buffered
+    until the call completes; summaries are not streamed to anyone.
+    """
+
+    # Fairness key of background summaries in the global lane
+    TENANT = "background-summary"
+
+    def __init__(self, runtime: "MultiProviderRuntime"):
+        self.runtime = runtime
+
+    async def stream(self, messages: list[Any], **kwargs: Any) -> AsyncIterator[Any]:
+        runtime = self.runtime
+        models = runtime._fallback_models()
+        global_lane = runtime.queue_manager.get_global_lane() if runtime.queue_manager else None
+
+        for index, model in enumerate(models):
+            responses = []
+            try:
+                async with (
+                    global_lane.slot(self.TENANT, Priority.BACKGROUND)
+                    if global_lane is not None
+                    else contextlib.nullcontext()
+                ):
+                    async for response in runtime._provider_for(model).stream(
+                        messages=messages, **kwargs
+                    ):
+                        if response.type == "error":
+                            raise Exception(response.content)
+                        responses.append(response)
+                        if response.type == "done":
+                            break
+            except Exception as e:
+                manager = runtime.fallback_manager
+                if manager is None or not manager.should_failover(e)[0] or index + 1 == len(models):
+                    raise
+                logger.info(f"Background summary failing over from {model} to {models[index + 1]}")
+                continue
+
+            for response in responses:
+                yield response
+            return
+
+
 class MultiProviderRuntime:
     """
     Enhanced Agent runtime with support for OpenAI-compatible providers
@@ -67,6 +125,12 @@ class MultiProviderRuntime:
         enable_queuing: bool = False,
         tool_format: FormatMode = FormatMode.MARKDOWN,
         compaction_strategy: CompactionStrategy = CompactionStrategy.KEEP_IMPORTANT,
+        max_parallel_tools: int = 4,
+        tool_offload_threshold: int = 8000,
+        tool_offload_preview: int = 2000,
+        tool_registry: Any | None = None,
+        provider_pool: ProviderPool | None = None,
+        queue_manager: QueueManager | None = None,
         **kwargs,
     ):
         self.model_str = model
@@ -75,12 +139,15 @@ class MultiProviderRuntime:
         self.max_retries = max_retries
         self.enable_context_management = enable_context_management
         self.extra_params = kwargs
+        # Shared providers/connection pools (None creates a private provider)
+        self.provider_pool = provider_pool
 
         # Parse provider and model
         self.provider_name, self.model_name = self._parse_model(model)
 
-        # Initialize provider
+        # Initialize provider (fallback models get theirs on first use)
         self.provider = self._create_provider()
+        self._fallback_providers: dict[str, LLMProvider] = {}
 
         # Initialize context manager
         if enable_context_management:
@@ -107,12 +174,32 @@ class MultiProviderRuntime:
                 store.add_profile(profile)
             self.auth_rotation = RotationManager(store)
 
-        # Queuing
-        self.queue_manager = QueueManager() if enable_queuing else None
+        # Queuing (a shared manager serializes sessions across runtimes)
+        if queue_manager is None and enable_queuing:
+            queue_manager = QueueManager()
+        self.queue_manager = queue_manager
+        metrics = get_metrics()
+        self._queue_wait = {
+            kind: metrics.histogram(
+                "agent_queue_wait_seconds", "Time turns wait for a queue slot", labels={"lane": kind}
+            )
+            for kind in ("session", "global")
+        }
 
         # Tool formatting
         self.tool_formatter = ToolFormatter(tool_format)
 
+        # Maximum tool calls from one assistant message running at once
+        self.max_parallel_tools = max(1, max_parallel_tools)
+
+        # Tool outputs longer than this (in characters) are stored in the
+        # workspace blob store; the session keeps a preview and the handle
+        self.tool_offload_threshold = tool_offload_threshold
+        self.tool_offload_preview = tool_offload_preview
+
+        # ToolRegistry whose cached schemas are used for its own tools
+        self.tool_registry = tool_registry
+
         # Advanced compaction
         self.compaction_strategy = compaction_strategy
         if self.context_manager:
@@ -122,6 +209,13 @@ class MultiProviderRuntime:
             self.token_analyzer = None
             self.compaction_manager = None
 
+        # Rolling summaries, prepared between turns for the SUMMARIZE strategy
+        self.background_summarizer = None
+        if self.compaction_manager and compaction_strategy == CompactionStrategy.SUMMARIZE:
+            self.background_summarizer = BackgroundSummarizer(
+                MessageSummarizer(_SummaryProvider(self)), self.compaction_manager
+            )
+
     def _parse_model(self, model: str) -> tuple[str, str]:
         """
         Parse model string into provider and model name
@@ -138,28 +232,59 @@ class MultiProviderRuntime:
             # Default to openai-compatible
             return "openai-compatible", model
 
-    def _create_provider(self) -> LLMProvider:
-        """Create appropriate provider based on provider name"""
-        provider_name = self.provider_name.lower()
-
+    def _create_provider(self, model_name: str | None = None) -> LLMProvider:
+        """Create appropriate provider for a model name (default: the runtime's model)"""
         # Common parameters
         kwargs = {
-            "model": self.model_name,
+            "model": model_name or self.model_name,
             "api_key": self.api_key,
             "base_url": self.base_url,
             **self.extra_params,
         }
 
+        # Reuse pooled provider (and its HTTP connections) when available
+        if self.provider_pool is not None:
+            return self.provider_pool.get_provider(**kwargs)
+
         # Create provider
         # Always return OpenAIProvider for compatibility
         return OpenAIProvider(**kwargs)
 
+    def _fallback_models(self) -> list[str]:
+        """Models tried in order when provider calls fail (the runtime's model first)"""
+        return self.fallback_chain.get_models() if self.fallback_chain else [self.model_str]
+
+    def _provider_for(self, model: str) -> LLMProvider:
+        """
+        Get the provider for a model of the fallback chain
+
+        The runtime's own provider and model are never replaced, since a
+        pooled runtime serves concurrent turns; failover picks the provider
+        per turn instead.
+
+        Args:
+            model: Model string (provider/model format)
+
+        Returns:
+            Provider for the model
+        """
+        if model == self.model_str:
+            return self.provider
+        provider = self._fallback_providers.get(model)
+        if provider is None:
+            _, model_name = self._parse_model(model)
+            provider = self._create_provider(model_name)
+            self._fallback_providers[model] = provider
+        return provider
+
     async def run_turn(
         self,
         session: Session,
         message: str,
         tools: list[AgentTool] | None = None,
         max_tokens: int = 4096,
+        priority: Priority = Priority.INTERACTIVE,
+        tenant: str | None = None,
     ) -> AsyncIterator[AgentEvent]:
         """
         Run an agent turn with the configured provider
@@ -178,6 +303,8 @@ class MultiProviderRuntime:
             message: User message
             tools: Optional list of tools
             max_tokens: Maximum tokens to generate
+            priority: Priority class for the global queue (e.g. CRON for scheduled turns)
+            tenant: Fairness key for the global queue (default: session id)
 
         Yields:
             AgentEvent objects
@@ -185,26 +312,70 @@ class MultiProviderRuntime:
         if tools is None:
             tools = []
 
-        # Wrap in queue if enabled
-        if self.queue_manager:
-
-            async def queued_execution():
-                async for event in self._run_turn_internal(session, message, tools, max_tokens):
+        # Keep the session in the manager's cache while the turn is running
+        session.pin()
+        session_lane = None
+        try:
+            if self.queue_manager:
+                # One turn per session at a time; later messages wait in order
+                lane = self.queue_manager.get_session_lane(session.session_id)
+                async for event in self._acquire_lane(lane, "session"):
                     yield event
-
-            # This is a generator, need to handle differently
-            async for event in self._run_turn_internal(session, message, tools, max_tokens):
-                yield event
-        else:
-            async for event in self._run_turn_internal(session, message, tools, max_tokens):
+                session_lane = lane
+
+            async for event in self._run_turn_internal(
+                session, message, tools, max_tokens, priority, tenant or session.session_id
+            ):
+                if event.type == "lifecycle" and event.data.get("phase") == "end":
+                    # Persist write-behind state before the client sees the turn end
+                    await session.flush()
                 yield event
 
+            if self.background_summarizer and self.enable_context_management:
+                # Summarize aged-out messages off the critical path of the next turn
+                self.background_summarizer.schedule(session, self._compaction_target())
+        finally:
+            if session_lane is not None:
+                session_lane.release()
+            session.unpin()
+
+    def _compaction_target(self) -> int:
+        """Token count compaction reduces the history to (70% of the window)"""
+        return int(self.context_manager.max_tokens * 0.7)
+
+    async def _acquire_lane(
+        self, lane: Lane, kind: str, **acquire_kwargs: Any
+    ) -> AsyncIterator[AgentEvent]:
+        """
+        Take a slot in a queue lane, reporting the queue position while waiting
+
+        The slot is held once iteration finishes; the caller must release it.
+        Nothing is held if the consumer stops while the "queue" event is pending.
+
+        Args:
+            lane: Lane to enter
+            kind: Lane kind for events and metrics ("session" or "global")
+            **acquire_kwargs: Passed to lane.acquire() (tenant/priority for fair lanes)
+
+        Yields:
+            A "queue" event if the lane is busy
+        """
+        started = time.monotonic()
+        if not lane.try_acquire():
+            yield AgentEvent(
+                "queue", {"lane": kind, "position": lane.queued + 1, "active": lane.active}
+            )
+            await lane.acquire(**acquire_kwargs)
+        self._queue_wait[kind].observe(time.monotonic() - started)
+
     async def _run_turn_internal(
         self,
         session: Session,
         message: str,
         tools: list[AgentTool],
         max_tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+        tenant: str | None = None,
     ) -> AsyncIterator[AgentEvent]:
         """Internal run turn implementation"""
         # Add user message if not empty
@@ -213,43 +384,47 @@ class MultiProviderRuntime:
 
         # Check context window and compact if needed
         if self.compaction_manager and self.enable_context_management:
-            messages_for_api = session.get_messages_for_api()
-            current_tokens = self.token_analyzer.estimate_messages_tokens(messages_for_api)
+            # Counts and prefix sums are maintained as messages are added,
+            # so this check is O(1) and compaction never re-counts content
+            index = session.token_index(self.token_analyzer.tokenizer)
+            current_tokens = index.total
             window = self.context_manager.check_context(current_tokens)
 
             if window.should_compress:
                 logger.info(f"Context at {current_tokens}/{window.total_tokens} tokens, compacting")
                 # Use advanced compaction
-                target_tokens = int(window.total_tokens * 0.7)  # Use 70% of window
-                compacted = self.compaction_manager.compact(messages_for_api, target_tokens)
-
-                # Update session with compacted messages
-                # Convert back to Message objects
-                from .session import Message
-
-                session.messages = [
-                    Message(
-                        role=m["role"],
-                        content=m["content"],
-                        tool_calls=m.get("tool_calls"),
-                        tool_call_id=m.get("tool_call_id"),
-                        name=m.get("name"),
-                    )
-                    for m in compacted
-                ]
+                target_tokens = self._compaction_target()
+                # A summary prepared after earlier turns is swapped in without an LLM call
+                if not (
+                    self.background_summarizer
+                    and self.background_summarizer.compact(session, target_tokens)
+                ):
+                    kept = self.compaction_manager.select(index, session.messages, target_tokens)
+
+                    # Keep the original Message objects (and their cached counts)
+                    session.replace_messages([session.messages[i] for i in kept])
 
                 yield AgentEvent(
                     "compaction",
                     {
                         "original_tokens": current_tokens,
-                        "compacted_tokens": self.token_analyzer.estimate_messages_tokens(compacted),
+                        "compacted_tokens": session.count_tokens(self.token_analyzer.tokenizer),
                         "strategy": self.compaction_strategy.value,
                     },
                 )
 
         yield AgentEvent("lifecycle", {"phase": "start"})
 
-        # Execute with retry logic and failover
+        # Format tools once per turn (cached by the registry across turns)
+        tools_param = self._format_tools(tools)
+
+        # Global cap on in-flight provider calls
+        global_lane = self.queue_manager.get_global_lane() if self.queue_manager else None
+        holding_global = False
+
+        # Execute with retry logic and failover (the model only changes for this turn)
+        models = self._fallback_models()
+        model_index = 0
         retry_count = 0
         thinking_state = {}  # State for streaming thinking extraction
 
@@ -267,217 +442,126 @@ class MultiProviderRuntime:
             while retry_count <= self.max_retries:
                 try:
                     # Get current model (may change with failover)
-                    current_model = self.model_str
+                    current_model = models[model_index]
+                    provider = self._provider_for(current_model)
                     if self.fallback_manager:
-                        current_model = self.fallback_manager.get_current_model()
                         logger.info(f"Using model: {current_model}")
 
-                    # Convert session messages to LLM format
-                    llm_messages = []
-                    for msg in session.get_messages():
-                        llm_messages.append(LLMMessage(
-                            role=msg.role, 
-                            content=msg.content,
-                            tool_calls=msg.tool_calls,
-                            tool_call_id=msg.tool_call_id,
-                            name=msg.name
-                        ))
-
-                    logger.info(f"Turn {turn_count} | Sending {len(llm_messages)} messages to provider")
-                    import json
-                    try:
-                        msgs_json = json.dumps([m.__dict__ for m in llm_messages], ensure_ascii=False)
-                        logger.info(f"Full Message History: {msgs_json}")
-                    except:
-                        pass
-
-                    # Format tools for provider
-                    tools_param = None
-                    if tools:
-                        tools_param = [
-                            {
-                                "type": "function",
-                                "function": {
-                                    "name": tool.name,
-                                    "description": tool.description,
-                                    "parameters": tool.get_schema(),
-                                },
-                            }
-                            for tool in tools
-                        ]
+                    # Provider-format history, extended incrementally by the session
+                    llm_messages = session.get_llm_messages()
+
+                    logger.debug(f"Turn {turn_count} | Sending {len(llm_messages)} messages to provider")
 
                     # Stream from provider
                     accumulated_text = ""
                     accumulated_thinking = ""
                     tool_calls = []
 
-                    async for response in self.provider.stream(
-                        messages=llm_messages, tools=tools_param, max_tokens=max_tokens
-                    ):
-                        if response.type == "text_delta":
-                            text = response.content
-                            accumulated_text += text
-
-                            # Extract thinking if enabled
-                            if self.thinking_mode != ThinkingMode.OFF and self.thinking_extractor:
-                                thinking_delta, content_delta = (
-                                    self.thinking_extractor.extract_streaming(text, thinking_state)
-                                )
-
-                                # Stream thinking separately if mode is STREAM
-                                if self.thinking_mode == ThinkingMode.STREAM and thinking_delta:
-                                    accumulated_thinking += thinking_delta
-                                    yield AgentEvent(
-                                        "thinking",
-                                        {"delta": {"text": thinking_delta}, "mode": "stream"},
-                                    )
-
-                                # Stream content (non-thinking text)
-                                if content_delta:
-                                    yield AgentEvent(
-                                        "assistant",
-                                        {"delta": {"type": "text_delta", "text": content_delta}},
-                                    )
-                            else:
-                                # No thinking extraction, stream as-is
-                                yield AgentEvent(
-                                    "assistant", {"delta": {"type": "text_delta", "text": text}}
-                                )
-
-                        elif response.type == "metadata":
-                            yield AgentEvent("metadata", response.content)
-
-                        elif response.type == "usage":
-                            yield AgentEvent("usage", response.content)
-
-                        elif response.type == "tool_call":
-                            tool_calls = response.tool_calls or []
-
-                            # CRITICAL: Save assistant message WITH tool_calls BEFORE executing tools
-                            # This satisfies LLM provider requirements: assistant(tool_calls) -> tool(result)
-                            # Use None if no text was generated to avoid Dashscope validation errors
-                            assistant_content = accumulated_text if accumulated_text else None
-                            logger.info(f"Saving assistant message with tool_calls: {tool_calls}")
-                            session.add_assistant_message(assistant_content, tool_calls)
-
-                            # Execute tools
-                            for tc in tool_calls:
-                                # Handle both internal and OpenAI-standard tool call formats
-                                tc_id = tc.get("id")
-                                tc_name = tc.get("name")
-                                if not tc_name and "function" in tc:
-                                    tc_name = tc["function"].get("name")
-                                
-                                tc_args = tc.get("arguments")
-                                if tc_args is None and "function" in tc:
-                                    tc_args = tc["function"].get("arguments")
-                                    # Parse arguments if string
-                                    if isinstance(tc_args, str):
-                                        import json
-                                        try:
-                                            tc_args = json.loads(tc_args)
-                                        except json.JSONDecodeError:
-                                            pass
-
-                                tool = next((t for t in tools if t.name == tc_name), None)
-                                if tool:
-                                    # Format tool use
-                                    formatted_use = self.tool_formatter.format_tool_use(
-                                        tc_name, tc_args
-                                    )
+                    # Hold a global slot only while the provider call is in flight
+                    if global_lane is not None:
+                        async for event in self._acquire_lane(
+                            global_lane, "global", tenant=tenant, priority=priority
+                        ):
+                            yield event
+                        holding_global = True
 
-                                    yield AgentEvent(
-                                        "tool_use",
-                                        {
-                                            "tool": tc_name,
-                                            "input": tc_args,
-                                            "formatted": formatted_use,
-                                        },
+                    try:
+                        async for response in provider.stream(
+                            messages=llm_messages, tools=tools_param, max_tokens=max_tokens
+                        ):
+                            if response.type == "text_delta":
+                                text = response.content
+                                accumulated_text += text
+
+                                # Extract thinking if enabled
+                                if self.thinking_mode != ThinkingMode.OFF and self.thinking_extractor:
+                                    thinking_delta, content_delta = (
+                                        self.thinking_extractor.extract_streaming(text, thinking_state)
                                     )
 
-                                    # Execute tool
-                                    tool_start_time = time.time()
-                                    try:
-                                        result = await tool.execute(tc_args or {})
-                                        tool_exec_ms = (time.time() - tool_start_time) * 1000
-                                        success = result.success if result else False
-                                        output = result.content if result else "No output"
-
-                                        # Format tool result
-                                        formatted_result = self.tool_formatter.format_tool_result(
-                                            tc_name, output, success
-                                        )
-
+                                    # Stream thinking separately if mode is STREAM
+                                    if self.thinking_mode == ThinkingMode.STREAM and thinking_delta:
+                                        accumulated_thinking += thinking_delta
                                         yield AgentEvent(
-                                            "tool_result",
-                                            {
-                                                "tool": tc_name,
-                                                "result": output,
-                                                "success": success,
-                                                "formatted": formatted_result,
-                                            },
-                                        )
-
-                                        # Add tool result to session
-                                        session.add_tool_message(
-                                            tool_call_id=tc_id, content=output, name=tc_name
-                                        )
-
-                                    except Exception as tool_error:
-                                        error_msg = str(tool_error)
-                                        formatted_error = self.tool_formatter.format_tool_result(
-                                            tc_name, error_msg, success=False
+                                            "thinking",
+                                            {"delta": {"text": thinking_delta}, "mode": "stream"},
                                         )
 
+                                    # Stream content (non-thinking text)
+                                    if content_delta:
                                         yield AgentEvent(
-                                            "tool_result",
-                                            {
-                                                "tool": tc_name,
-                                                "result": error_msg,
-                                                "success": False,
-                                                "error": error_msg,
-                                                "formatted": formatted_error,
-                                            },
+                                            "assistant",
+                                            {"delta": {"type": "text_delta", "text": content_delta}},
                                         )
-
-                                        session.add_tool_message(
-                                            tool_call_id=tc_id,
-                                            content=f"Error: {error_msg}",
-                                            name=tc_name,
-                                        )
-
-                        elif response.type == "done":
-                            # Extract thinking if ON mode
-                            final_text = accumulated_text
-                            if self.thinking_mode == ThinkingMode.ON and self.thinking_extractor:
-                                extracted = self.thinking_extractor.extract(accumulated_text)
-                                if extracted.has_thinking:
-                                    # Include thinking in response
+                                else:
+                                    # No thinking extraction, stream as-is
                                     yield AgentEvent(
-                                        "thinking", {"content": extracted.thinking, "mode": "on"}
+                                        "assistant", {"delta": {"type": "text_delta", "text": text}}
                                     )
-                                    final_text = extracted.content
-
-                            # Save assistant message only if it wasn't already saved during a tool call
-                            # Note: has_tool_calls is True if this OR A PREVIOUS turn had tool calls,
-                            # but here we care about whether THIS Specific response from the provider was a tool_call.
-                            # Actually, in the multi-turn loop, if a provider yields tool_call, we save it immediately.
-                            # If it yields done, it usually means it's the final answer.
-                            if not tool_calls:
-                                if final_text:
-                                    session.add_assistant_message(final_text)
-
-                            # Record success for fallback manager
-                            if self.fallback_manager:
-                                self.fallback_manager.record_success(current_model)
-
-                            if tool_calls:
-                                has_tool_calls = True
+
+                            elif response.type == "metadata":
+                                yield AgentEvent("metadata", response.content)
+
+                            elif response.type == "usage":
+                                yield AgentEvent("usage", response.content)
+
+                            elif response.type == "tool_call":
+                                tool_calls = response.tool_calls or []
+
+                                # CRITICAL: Save assistant message WITH tool_calls BEFORE executing tools
+                                # This satisfies LLM provider requirements: assistant(tool_calls) -> tool(result)
+                                # Use None if no text was generated to avoid Dashscope validation errors
+                                assistant_content = accumulated_text if accumulated_text else None
+                                logger.info(f"Saving assistant message with tool_calls: {tool_calls}")
+                                session.add_assistant_message(assistant_content, tool_calls)
+
+                                # Tools run without holding a provider slot
+                                if holding_global:
+                                    global_lane.release()
+                                    holding_global = False
+
+                                # Execute tools (independent calls run concurrently)
+                                async for event in self._execute_tool_calls(
+                                    session, tool_calls, tools
+                                ):
+                                    yield event
+
+                            elif response.type == "done":
+                                # Extract thinking if ON mode
+                                final_text = accumulated_text
+                                if self.thinking_mode == ThinkingMode.ON and self.thinking_extractor:
+                                    extracted = self.thinking_extractor.extract(accumulated_text)
+                                    if extracted.has_thinking:
+                                        # Include thinking in response
+                                        yield AgentEvent(
+                                            "thinking", {"content": extracted.thinking, "mode": "on"}
+                                        )
+                                        final_text = extracted.content
+
+                                # Save assistant message only if it wasn't already saved during a tool call
+                                # Note: has_tool_calls is True if this OR A PREVIOUS turn had tool calls,
+                                # but here we care about whether THIS Specific response from the provider was a tool_call.
+                                # Actually, in the multi-turn loop, if a provider yields tool_call, we save it immediately.
+                                # If it yields done, it usually means it's the final answer.
+                                if not tool_calls:
+                                    if final_text:
+                                        session.add_assistant_message(final_text)
+
+                                # Record success for fallback manager
+                                if self.fallback_manager:
+                                    self.fallback_manager.record_success(current_model)
+
+                                if tool_calls:
+                                    has_tool_calls = True
                             
-                            break
+                                break
 
-                        elif response.type == "error":
-                            raise Exception(response.content)
+                            elif response.type == "error":
+                                raise Exception(response.content)
+                    finally:
+                        if holding_global:
+                            global_lane.release()
+                            holding_global = False
 
                     # Success, exit retry loop
                     break
@@ -490,27 +574,23 @@ class MultiProviderRuntime:
                     if self.fallback_manager:
                         should_failover, failover_reason = self.fallback_manager.should_failover(e)
 
-                        if should_failover:
-                            next_model = self.fallback_manager.get_next_model()
-                            if next_model:
-                                logger.info(f"Failing over from {current_model} to {next_model}")
-
-                                # Update provider for new model
-                                self.provider_name, self.model_name = self._parse_model(next_model)
-                                self.provider = self._create_provider()
-
-                                yield AgentEvent(
-                                    "failover",
-                                    {
-                                        "from": current_model,
-                                        "to": next_model,
-                                        "reason": failover_reason.value,
-                                        "error": str(e),
-                                    },
-                                )
+                        if should_failover and model_index + 1 < len(models):
+                            model_index += 1
+                            next_model = models[model_index]
+                            logger.info(f"Failing over from {current_model} to {next_model}")
+
+                            yield AgentEvent(
+                                "failover",
+                                {
+                                    "from": current_model,
+                                    "to": next_model,
+                                    "reason": failover_reason.value,
+                                    "error": str(e),
+                                },
+                            )
 
-                                # Continue to next attempt (no sleep, immediate retry with new model)
-                                continue
+                            # Continue to next attempt (no sleep, immediate retry with new model)
+                            continue
 
                     # Check if retryable
                     if not is_retryable_error(e) and not should_failover:
@@ -560,6 +640,312 @@ class MultiProviderRuntime:
 
         yield AgentEvent("lifecycle", {"phase": "end"})
 
+    def _format_tools(self, tools: list[AgentTool]) -> list[dict[str, Any]] | None:
+        """Get provider function schemas for tools, from the registry cache when possible"""
+        if not tools:
+            return None
+        if self.tool_registry is not None and self.tool_registry.owns(tools):
+            return self.tool_registry.get_tool_schemas(tools).schemas
+        return [format_tool_schema(tool) for tool in tools]
+
+    @staticmethod
+    def _parse_tool_call(tc: dict[str, Any]) -> tuple[str | None, str | None, Any]:
+        """Extract (id, name, arguments) from internal or OpenAI-format tool calls"""
+        tc_id = tc.get("id")
+        tc_name = tc.get("name")
+        if not tc_name and "function" in tc:
+            tc_name = tc["function"].get("name")
+
+        tc_args = tc.get("arguments")
+        if tc_args is None and "function" in tc:
+            tc_args = tc["function"].get("arguments")
+            # Parse arguments if string
+            if isinstance(tc_args, str):
+                try:
+                    tc_args = json.loads(tc_args)
+                except json.JSONDecodeError:
+                    pass
+
+        return tc_id, tc_name, tc_args
+
+    async def _execute_tool_calls(
+        self,
+        session: Session,
+        tool_calls: list[dict[str, Any]],
+        tools: list[AgentTool],
+    ) -> AsyncIterator[AgentEvent]:
+        """
+        Execute the tool calls of one assistant message
+
+        Consecutive non-serial tools run concurrently (at most
+        ``max_parallel_tools`` at a time); a serial tool (``AgentTool.serial``)
+        waits for everything before it and blocks everything after it.
+        ``tool_use``/``tool_result`` events are yielded as calls start and
+        finish, while tool messages are added to the session in the original
+        call order. Large outputs are only offloaded when ``read_tool_output``
+        is among ``tools``, so the model can always dereference the handle.
+
+        Args:
+            session: Session receiving the tool messages
+            tool_calls: Tool calls from the assistant message
+            tools: Available tools
+
+        Yields:
+            tool_use and tool_result AgentEvents
+        """
+        calls = []
+        for tc in tool_calls:
+            tc_id, tc_name, tc_args = self._parse_tool_call(tc)
+            tool = next((t for t in tools if t.name == tc_name), None)
+            if tool:
+                calls.append((tc_id, tc_name, tc_args, tool))
+
+        if not calls:
+            return
+
+        can_offload = any(t.name == READ_TOOL_OUTPUT for t in tools)
+        events: asyncio.Queue[AgentEvent] = asyncio.Queue()
+        results: list[tuple[str, bool] | None] = [None] * len(calls)
+        semaphore = asyncio.Semaphore(self.max_parallel_tools)
+
+        async def run_call(index: int) -> None:
+            tc_id, tc_name, tc_args, tool = calls[index]
+            async with semaphore:
+                formatted_use = self.tool_formatter.format_tool_use(tc_name, tc_args)
+                events.put_nowait(
+                    AgentEvent(
+                        "tool_use",
+                        {"tool": tc_name, "input": tc_args, "formatted": formatted_use},
+                    )
+                )
+
+                try:
+                    result = await tool.execute(tc_args or {})
+                    success = result.success if result else False
+                    output = result.content if result else "No output"
+
+                    formatted_result = self.tool_formatter.format_tool_result(
+                        tc_name, output, success
+                    )
+                    event_data = {
+                        "tool": tc_name,
+                        "result": output,
+                        "success": success,
+                        "formatted": formatted_result,
+                    }
+                    if can_offload:
+                        output = await self._offload_tool_output(session, tool, output)
+                    results[index] = (output, success)
+
+                except Exception as tool_error:
+                    error_msg = str(tool_error)
+                    formatted_error = self.tool_formatter.format_tool_result(
+                        tc_name, error_msg, success=False
+                    )
+                    event_data = {
+                        "tool": tc_name,
+                        "result": error_msg,
+                        "success": False,
+                        "error": error_msg,
+                        "formatted": formatted_error,
+                    }
+                    results[index] = (f"Error: {error_msg}", False)
+
+                events.put_nowait(AgentEvent("tool_result", event_data))
+
+        async def schedule() -> None:
+            batch: list[int] = []
+            for index, call in enumerate(calls):
+                if getattr(call[3], "serial", False):
+                    if batch:
+                        await asyncio.gather(*(run_call(i) for i in batch))
+                        batch = []
+                    await run_call(index)
+                else:
+                    batch.append(index)
+            if batch:
+                await asyncio.gather(*(run_call(i) for i in batch))
+
+        runner = asyncio.create_task(schedule())
+        appended = 0
+        try:
+            while True:
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, runner}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    if events.empty():
+                        break
+                    continue
+
+                event = getter.result()
+                yield event
+
+                # Add results to the session as soon as every earlier call has one
+                while appended < len(calls) and results[appended] is not None:
+                    tc_id, tc_name, _, _ = calls[appended]
+                    output, _ = results[appended]
+                    session.add_tool_message(tool_call_id=tc_id, content=output, name=tc_name)
+                    appended += 1
+
+            # Surface unexpected scheduler errors
+            runner.result()
+        finally:
+            if not runner.done():
+                runner.cancel()
+
+    async def _offload_tool_output(self, session: Session, tool: AgentTool, output: str) -> str:
+        """
+        Store a large tool output out of band
+
+        Args:
+            session: Session receiving the tool message
+            tool: Tool that produced the output
+            output: Full output
+
+        Returns:
+            The output to keep in the session: unchanged if small, else a
+            preview with a handle for the read_tool_output tool
+        """
+        if (
+            not self.tool_offload_threshold
+            or not getattr(tool, "offload", True)
+            or not output
+            or len(output) <= self.tool_offload_threshold
+        ):
+            return output
+
+        store = BlobStore.for_workspace(session.workspace_dir)
+        try:
+            return await asyncio.to_thread(
+                offload_output, store, output, self.tool_offload_preview
+            )
+        except OSError as e:
+            logger.warning(f"Could not store output of {tool.name}, keeping it inline: {e}")
+            return output
+
 
 # Alias for backward compatibility
 AgentRuntime = MultiProviderRuntime
+
+
+class RuntimePool:
+    """
+    Bounded pool of runtimes keyed by (model, base_url, api_key)
+
+    Request handlers that need a runtime for a specific model get a shared
+    instance instead of constructing one per request. All runtimes use the
+    same ProviderPool, so provider clients and HTTP connections are reused,
+    including when a runtime fails over to another model.
+
+    ``runtime_defaults`` (e.g. max_parallel_tools, tool_offload_threshold,
+    enable_context_management) are fixed for the lifetime of the pool and
+    applied to every runtime it creates; they are not part of the pool key.
+    """
+
+    def __init__(
+        self,
+        provider_pool: ProviderPool | None = None,
+        max_size: int = 32,
+        queue_manager: QueueManager | None = None,
+        runtime_defaults: dict[str, Any] | None = None,
+    ):
+        """
+        Initialize runtime pool
+
+        Args:
+            provider_pool: Provider pool shared by all runtimes (default: global pool)
+            max_size: Maximum number of cached runtimes (least recently used are dropped)
+            queue_manager: Queue manager shared by all runtimes (None disables queuing)
+            runtime_defaults: Runtime options applied to every runtime created
+        """
+        self.provider_pool = provider_pool
+        self.max_size = max_size
+        self.queue_manager = queue_manager
+        self.runtime_defaults = dict(runtime_defaults or {})
+        self._runtimes: OrderedDict[tuple[str, str | None, str | None], MultiProviderRuntime] = (
+            OrderedDict()
+        )
+
+    def get(
+        self,
+        model: str,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        **kwargs,
+    ) -> MultiProviderRuntime:
+        """
+        Get or create the runtime for (model, base_url, api_key)
+
+        Args:
+            model: Model string
+            base_url: Base URL for OpenAI-compatible APIs
+            api_key: API key
+            **kwargs: Extra runtime options, over runtime_defaults (only used
+                when the runtime is created)
+
+        Returns:
+            Shared runtime instance
+        """
+        key = (model, base_url, api_key)
+        runtime = self._runtimes.get(key)
+        if runtime is not None:
+            self._runtimes.move_to_end(key)
+            return runtime
+
+        runtime = MultiProviderRuntime(
+            model=model,
+            api_key=api_key,
+            base_url=base_url,
+            provider_pool=self.provider_pool or get_provider_pool(),
+            queue_manager=self.queue_manager,
+            **{**self.runtime_defaults, **kwargs},
+        )
+        self._runtimes[key] = runtime
+        while len(self._runtimes) > self.max_size:
+            self._runtimes.popitem(last=False)
+        return runtime
+
+    def __len__(self) -> int:
+        return len(self._runtimes)
+
+
+# Global runtime pool
+_runtime_pool: RuntimePool | None = None
+
+
+def get_runtime_pool() -> RuntimePool:
+    """Get global runtime pool"""
+    global _runtime_pool
+    if _runtime_pool is None:
+        _runtime_pool = RuntimePool()
+    return _runtime_pool
+
+
+def configure_runtime_pool(
+    provider_pool: ProviderPool | None = None,
+    max_size: int = 32,
+    queue_manager: QueueManager | None = None,
+    **runtime_defaults: Any,
+) -> RuntimePool:
+    """
+    Replace the global runtime pool
+
+    Args:
+        provider_pool: Provider pool shared by all runtimes
+        max_size: Maximum number of cached runtimes
+        queue_manager: Queue manager shared by all runtimes
+        **runtime_defaults: Runtime options from settings applied to every
+            pooled runtime (e.g. max_parallel_tools)
+
+    Returns:
+        The new global RuntimePool
+    """
+    global _runtime_pool
+    _runtime_pool = RuntimePool(
+        provider_pool=provider_pool,
+        max_size=max_size,
+        queue_manager=queue_manager,
+        runtime_defaults=runtime_defaults,
+    )
+    return _runtime_pool
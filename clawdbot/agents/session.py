@@ -2,13 +2,26 @@
 Session management for agent conversations
 """
 
-import json
+import asyncio
 import logging
+import threading
+import time
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, ClassVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from .compaction.index import TokenIndex
+from .persistence import (
+    FileSessionStore,
+    SessionCache,
+    SessionStore,
+    SessionSummary,
+    WriteBehindFlusher,
+)
+from .providers.base import LLMMessage
+from .tokenizers import Tokenizer, get_tokenizer
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +36,27 @@ class Message(BaseModel):
     tool_call_id: str | None = None
     name: str | None = None  # For tool results
 
+    # (tokenizer name, token count), see count_tokens
+    _token_count: tuple[str, int] | None = PrivateAttr(default=None)
+
+    def count_tokens(self, tokenizer: Tokenizer) -> int:
+        """
+        Count this message's tokens, cached per tokenizer
+
+        Args:
+            tokenizer: Tokenizer to count with
+
+        Returns:
+            Token count including per-message overhead
+        """
+        cached = self._token_count
+        if cached is not None and cached[0] == tokenizer.name:
+            return cached[1]
+
+        count = tokenizer.count_message(self.to_api_format())
+        self._token_count = (tokenizer.name, count)
+        return count
+
     def to_api_format(self) -> dict[str, Any]:
         """Convert to API format for LLM calls"""
         msg = {"role": self.role, "content": self.content}
@@ -42,8 +76,15 @@ class Message(BaseModel):
 class Session(BaseModel):
     """
     Manages a conversation session with persistence
+
+    Mutations are appended to a per-session journal rather than rewriting the
+    whole session file, so the cost of adding a message does not grow with
+    the length of the conversation. Storage is delegated to a SessionStore
+    (file journal by default, see SessionJournal for the file layout).
     """
 
+    SNAPSHOT_MIN_RECORDS: ClassVar[int] = 500
+
     session_id: str
     workspace_dir: Path
     messages: list[Message] = Field(default_factory=list)
@@ -53,15 +94,46 @@ class Session(BaseModel):
 
     model_config = {"arbitrary_types_allowed": True}
 
-    def __init__(self, session_id: str, workspace_dir: Path, **kwargs):
-        """Initialize session, loading from disk if exists"""
+    _store: SessionStore = PrivateAttr()
+    _seq: int = PrivateAttr(default=0)
+    # Write-behind state (only used when a flusher is attached)
+    _writer: WriteBehindFlusher | None = PrivateAttr(default=None)
+    _pending: list[dict[str, Any]] = PrivateAttr(default_factory=list)
+    # Guards _pending/_seq and is held while a mutation and its journal record
+    # are applied together, so snapshots always match their seq (re-entrant)
+    _pending_lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    _flush_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _dirty_since: float | None = PrivateAttr(default=None)
+    # LRU cache bookkeeping (see SessionCache)
+    _pins: int = PrivateAttr(default=0)
+    _approx_bytes: int = PrivateAttr(default=0)
+    _cache: SessionCache | None = PrivateAttr(default=None)
+    # Provider-format view of messages, extended incrementally (see get_llm_messages)
+    _llm_messages: list[LLMMessage] = PrivateAttr(default_factory=list)
+    _llm_source: int | None = PrivateAttr(default=None)
+    # Token counts and prefix sums of the history (see token_index)
+    _tokenizer: Tokenizer | None = PrivateAttr(default=None)
+    _token_index: TokenIndex | None = PrivateAttr(default=None)
+    _token_source: int | None = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        session_id: str,
+        workspace_dir: Path,
+        store: SessionStore | None = None,
+        **kwargs,
+    ):
+        """Initialize session, loading from storage if exists"""
         super().__init__(session_id=session_id, workspace_dir=workspace_dir, **kwargs)
 
-        # Create sessions directory
-        self._sessions_dir.mkdir(parents=True, exist_ok=True)
+        if store is None:
+            store = FileSessionStore(
+                self._sessions_dir, snapshot_min_records=self.SNAPSHOT_MIN_RECORDS
+            )
+        self._store = store
 
         # Load existing session if exists
-        if self._session_file.exists() and not self.messages:
+        if not self.messages and self._store.exists(session_id):
             self._load()
 
     @property
@@ -71,15 +143,18 @@ class Session(BaseModel):
 
     @property
     def _session_file(self) -> Path:
-        """Get session file path"""
+        """Get session snapshot file path (file store only)"""
         return self._sessions_dir / f"{self.session_id}.json"
 
     def add_message(self, role: str, content: str, **kwargs) -> Message:
         """Add a message to the session"""
         msg = Message(role=role, content=content, **kwargs)
-        self.messages.append(msg)
-        self.updated_at = datetime.now(UTC).isoformat()
-        self._save()
+        record = {"op": "message", "message": msg.model_dump()}
+        with self._pending_lock:
+            self.messages.append(msg)
+            self._record(record)
+        self._set_approx_bytes(self._approx_bytes + _message_bytes(msg))
+        self.token_index(self._tokenizer)
         return msg
 
     def add_user_message(self, content: str) -> Message:
@@ -106,6 +181,75 @@ class Session(BaseModel):
             return self.messages
         return self.messages[-limit:]
 
+    def get_llm_messages(self) -> list[LLMMessage]:
+        """
+        Get the whole history as provider messages
+
+        The converted list is cached and only extended with messages added
+        since the last call; it is rebuilt after the history is replaced or
+        cleared. The returned list is shared, so callers must not modify it.
+        """
+        cache = self._llm_messages
+        if self._llm_source != id(self.messages) or len(cache) > len(self.messages):
+            cache = self._llm_messages = []
+            self._llm_source = id(self.messages)
+
+        for msg in self.messages[len(cache) :]:
+            cache.append(
+                LLMMessage(
+                    role=msg.role,
+                    content=msg.content,
+                    tool_calls=msg.tool_calls,
+                    tool_call_id=msg.tool_call_id,
+                    name=msg.name,
+                )
+            )
+        return cache
+
+    def token_index(self, tokenizer: Tokenizer | None = None) -> TokenIndex:
+        """
+        Get token counts and prefix sums of the whole history
+
+        Maintained incrementally: each message is counted once (when it is
+        added) and the count is cached on the message. Switching tokenizer,
+        or replacing or clearing the history, rebuilds the index from the
+        cached per-message values.
+
+        Args:
+            tokenizer: Tokenizer to count with (default: the one used last,
+                else the default tokenizer)
+
+        Returns:
+            TokenIndex aligned with messages (shared; do not modify)
+        """
+        tokenizer = tokenizer or self._tokenizer or get_tokenizer()
+        index = self._token_index
+        if (
+            index is None
+            or tokenizer is not self._tokenizer
+            or self._token_source != id(self.messages)
+            or len(index) > len(self.messages)
+        ):
+            index = self._token_index = TokenIndex()
+            self._tokenizer = tokenizer
+            self._token_source = id(self.messages)
+
+        for msg in self.messages[len(index) :]:
+            index.append(msg.count_tokens(tokenizer), msg.role == "system")
+        return index
+
+    def count_tokens(self, tokenizer: Tokenizer | None = None) -> int:
+        """
+        Get the token count of the whole history (O(1) once indexed)
+
+        Args:
+            tokenizer: Tokenizer to count with (see token_index)
+
+        Returns:
+            Token count including per-message overhead
+        """
+        return self.token_index(tokenizer).total
+
     def get_messages_for_api(self, limit: int | None = None) -> list[dict[str, Any]]:
         """Get messages in API format"""
         messages = self.get_messages(limit)
@@ -113,44 +257,234 @@ class Session(BaseModel):
 
     def clear(self) -> None:
         """Clear all messages"""
-        self.messages = []
-        self.updated_at = datetime.utcnow().isoformat()
-        self._save()
+        with self._pending_lock:
+            self.messages = []
+            if self._writer:
+                self._record({"op": "clear"})
+        self._set_approx_bytes(0)
+        self._invalidate_llm_messages()
+        if not self._writer:
+            self.updated_at = datetime.now(UTC).isoformat()
+            self._save()
+
+    def replace_messages(self, messages: list[Message]) -> None:
+        """
+        Replace the whole message history (e.g. after compaction)
+
+        Args:
+            messages: New message list
+        """
+        messages = list(messages)
+        with self._pending_lock:
+            self.messages = messages
+            if self._writer:
+                self._record({"op": "replace", "messages": [msg.model_dump() for msg in messages]})
+        self._set_approx_bytes(sum(_message_bytes(msg) for msg in self.messages))
+        self._invalidate_llm_messages()
+        if not self._writer:
+            self.updated_at = datetime.now(UTC).isoformat()
+            self._save()
 
     def set_metadata(self, key: str, value: Any) -> None:
         """Set metadata value"""
-        self.metadata[key] = value
-        self._save()
+        with self._pending_lock:
+            self.metadata[key] = value
+            self._record({"op": "metadata", "key": key, "value": value})
 
     def get_metadata(self, key: str, default: Any = None) -> Any:
         """Get metadata value"""
         return self.metadata.get(key, default)
 
+    def pin(self) -> None:
+        """Keep the session in memory (e.g. while a turn is running)"""
+        self._pins += 1
+
+    def unpin(self) -> None:
+        """Release a pin taken with pin()"""
+        self._pins = max(0, self._pins - 1)
+
+    @property
+    def is_pinned(self) -> bool:
+        """Whether the session must not be evicted from memory"""
+        return self._pins > 0
+
+    @property
+    def approx_bytes(self) -> int:
+        """Approximate in-memory size of the message history"""
+        return self._approx_bytes
+
+    def attach_cache(self, cache: SessionCache | None) -> None:
+        """
+        Report size changes to the cache holding this session
+
+        Args:
+            cache: SessionCache the session is in (None once removed)
+        """
+        self._cache = cache
+
+    def attach_writer(self, writer: WriteBehindFlusher | None) -> None:
+        """
+        Switch the session to write-behind persistence
+
+        Mutations are then queued in memory and written by the flusher
+        instead of on the caller's thread.
+
+        Args:
+            writer: Flusher to hand dirty state to (None for synchronous writes)
+        """
+        self._writer = writer
+
+    async def flush(self, fsync: bool | None = None) -> None:
+        """
+        Persist pending mutations without blocking the event loop
+
+        Args:
+            fsync: Force data to stable storage (default: the flusher's
+                ``fsync_on_end`` setting; synchronous sessions only sync when True)
+        """
+        if self._writer:
+            if fsync is None:
+                fsync = self._writer.fsync_on_end
+            await asyncio.wrap_future(self._writer.flush_session(self, fsync))
+        elif fsync:
+            await asyncio.to_thread(self._store.sync, self.session_id)
+
+    def write_pending(self, fsync: bool = False) -> tuple[int, float | None]:
+        """
+        Write queued records to the store (called from the flusher thread)
+
+        Args:
+            fsync: Force data to stable storage
+
+        Returns:
+            Tuple of (records written, monotonic time the session became dirty)
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                records, self._pending = self._pending, []
+                dirty_since, self._dirty_since = self._dirty_since, None
+
+            if records:
+                try:
+                    self._store.append(self.session_id, records, fsync=fsync)
+                except Exception:
+                    # Requeue ahead of newer records so the next flush retries them
+                    with self._pending_lock:
+                        self._pending[:0] = records
+                        if dirty_since is not None:
+                            self._dirty_since = dirty_since
+                    raise
+
+            if self._store.needs_snapshot(self.session_id, len(self.messages)):
+                # Copy references under the lock, serialize outside it
+                with self._pending_lock:
+                    messages = list(self.messages)
+                    metadata = dict(self.metadata)
+                    seq = self._seq
+                    updated_at = self.updated_at
+                state = self._snapshot_state(messages, metadata, seq)
+                state["updated_at"] = updated_at
+                try:
+                    self._store.write_snapshot(self.session_id, state, fsync=fsync)
+                except Exception as e:
+                    # The journal already holds every record; retried on a later flush
+                    logger.error(f"Failed to snapshot session {self.session_id}: {e}")
+
+            return len(records), dirty_since
+
+    def drop_pending(self) -> int:
+        """
+        Discard queued records without writing them
+
+        Waits for an in-flight flush so nothing is written after this returns.
+
+        Returns:
+            Number of records dropped
+        """
+        with self._flush_lock, self._pending_lock:
+            dropped = len(self._pending)
+            self._pending = []
+            self._dirty_since = None
+        return dropped
+
+    def _set_approx_bytes(self, approx_bytes: int) -> None:
+        """Update the in-memory size estimate and the owning cache's total"""
+        delta = approx_bytes - self._approx_bytes
+        self._approx_bytes = approx_bytes
+        if delta and self._cache is not None:
+            self._cache.adjust_bytes(delta)
+
+    def _invalidate_llm_messages(self) -> None:
+        """Drop the cached provider-format history and running token total"""
+        self._llm_messages = []
+        self._llm_source = None
+        self._token_source = None
+
+    def _record(self, record: dict[str, Any]) -> None:
+        """Append a mutation record to the journal, snapshotting when due"""
+        self.updated_at = datetime.now(UTC).isoformat()
+
+        if self._writer:
+            with self._pending_lock:
+                self._seq += 1
+                record["seq"] = self._seq
+                record["updated_at"] = self.updated_at
+                self._pending.append(record)
+                if self._dirty_since is None:
+                    self._dirty_since = time.monotonic()
+            self._writer.mark_dirty(self)
+            return
+
+        self._seq += 1
+        record["seq"] = self._seq
+        record["updated_at"] = self.updated_at
+
+        try:
+            self._store.append(self.session_id, [record])
+            if self._store.needs_snapshot(self.session_id, len(self.messages)):
+                self._save()
+        except Exception as e:
+            logger.error(f"Failed to append to session journal: {e}")
+
+    def _snapshot_state(
+        self,
+        messages: list[Message] | None = None,
+        metadata: dict[str, Any] | None = None,
+        seq: int | None = None,
+    ) -> dict[str, Any]:
+        """Build the full snapshot state"""
+        if messages is None:
+            messages = self.messages
+        return {
+            "session_id": self.session_id,
+            "messages": [msg.model_dump() for msg in messages],
+            "metadata": self.metadata if metadata is None else metadata,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "seq": self._seq if seq is None else seq,
+        }
+
     def _save(self) -> None:
-        """Save session to disk"""
+        """Write a full snapshot to the store"""
         try:
-            data = {
-                "session_id": self.session_id,
-                "messages": [msg.model_dump() for msg in self.messages],
-                "metadata": self.metadata,
-                "created_at": self.created_at,
-                "updated_at": self.updated_at,
-            }
-            with open(self._session_file, "w") as f:
-                json.dump(data, f, indent=2, default=str)
+            self._store.write_snapshot(self.session_id, self._snapshot_state())
         except Exception as e:
             logger.error(f"Failed to save session: {e}")
 
     def _load(self) -> None:
-        """Load session from disk"""
+        """Load session from the store"""
         try:
-            with open(self._session_file) as f:
-                data = json.load(f)
+            data = self._store.load(self.session_id)
+            if data is None:
+                return
 
             self.messages = [Message(**msg) for msg in data.get("messages", [])]
+            self._set_approx_bytes(sum(_message_bytes(msg) for msg in self.messages))
+            self._invalidate_llm_messages()
             self.metadata = data.get("metadata", {})
             self.created_at = data.get("created_at", self.created_at)
             self.updated_at = data.get("updated_at", self.updated_at)
+            self._seq = data.get("seq", 0)
         except Exception as e:
             logger.error(f"Failed to load session: {e}")
 
@@ -166,24 +500,67 @@ class Session(BaseModel):
         }
 
 
+def _message_bytes(msg: Message) -> int:
+    """Rough in-memory size of a message (content plus fixed object overhead)"""
+    size = 256 + len(msg.content or "")
+    if msg.tool_calls:
+        size += len(str(msg.tool_calls))
+    return size
+
+
 class SessionManager:
     """
     Manages multiple sessions
     """
 
-    def __init__(self, workspace_dir: Path):
+    def __init__(
+        self,
+        workspace_dir: Path,
+        write_behind: bool = False,
+        flush_interval: float = 1.0,
+        fsync_on_end: bool = True,
+        store: SessionStore | None = None,
+        max_cached_sessions: int | None = 1000,
+        max_cached_bytes: int | None = 256 * 1024 * 1024,
+    ):
         """
         Initialize session manager
 
         Args:
             workspace_dir: Base directory for session storage
+            write_behind: Queue session writes and persist them from a background
+                thread pool instead of on the caller's thread
+            flush_interval: Seconds between background flushes (write-behind only)
+            fsync_on_end: fsync session data when a turn ends (write-behind only)
+            store: Storage backend (default: file journal under
+                ``workspace_dir/.sessions``)
+            max_cached_sessions: Maximum sessions kept in memory (None for no limit)
+            max_cached_bytes: Maximum approximate size of sessions kept in memory
+                (None for no limit)
         """
         self.workspace_dir = Path(workspace_dir)
-        self._sessions: dict[str, Session] = {}
+
+        self._writer: WriteBehindFlusher | None = None
+        if write_behind:
+            self._writer = WriteBehindFlusher(interval=flush_interval, fsync_on_end=fsync_on_end)
 
         # Create workspace directory
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
 
+        if store is None:
+            store = FileSessionStore(
+                self.workspace_dir / ".sessions", snapshot_min_records=Session.SNAPSHOT_MIN_RECORDS
+            )
+        self.store = store
+
+        # Idle sessions are evicted (after flushing) and reloaded on demand
+        self._sessions = SessionCache(
+            max_sessions=max_cached_sessions,
+            max_bytes=max_cached_bytes,
+            writer=self._writer,
+            store=self.store,
+        )
+
     def get_session(self, session_id: str) -> Session:
         """
         Get or create a session
@@ -194,9 +571,33 @@ class SessionManager:
         Returns:
             Session instance
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = Session(session_id, self.workspace_dir)
-        return self._sessions[session_id]
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, self.workspace_dir, store=self.store)
+            session.attach_writer(self._writer)
+            self._sessions.put(session)
+        return session
+
+    async def flush(self, fsync: bool = False) -> None:
+        """
+        Persist all pending write-behind mutations
+
+        Args:
+            fsync: Force data to stable storage
+        """
+        if not self._writer:
+            return
+        futures = self._writer.flush_all(fsync=fsync)
+        if futures:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+    def close(self) -> None:
+        """Flush pending writes, stop the background flusher and close the store"""
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+            self._sessions.writer = None
+        self.store.close()
 
     def list_sessions(self) -> list[str]:
         """
@@ -205,15 +606,59 @@ class SessionManager:
         Returns:
             List of session IDs
         """
-        sessions_dir = self.workspace_dir / ".sessions"
-        if not sessions_dir.exists():
-            return []
+        return self.store.list_session_ids()
 
-        session_ids = []
-        for f in sessions_dir.glob("*.json"):
-            session_ids.append(f.stem)
+    async def list_session_summaries(
+        self, limit: int | None = None, offset: int = 0
+    ) -> list[SessionSummary]:
+        """
+        List sessions without loading their histories
 
-        return sorted(session_ids)
+        Args:
+            limit: Maximum number of sessions to return
+            offset: Number of sessions to skip (most recently updated first)
+
+        Returns:
+            List of SessionSummary entries
+        """
+        summaries = await self.store.alist_summaries(limit=limit, offset=offset)
+
+        # Sessions in memory may have unwritten mutations
+        for summary in summaries:
+            session = self._sessions.peek(summary.session_id)
+            if session is not None:
+                summary.message_count = len(session.messages)
+                summary.updated_at = session.updated_at
+                if session.messages:
+                    summary.last_message_ts = session.messages[-1].timestamp
+        return summaries
+
+    async def count_sessions(self) -> int:
+        """
+        Count persisted sessions
+
+        Returns:
+            Number of sessions
+        """
+        return await self.store.acount()
+
+    async def get_history(self, session_id: str, limit: int | None = None) -> list[Message]:
+        """
+        Get the last messages of a session without caching it in memory
+
+        Args:
+            session_id: Session identifier
+            limit: Maximum number of messages (most recent)
+
+        Returns:
+            List of messages
+        """
+        session = self._sessions.peek(session_id)
+        if session is not None:
+            return list(session.get_messages(limit))
+
+        rows = await self.store.aget_messages(session_id, limit)
+        return [Message(**row) for row in rows]
 
     def delete_session(self, session_id: str) -> bool:
         """
@@ -225,22 +670,20 @@ class SessionManager:
         Returns:
             True if deleted, False if not found
         """
-        # Remove from memory
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+        # Remove from memory (and drop any unwritten mutations)
+        session = self._sessions.pop(session_id, None)
+        if session is not None and self._writer:
+            self._writer.discard(session)
 
-        # Remove from disk
-        session_file = self.workspace_dir / ".sessions" / f"{session_id}.json"
-        if session_file.exists():
-            session_file.unlink()
-            return True
-
-        return False
+        return self.store.delete(session_id)
 
     def get_all_sessions(self) -> list[Session]:
         """
         Get all sessions
 
+        Sessions beyond the cache bounds are loaded for the caller but not
+        kept in memory afterwards.
+
         Returns:
             List of Session instances
         """
@@ -259,16 +702,17 @@ class SessionManager:
         """
         from datetime import timedelta
 
-        cutoff = datetime.utcnow() - timedelta(days=max_age_days)
-        deleted = 0
+        cutoff = datetime.now(UTC) - timedelta(days=max_age_days)
+
+        # Live sessions may have been touched since their last write
+        if self._writer:
+            for future in self._writer.flush_all():
+                future.result()
 
-        for session in self.get_all_sessions():
-            try:
-                updated = datetime.fromisoformat(session.updated_at.replace("Z", "+00:00"))
-                if updated < cutoff:
-                    if self.delete_session(session.session_id):
-                        deleted += 1
-            except Exception:
-                pass
+        deleted = self.store.delete_older_than(cutoff)
+        for session_id in deleted:
+            session = self._sessions.pop(session_id, None)
+            if session is not None and self._writer:
+                self._writer.discard(session)
 
-        return deleted
+        return len(deleted)
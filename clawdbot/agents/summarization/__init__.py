@@ -2,6 +2,14 @@
 Message summarization for context compaction
 """
 
+from .background import SUMMARY_HEADER, SUMMARY_KEY, BackgroundSummarizer, RollingSummary
 from .summarizer import MessageSummarizer, SummarizationStrategy
 
-__all__ = ["MessageSummarizer", "SummarizationStrategy"]
+__all__ = [
+    "MessageSummarizer",
+    "SummarizationStrategy",
+    "BackgroundSummarizer",
+    "RollingSummary",
+    "SUMMARY_KEY",
+    "SUMMARY_HEADER",
+]
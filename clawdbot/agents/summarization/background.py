@@ -0,0 +1,253 @@
+"""
+Rolling conversation summaries built in the background for compaction
+"""
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import asdict, dataclass
+
+from ..compaction import CompactionManager
+from ..session import Message, Session
+from .summarizer import MessageSummarizer, SummarizationStrategy
+
+logger = logging.getLogger(__name__)
+
+# Session metadata key holding the rolling summary
+SUMMARY_KEY = "compaction_summary"
+# First line of the system message carrying the summary in the history
+SUMMARY_HEADER = "[Summary of earlier conversation]"
+
+
+@dataclass
+class RollingSummary:
+    """
+    Summary of the oldest non-system messages of a session
+
+    Stored in session metadata (SUMMARY_KEY). ``version`` changes on every
+    write, so a background update started from an older version is
+    discarded instead of overwriting newer state.
+    """
+
+    text: str = ""
+    version: int = 0
+    covered: int = 0  # Leading non-system messages folded into text
+    anchor: str | None = None  # Fingerprint of the last covered message
+
+
+class BackgroundSummarizer:
+    """
+    Keep a rolling summary of aged-out messages ready for compaction
+
+    After each turn, messages that would not survive the next compaction
+    are folded into the session's summary with
+    MessageSummarizer.incremental_summarize, in a background task. When
+    compaction is needed the summary replaces those messages immediately,
+    without waiting for the LLM.
+
+    Example:
+        background = BackgroundSummarizer(MessageSummarizer(provider), manager)
+        background.schedule(session, target_tokens)  # after a turn
+        ...
+        if not background.compact(session, target_tokens):
+            ...  # no summary yet, compact without one
+    """
+
+    def __init__(
+        self,
+        summarizer: MessageSummarizer,
+        manager: CompactionManager,
+        strategy: SummarizationStrategy = SummarizationStrategy.COMPRESS,
+        max_summary_tokens: int = 1000,
+        min_batch_tokens: int = 2000,
+    ):
+        """
+        Initialize background summarizer
+
+        Args:
+            summarizer: Summarizer used to fold messages into the summary
+            manager: Compaction manager (its analyzer counts tokens, and it
+                trims the summarized history if that still does not fit)
+            strategy: Summarization strategy
+            max_summary_tokens: Maximum tokens for the summary
+            min_batch_tokens: Fold aged-out messages once they reach this many
+                tokens (or compaction is due), to avoid an LLM call per turn
+        """
+        self.summarizer = summarizer
+        self.manager = manager
+        self.strategy = strategy
+        self.max_summary_tokens = max_summary_tokens
+        self.min_batch_tokens = min_batch_tokens
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def get_summary(self, session: Session) -> RollingSummary | None:
+        """
+        Get the session's summary if it still matches the history
+
+        Args:
+            session: Session
+
+        Returns:
+            The summary, or None if there is none or the history it
+            covered was replaced (e.g. cleared)
+        """
+        data = session.get_metadata(SUMMARY_KEY)
+        if not data:
+            return None
+
+        summary = RollingSummary(**data)
+        index = session.token_index(self.manager.analyzer.tokenizer)
+        if summary.covered:
+            others = index.other_positions
+            if summary.covered > len(others):
+                return None
+            if _fingerprint(session.messages[others[summary.covered - 1]]) != summary.anchor:
+                return None
+        elif summary.text and not any(
+            _is_summary_message(session.messages[i]) for i in index.system_positions
+        ):
+            return None
+        return summary
+
+    def schedule(self, session: Session, target_tokens: int) -> asyncio.Task | None:
+        """
+        Start updating the session's summary in the background
+
+        Does nothing if an update for the session is already running. The
+        session is pinned until the update finishes, so the session cache
+        cannot evict it and load a second copy while the summary is written.
+
+        Args:
+            session: Session
+            target_tokens: Token count compaction reduces the history to
+
+        Returns:
+            The update task, or None if one was already running
+        """
+        if session.session_id in self._tasks:
+            return None
+
+        session.pin()
+        task = asyncio.create_task(self.update(session, target_tokens))
+        self._tasks[session.session_id] = task
+        task.add_done_callback(lambda t: self._finished(session, t))
+        return task
+
+    async def update(self, session: Session, target_tokens: int) -> bool:
+        """
+        Fold newly aged-out messages into the session's summary
+
+        Messages age out when they fall outside the recent messages that
+        the next compaction would keep next to the summary.
+
+        Args:
+            session: Session
+            target_tokens: Token count compaction reduces the history to
+
+        Returns:
+            True if the summary was updated
+        """
+        data = session.get_metadata(SUMMARY_KEY)
+        version = data["version"] if data else 0
+        summary = self.get_summary(session) or RollingSummary(version=version)
+
+        index = session.token_index(self.manager.analyzer.tokenizer)
+        others = index.other_positions
+        budget = target_tokens - index.system_tokens - self.max_summary_tokens
+        end = index.recent_others(budget, stop=summary.covered)
+        # Never split a tool call from its results
+        while end < len(others) and session.messages[others[end]].role == "tool":
+            end += 1
+
+        if end <= summary.covered:
+            return False
+        pending = index.leading_others_tokens(end) - index.leading_others_tokens(summary.covered)
+        if pending < self.min_batch_tokens and not index.needs_compaction(target_tokens):
+            return False
+
+        last = session.messages[others[end - 1]]
+        batch = [session.messages[i].to_api_format() for i in others[summary.covered : end]]
+        logger.debug(f"Summarizing {len(batch)} messages of session {session.session_id}")
+        text = await self.summarizer.incremental_summarize(
+            summary.text, batch, self.strategy, self.max_summary_tokens
+        )
+
+        # The history may have been compacted or cleared while the LLM ran
+        data = session.get_metadata(SUMMARY_KEY)
+        current = session.token_index(self.manager.analyzer.tokenizer).other_positions
+        if (data["version"] if data else 0) != version or (
+            end > len(current) or session.messages[current[end - 1]] is not last
+        ):
+            logger.debug(f"Discarding stale summary of session {session.session_id}")
+            return False
+
+        self._store(
+            session,
+            RollingSummary(text=text, version=version + 1, covered=end, anchor=_fingerprint(last)),
+        )
+        return True
+
+    def compact(self, session: Session, target_tokens: int) -> bool:
+        """
+        Replace summarized messages with the session's summary
+
+        The history becomes: system messages, the summary (as a system
+        message), then the messages not yet summarized, trimmed to the
+        target by the compaction manager if still needed.
+
+        Args:
+            session: Session
+            target_tokens: Target token count
+
+        Returns:
+            False if there is no usable summary (nothing was changed)
+        """
+        summary = self.get_summary(session)
+        if summary is None or not summary.text:
+            return False
+
+        index = session.token_index(self.manager.analyzer.tokenizer)
+        messages = session.messages
+        system = [
+            messages[i] for i in index.system_positions if not _is_summary_message(messages[i])
+        ]
+        summary_message = Message(role="system", content=f"{SUMMARY_HEADER}\n{summary.text}")
+        rest = [messages[i] for i in index.other_positions[summary.covered :]]
+
+        compacted = self.manager.compact(system + [summary_message] + rest, target_tokens)
+        session.replace_messages(compacted)
+        self._store(session, RollingSummary(text=summary.text, version=summary.version + 1))
+        logger.info(
+            f"Compacted session {session.session_id} with summary v{summary.version} "
+            f"({summary.covered} messages summarized)"
+        )
+        return True
+
+    async def wait(self) -> None:
+        """Wait for running updates to finish"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _store(self, session: Session, summary: RollingSummary) -> None:
+        """Write the summary to session metadata"""
+        session.set_metadata(SUMMARY_KEY, asdict(summary))
+
+    def _finished(self, session: Session, task: asyncio.Task) -> None:
+        """Forget a finished update and unpin its session, logging its failure"""
+        session_id = session.session_id
+        session.unpin()
+        if self._tasks.get(session_id) is task:
+            del self._tasks[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background summary of session {session_id} failed: {task.exception()}")
+
+
+def _fingerprint(message: Message) -> str:
+    """Identify a message across reloads of the session"""
+    digest = hashlib.sha1((message.content or "").encode("utf-8")).hexdigest()[:16]
+    return f"{message.role}:{message.timestamp}:{digest}"
+
+
+def _is_summary_message(message: Message) -> bool:
+    """Whether a message is a summary inserted by compaction"""
+    return message.role == "system" and (message.content or "").startswith(SUMMARY_HEADER)
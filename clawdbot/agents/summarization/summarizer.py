@@ -2,10 +2,14 @@
 LLM-driven message summarization for context compaction
 """
 
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
 from enum import Enum
 from typing import Any
 
+from ..tokenizers import get_tokenizer
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +30,7 @@ class MessageSummarizer:
     - Multiple summarization strategies
     - Preserve important context
     - Token-aware summarization
-    - Batch and incremental summarization
+    - Concurrent batch, hierarchical and incremental summarization
 
     Example:
         summarizer = MessageSummarizer(llm_provider)
@@ -57,6 +61,9 @@ Assistant: [condensed response]
 Keep the summary under 800 tokens.""",
     }
 
+    # Merges partial summaries in hierarchical summarization
+    REDUCE_PROMPT = """You are a conversation summarizer. The following are summaries of consecutive parts of one conversation, in order. Merge them into a single summary, preserving all important information, decisions, and context. Be concise but complete."""
+
     def __init__(self, llm_provider: Any = None):
         """
         Initialize summarizer
@@ -120,23 +127,120 @@ Keep the summary under 800 tokens.""",
         message_batches: list[list[dict[str, Any]]],
         strategy: SummarizationStrategy = SummarizationStrategy.COMPRESS,
         max_tokens: int = 1000,
+        max_concurrency: int = 4,
+        timeout: float | None = None,
     ) -> list[str]:
         """
-        Summarize multiple batches of messages
+        Summarize multiple batches of messages concurrently
 
         Args:
             message_batches: List of message lists
             strategy: Summarization strategy
             max_tokens: Maximum tokens per summary
+            max_concurrency: Maximum summaries generated at once
+            timeout: Seconds allowed per summary; a batch that takes longer
+                falls back to simple truncation
 
         Returns:
-            List of summary strings
+            List of summary strings, in batch order
+        """
+        return await self._gather_limited(
+            [
+                (lambda batch=batch: self.summarize(batch, strategy, max_tokens), batch)
+                for batch in message_batches
+            ],
+            max_tokens,
+            max_concurrency,
+            timeout,
+        )
+
+    async def summarize_hierarchical(
+        self,
+        messages: list[dict[str, Any]],
+        strategy: SummarizationStrategy = SummarizationStrategy.COMPRESS,
+        max_tokens: int = 1000,
+        chunk_tokens: int = 8000,
+        fan_in: int = 8,
+        max_concurrency: int = 4,
+        timeout: float | None = None,
+    ) -> str:
         """
-        summaries = []
-        for batch in message_batches:
-            summary = await self.summarize(batch, strategy, max_tokens)
-            summaries.append(summary)
-        return summaries
+        Summarize a long history by map-reduce
+
+        Messages are split into chunks of about ``chunk_tokens`` that are
+        summarized concurrently, then groups of ``fan_in`` summaries are
+        merged into summaries of summaries until one is left. No single call
+        sees more than one chunk or ``fan_in`` summaries, however long the
+        history is.
+
+        Args:
+            messages: List of message dicts with role/content
+            strategy: Summarization strategy
+            max_tokens: Maximum tokens per summary
+            chunk_tokens: Token budget of each chunk of messages
+            fan_in: Summaries merged per call (at least 2)
+            max_concurrency: Maximum summaries generated at once
+            timeout: Seconds allowed per call (see summarize_batch)
+
+        Returns:
+            Summary string
+        """
+        system_messages = [m for m in messages if m.get("role") == "system"]
+        other_messages = [m for m in messages if m.get("role") != "system"]
+
+        chunks = self._chunk_messages(other_messages, chunk_tokens)
+        if len(chunks) <= 1 or strategy == SummarizationStrategy.NONE:
+            return await self.summarize(messages, strategy, max_tokens)
+
+        # Map: summarize each chunk
+        summaries = await self._gather_limited(
+            [
+                (
+                    lambda chunk=chunk: self._generate_summary(
+                        self._format_messages(chunk), strategy, max_tokens
+                    ),
+                    chunk,
+                )
+                for chunk in chunks
+            ],
+            max_tokens,
+            max_concurrency,
+            timeout,
+        )
+
+        # Reduce: merge groups of summaries until one is left
+        fan_in = max(2, fan_in)
+        level = 1
+        while len(summaries) > 1:
+            texts = [
+                "\n\n".join(
+                    f"Part {i + 1}:\n{summary}"
+                    for i, summary in enumerate(summaries[start : start + fan_in])
+                )
+                for start in range(0, len(summaries), fan_in)
+            ]
+            logger.debug(f"Merging {len(summaries)} summaries into {len(texts)} (level {level})")
+            summaries = await self._gather_limited(
+                [
+                    (
+                        lambda text=text: self._generate_summary(
+                            text, strategy, max_tokens, custom_prompt=self.REDUCE_PROMPT
+                        ),
+                        text,
+                    )
+                    for text in texts
+                ],
+                max_tokens,
+                max_concurrency,
+                timeout,
+            )
+            level += 1
+
+        if system_messages:
+            system_text = self._format_messages(system_messages)
+            return f"{system_text}\n\n[SUMMARY OF CONVERSATION]\n{summaries[0]}"
+
+        return f"[SUMMARY]\n{summaries[0]}"
 
     async def incremental_summarize(
         self,
@@ -175,6 +279,58 @@ Update the previous summary by incorporating the new messages. Maintain continui
             combined, strategy, max_tokens, custom_prompt=system_prompt
         )
 
+    async def _gather_limited(
+        self,
+        calls: list[tuple[Callable[[], Awaitable[str]], list[dict[str, Any]] | str]],
+        max_tokens: int,
+        max_concurrency: int,
+        timeout: float | None,
+    ) -> list[str]:
+        """
+        Run summary calls concurrently with a concurrency limit and timeout
+
+        Args:
+            calls: (call, messages or text it summarizes) pairs; the input is
+                truncated instead if the call times out
+            max_tokens: Maximum tokens per summary
+            max_concurrency: Maximum calls running at once
+            timeout: Seconds allowed per call (None waits indefinitely)
+
+        Returns:
+            Summaries in call order
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(call: Callable[[], Awaitable[str]], source: Any) -> str:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(call(), timeout)
+                except TimeoutError:
+                    logger.warning(f"Summarization timed out after {timeout}s, using truncation")
+                    text = source if isinstance(source, str) else self._format_messages(source)
+                    return self._simple_truncate(text, max_tokens)
+
+        return list(await asyncio.gather(*(run(call, source) for call, source in calls)))
+
+    def _chunk_messages(
+        self, messages: list[dict[str, Any]], chunk_tokens: int
+    ) -> list[list[dict[str, Any]]]:
+        """Split messages into consecutive chunks of at most chunk_tokens (or one message)"""
+        tokenizer = get_tokenizer()
+        chunks: list[list[dict[str, Any]]] = []
+        current: list[dict[str, Any]] = []
+        current_tokens = 0
+        for msg in messages:
+            tokens = tokenizer.count_message(msg)
+            if current and current_tokens + tokens > chunk_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(msg)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
     def _format_messages(self, messages: list[dict[str, Any]]) -> str:
         """Format messages as text"""
         formatted = []
@@ -266,5 +422,4 @@ Update the previous summary by incorporating the new messages. Maintain continui
 
     def estimate_tokens(self, text: str) -> int:
         """Estimate token count for text"""
-        # Rough estimate: 4 characters per token
-        return len(text) // 4
+        return get_tokenizer().count(text)
@@ -0,0 +1,20 @@
+"""
+Token counting for context management
+"""
+
+from .base import MESSAGE_OVERHEAD, Tokenizer
+from .local import ApproximateTokenizer, BPETokenizer
+from .registry import configure_tokenizer, encoding_for_model, get_tokenizer, warm_tokenizer
+from .tiktoken_tokenizer import TiktokenTokenizer
+
+__all__ = [
+    "Tokenizer",
+    "TiktokenTokenizer",
+    "BPETokenizer",
+    "ApproximateTokenizer",
+    "MESSAGE_OVERHEAD",
+    "get_tokenizer",
+    "configure_tokenizer",
+    "encoding_for_model",
+    "warm_tokenizer",
+]
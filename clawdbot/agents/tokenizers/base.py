@@ -0,0 +1,76 @@
+"""
+Tokenizer interface and message token counting
+"""
+
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Any
+
+# Fixed cost of one chat message (role and separators), as in OpenAI's
+# published counting recipe
+MESSAGE_OVERHEAD = 4
+
+# Pre-tokenization close to the cl100k/o200k split rules, limited to what
+# the standard library's re supports (no \p{..} classes)
+SPLIT_PATTERN = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+",
+    re.IGNORECASE,
+)
+
+
+class Tokenizer(ABC):
+    """
+    Counts tokens in text and chat messages
+
+    ``name`` identifies the encoding; token counts cached on messages are
+    only reused by a tokenizer with the same name.
+    """
+
+    name: str = "tokenizer"
+
+    @abstractmethod
+    def count(self, text: str | None) -> int:
+        """
+        Count tokens in text
+
+        Args:
+            text: Text to count (None counts as empty)
+
+        Returns:
+            Token count
+        """
+
+    def count_message(self, message: dict[str, Any]) -> int:
+        """
+        Count tokens in an API-format message
+
+        Args:
+            message: Message dict (role, content, tool_calls, name, ...)
+
+        Returns:
+            Token count including per-message overhead
+        """
+        total = MESSAGE_OVERHEAD
+
+        content = message.get("content")
+        if isinstance(content, str):
+            total += self.count(content)
+        elif isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict):
+                    if "text" in item:
+                        total += self.count(item["text"])
+                    elif "content" in item:
+                        total += self.count(str(item["content"]))
+
+        if message.get("tool_calls"):
+            total += self.count(json.dumps(message["tool_calls"], ensure_ascii=False))
+        if message.get("name"):
+            total += self.count(message["name"])
+
+        return total
+
+    def count_messages(self, messages: list[dict[str, Any]]) -> int:
+        """Count tokens in several API-format messages"""
+        return sum(self.count_message(msg) for msg in messages)
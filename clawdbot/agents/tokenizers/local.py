@@ -0,0 +1,139 @@
+"""
+Tokenizers that work without optional dependencies
+"""
+
+import base64
+from functools import lru_cache
+from pathlib import Path
+
+from .base import SPLIT_PATTERN, Tokenizer
+
+
+class BPETokenizer(Tokenizer):
+    """
+    Byte-level BPE tokenizer in pure Python
+
+    Uses a merge-rank table in tiktoken's file format (one ``base64-token
+    rank`` pair per line), so a downloaded ``cl100k_base.tiktoken`` file
+    gives tiktoken-level counts without installing tiktoken (pre-tokenization
+    uses SPLIT_PATTERN, so rare edge cases may differ by a token). Results are
+    cached per pre-tokenized piece; repeated words cost one dictionary lookup.
+
+    Example:
+        tokenizer = BPETokenizer.from_file("cl100k_base.tiktoken")
+        tokenizer.count("Hello world")  # 2
+    """
+
+    def __init__(self, ranks: dict[bytes, int], name: str = "bpe", cache_size: int = 65536):
+        """
+        Initialize tokenizer
+
+        Args:
+            ranks: Token bytes -> merge rank (lower merges first)
+            name: Encoding name
+            cache_size: Pieces whose token ids are cached
+        """
+        self.ranks = ranks
+        self.name = name
+        self._encode_piece = lru_cache(maxsize=cache_size)(self._bpe)
+
+    @classmethod
+    def from_file(cls, path: Path | str, name: str | None = None) -> "BPETokenizer":
+        """
+        Load a tiktoken-format rank file
+
+        Args:
+            path: Rank file
+            name: Encoding name (default: bpe:<file stem>)
+
+        Returns:
+            Tokenizer
+        """
+        path = Path(path)
+        ranks = {}
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+        return cls(ranks, name=name or f"bpe:{path.stem}")
+
+    def encode(self, text: str) -> list[int]:
+        """
+        Encode text to token ids
+
+        Args:
+            text: Text to encode
+
+        Returns:
+            Token ids
+        """
+        tokens: list[int] = []
+        for piece in SPLIT_PATTERN.findall(text):
+            tokens.extend(self._encode_piece(piece))
+        return tokens
+
+    def count(self, text: str | None) -> int:
+        if not text:
+            return 0
+        return sum(len(self._encode_piece(piece)) for piece in SPLIT_PATTERN.findall(text))
+
+    def _bpe(self, piece: str) -> tuple[int, ...]:
+        """Merge one piece's bytes by rank until no known pair remains"""
+        data = piece.encode("utf-8")
+        rank = self.ranks.get(data)
+        if rank is not None:
+            return (rank,)
+
+        parts = [data[i : i + 1] for i in range(len(data))]
+        while len(parts) > 1:
+            best_rank, best = None, -1
+            for i in range(len(parts) - 1):
+                pair_rank = self.ranks.get(parts[i] + parts[i + 1])
+                if pair_rank is not None and (best_rank is None or pair_rank < best_rank):
+                    best_rank, best = pair_rank, i
+            if best_rank is None:
+                break
+            parts[best : best + 2] = [parts[best] + parts[best + 1]]
+
+        # Bytes missing from the table count as one token each
+        return tuple(self.ranks.get(part, -1) for part in parts)
+
+
+class ApproximateTokenizer(Tokenizer):
+    """
+    Fast token estimate when no BPE table is available
+
+    Splits text with the same pre-tokenization rules as modern BPE
+    encodings and estimates sub-word tokens per piece: common words are one
+    token, long words and symbol runs are split, and non-ASCII characters
+    count about one token each. This tracks real BPE counts much more
+    closely than a flat characters-per-token ratio, which badly undercounts
+    code, numbers and non-Latin text.
+    """
+
+    name = "approx"
+
+    def count(self, text: str | None) -> int:
+        if not text:
+            return 0
+        return sum(_estimate_piece(piece) for piece in SPLIT_PATTERN.findall(text))
+
+
+@lru_cache(maxsize=65536)
+def _estimate_piece(piece: str) -> int:
+    """Estimated tokens for one pre-tokenized piece"""
+    stripped = piece.lstrip(" ")
+    if not stripped:
+        return 1
+    if stripped.isspace():
+        # Runs of blank lines or indentation mostly merge
+        return 1 + stripped.count("\n") // 2
+    if not stripped.isascii():
+        ascii_chars = sum(1 for ch in stripped if ch.isascii())
+        return (ascii_chars + 3) // 4 + len(stripped) - ascii_chars
+    if stripped[0].isalpha():
+        return (len(stripped) + 7) // 8
+    if stripped[0].isdigit():
+        return 1
+    return (len(stripped) + 1) // 2
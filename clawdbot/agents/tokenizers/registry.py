@@ -0,0 +1,130 @@
+"""
+Tokenizer selection per model
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+
+from .base import Tokenizer
+from .local import ApproximateTokenizer, BPETokenizer
+
+logger = logging.getLogger(__name__)
+
+# Model name prefixes using the o200k encoding
+_O200K_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+_tokenizers: dict[str, Tokenizer] = {}
+_override: Tokenizer | None = None
+_bpe_file: Path | None = None
+
+
+def encoding_for_model(model: str | None) -> str:
+    """
+    Pick the BPE encoding used to count tokens for a model
+
+    Args:
+        model: Model name, optionally with a provider prefix
+
+    Returns:
+        Encoding name (cl100k_base or o200k_base)
+    """
+    name = (model or "").rsplit("/", 1)[-1].lower()
+    if name.startswith(_O200K_MODELS):
+        return "o200k_base"
+    # Claude and Gemini tokenizers are not public; cl100k is a close proxy
+    return "cl100k_base"
+
+
+def get_tokenizer(model: str | None = None) -> Tokenizer:
+    """
+    Get the tokenizer for a model
+
+    Prefers a local BPE rank file (see configure_tokenizer), then tiktoken if
+    its rank file is already cached, then ApproximateTokenizer. Never
+    downloads, since this runs lazily on the event loop; see warm_tokenizer.
+    Tokenizers are created once per encoding.
+
+    Args:
+        model: Model name (None uses the default encoding)
+
+    Returns:
+        Shared tokenizer instance
+    """
+    if _override is not None:
+        return _override
+
+    encoding = encoding_for_model(model)
+    tokenizer = _tokenizers.get(encoding)
+    if tokenizer is None:
+        tokenizer = _tokenizers[encoding] = _load(encoding)
+    return tokenizer
+
+
+def configure_tokenizer(
+    tokenizer: Tokenizer | None = None, bpe_file: Path | str | None = None
+) -> None:
+    """
+    Configure how tokens are counted
+
+    Args:
+        tokenizer: Use this tokenizer for every model
+        bpe_file: tiktoken-format rank file, preferred over tiktoken
+    """
+    global _override, _bpe_file
+    _override = tokenizer
+    _bpe_file = Path(bpe_file) if bpe_file else None
+    _tokenizers.clear()
+
+
+async def warm_tokenizer(model: str | None = None, timeout: float = 10.0) -> Tokenizer:
+    """
+    Load the tokenizer for a model ahead of the first request
+
+    Runs in a worker thread and may let tiktoken download its rank file,
+    bounded by ``timeout``. Call once at startup.
+
+    Args:
+        model: Model name (None uses the default encoding)
+        timeout: Seconds to wait for the load
+
+    Returns:
+        The tokenizer get_tokenizer(model) returns from now on
+    """
+    if _override is not None:
+        return _override
+
+    encoding = encoding_for_model(model)
+    try:
+        tokenizer = await asyncio.wait_for(
+            asyncio.to_thread(_load, encoding, allow_download=True), timeout
+        )
+    except TimeoutError:
+        logger.warning(f"Timed out loading tokenizer for {encoding} after {timeout}s")
+        return get_tokenizer(model)
+
+    _tokenizers[encoding] = tokenizer
+    return tokenizer
+
+
+def _load(encoding: str, allow_download: bool = False) -> Tokenizer:
+    """Create the best available tokenizer for an encoding"""
+    if _bpe_file is not None:
+        try:
+            return BPETokenizer.from_file(_bpe_file)
+        except Exception as e:
+            logger.warning(f"Could not load BPE ranks from {_bpe_file}: {e}")
+
+    try:
+        from .tiktoken_tokenizer import TiktokenTokenizer, tiktoken_cached
+
+        if allow_download or tiktoken_cached(encoding):
+            return TiktokenTokenizer(encoding)
+        logger.debug(f"tiktoken ranks for {encoding} are not cached, skipping download")
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding {encoding}: {e}")
+
+    logger.debug(f"No tokenizer for {encoding}, using approximate token counts")
+    return ApproximateTokenizer()
@@ -0,0 +1,72 @@
+"""
+Tokenizer backed by tiktoken (optional dependency)
+"""
+
+import hashlib
+import os
+import tempfile
+
+from .base import Tokenizer
+
+_BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+
+def tiktoken_cached(encoding_name: str) -> bool:
+    """
+    Check whether tiktoken can load an encoding without a download
+
+    Mirrors tiktoken's rank file cache lookup (TIKTOKEN_CACHE_DIR,
+    DATA_GYM_CACHE_DIR, then the temp directory).
+
+    Args:
+        encoding_name: tiktoken encoding (cl100k_base, o200k_base, ...)
+
+    Returns:
+        True if the encoding is already loaded or its rank file is cached
+    """
+    import tiktoken.registry
+
+    if encoding_name in tiktoken.registry.ENCODINGS:
+        return True
+
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return False
+
+    cache_key = hashlib.sha1(_BLOB_URL.format(encoding_name).encode()).hexdigest()
+    return os.path.exists(os.path.join(cache_dir, cache_key))
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    Exact counts for OpenAI encodings via tiktoken
+
+    Raises ImportError if tiktoken is not installed. Loading an encoding the
+    first time may download its rank file (cached by tiktoken afterwards).
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        """
+        Initialize tokenizer
+
+        Args:
+            encoding_name: tiktoken encoding (cl100k_base, o200k_base, ...)
+        """
+        import tiktoken
+
+        self._encoding = tiktoken.get_encoding(encoding_name)
+        self.name = f"tiktoken:{encoding_name}"
+
+    def encode(self, text: str) -> list[int]:
+        """Encode text to token ids (special tokens are treated as text)"""
+        return self._encoding.encode_ordinary(text)
+
+    def count(self, text: str | None) -> int:
+        if not text:
+            return 0
+        return len(self._encoding.encode_ordinary(text))
@@ -149,6 +149,10 @@ class AgentTool(ABC):
         self.name: str = ""
         self.description: str = ""
         self.required_permissions: set[ToolPermission] = set()
+        # Serial tools never run concurrently with other calls from the same turn
+        self.serial: bool = False
+        # Large outputs may be stored out of band and replaced by a preview
+        self.offload: bool = True
         self._config = ToolConfig()
         self._metrics = ToolMetrics()
         self._rate_limit_calls: list[float] = []
@@ -15,6 +15,7 @@ class BashTool(AgentTool):
     def __init__(self):
         super().__init__()
         self.name = "bash"
+        self.serial = True
         self.description = (
             "Execute bash commands in a shell. Use for system operations, running scripts, etc."
         )
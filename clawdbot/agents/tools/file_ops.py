@@ -54,6 +54,7 @@ class WriteFileTool(AgentTool):
     def __init__(self):
         super().__init__()
         self.name = "write_file"
+        self.serial = True
         self.description = "Write contents to a file (creates or overwrites)"
 
     def get_schema(self) -> dict[str, Any]:
@@ -96,6 +97,7 @@ class EditFileTool(AgentTool):
     def __init__(self):
         super().__init__()
         self.name = "edit_file"
+        self.serial = True
         self.description = "Edit a file by searching and replacing text"
 
     def get_schema(self) -> dict[str, Any]:
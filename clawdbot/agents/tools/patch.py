@@ -16,6 +16,7 @@ class ApplyPatchTool(AgentTool):
     def __init__(self):
         super().__init__()
         self.name = "apply_patch"
+        self.serial = True
         self.description = "Apply unified diff patches to files"
 
     def get_schema(self) -> dict[str, Any]:
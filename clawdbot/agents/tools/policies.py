@@ -4,10 +4,13 @@ Enhanced tool execution policies and access control
 
 import logging
 from collections.abc import Callable
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 from enum import Enum
 from typing import Any
 
+from ...auth.backends import RateLimitBackend
+from ...auth.rate_limiter import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -105,9 +108,21 @@ class BlacklistPolicy(ToolPolicy):
 
 
 class RateLimitPolicy(ToolPolicy):
-    """Rate limit tool usage"""
+    """
+    Rate limit tool usage
 
-    def __init__(self, max_calls: int, window_seconds: int = 60, per_tool: bool = True):
+    Uses the same GCRA limiter as the API: up to max_calls back to back, then
+    max_calls per window_seconds on average. Pass a shared backend
+    (e.g. SQLiteRateLimitBackend) to enforce the limit across processes.
+    """
+
+    def __init__(
+        self,
+        max_calls: int,
+        window_seconds: int = 60,
+        per_tool: bool = True,
+        backend: RateLimitBackend | None = None,
+    ):
         """
         Initialize rate limit policy
 
@@ -115,36 +130,30 @@ class RateLimitPolicy(ToolPolicy):
             max_calls: Maximum calls allowed
             window_seconds: Time window in seconds
             per_tool: Apply limit per tool (True) or globally (False)
+            backend: Limiter state storage (default: in-process)
         """
         super().__init__("rate_limit")
         self.max_calls = max_calls
         self.window_seconds = window_seconds
         self.per_tool = per_tool
-        self._call_history: dict[str, list[datetime]] = {}
+        self._limiter = RateLimiter(
+            requests_per_minute=max_calls,
+            window_seconds=window_seconds,
+            backend=backend,
+            namespace="tool:",
+        )
 
     def evaluate(self, tool_name: str, arguments: dict, context: dict) -> PolicyDecision:
         key = tool_name if self.per_tool else "global"
-        now = datetime.now(UTC)
-
-        # Initialize history
-        if key not in self._call_history:
-            self._call_history[key] = []
-
-        # Clean old entries
-        cutoff = now - timedelta(seconds=self.window_seconds)
-        self._call_history[key] = [ts for ts in self._call_history[key] if ts > cutoff]
 
-        # Check limit
-        if len(self._call_history[key]) >= self.max_calls:
+        result = self._limiter.hit(key)
+        if not result.allowed:
             logger.warning(
-                f"Rate limit exceeded for {key}: "
-                f"{len(self._call_history[key])}/{self.max_calls} "
-                f"in {self.window_seconds}s"
+                f"Rate limit exceeded for {key}: {self.max_calls} in {self.window_seconds}s, "
+                f"retry in {result.retry_after}s"
             )
             return PolicyDecision.DENY
 
-        # Record this call
-        self._call_history[key].append(now)
         return PolicyDecision.ALLOW
 
 
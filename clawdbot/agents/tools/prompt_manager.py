@@ -4,14 +4,22 @@ Collates base prompts, soul, and skills into a final system prompt.
 """
 
 import logging
+from collections import OrderedDict
 from pathlib import Path
 from .skill_loader import get_skill_provider
 
 logger = logging.getLogger(__name__)
 
 class PromptManager:
-    """Manages loading and formatting system prompts"""
-    
+    """
+    Manages loading and formatting system prompts
+
+    Prompt files are cached and re-read only when their mtime/size change.
+    Assembled prompts are memoized per matched-skill set.
+    """
+
+    MAX_CACHED_PROMPTS = 128
+
     def __init__(self, prompt_dir: str | Path | None = None):
         if prompt_dir is None:
             # Base directory for prompts
@@ -21,17 +29,30 @@ class PromptManager:
             self.prompt_dir = Path(prompt_dir)
             
         self.skill_provider = get_skill_provider()
+        self._file_cache: dict[str, tuple[tuple[int, int] | None, str]] = {}
+        self._prompt_cache: OrderedDict[tuple, str] = OrderedDict()
 
     def get_full_system_prompt(self, query: str | None = None) -> str:
         """Get the full assembled system prompt, optionally specialized for a query"""
-        base_prompt = self._load_file("base.md")
-        soul_prompt = self._load_file("soul.md")
-        
+        base_prompt, base_stamp = self._load_cached("base.md")
+        soul_prompt, soul_stamp = self._load_cached("soul.md")
+
         # Determine which skills to inject based on query
         matched_skills = None
         if query:
             matched_skills = self.skill_provider.find_skills(query)
-            
+
+        key = (
+            base_stamp,
+            soul_stamp,
+            self.skill_provider.version,
+            tuple(skill["name"] for skill in matched_skills or ()),
+        )
+        cached = self._prompt_cache.get(key)
+        if cached is not None:
+            self._prompt_cache.move_to_end(key)
+            return cached
+
         skills_segment = self.skill_provider.get_system_prompt_segment(matched_skills)
         
         # Replace placeholders in base prompt
@@ -41,9 +62,34 @@ class PromptManager:
         if soul_prompt:
             full_prompt += f"\n<personality>\n{soul_prompt}\n</personality>"
             
-        logger.info(f"Assembled system prompt. Length: {len(full_prompt)} chars (Matched skills: {len(matched_skills) if matched_skills else 0})")
+        logger.debug(f"Assembled system prompt. Length: {len(full_prompt)} chars (Matched skills: {len(matched_skills) if matched_skills else 0})")
+        self._prompt_cache[key] = full_prompt
+        while len(self._prompt_cache) > self.MAX_CACHED_PROMPTS:
+            self._prompt_cache.popitem(last=False)
         return full_prompt
 
+    def _load_cached(self, filename: str) -> tuple[str, tuple[int, int] | None]:
+        """
+        Load a prompt file, re-reading it only when it changed on disk
+
+        Returns:
+            Tuple of (content, (mtime_ns, size) stamp or None if missing)
+        """
+        file_path = self.prompt_dir / filename
+        try:
+            stat = file_path.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+
+        cached = self._file_cache.get(filename)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], stamp
+
+        content = self._load_file(filename)
+        self._file_cache[filename] = (stamp, content)
+        return content, stamp
+
     def _load_file(self, filename: str) -> str:
         """Load a prompt file from the prompts directory"""
         file_path = self.prompt_dir / filename
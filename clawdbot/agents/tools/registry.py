@@ -1,7 +1,10 @@
 """Tool registry"""
 
+import json
+from dataclasses import dataclass
 from typing import Any, Optional
 
+from ..persistence.blobs import BlobStore
 from ..session import SessionManager
 from .base import AgentTool
 from .bash import BashTool
@@ -24,11 +27,40 @@ from .sessions import SessionsHistoryTool, SessionsListTool, SessionsSendTool, S
 from .tts import TTSTool
 from .voice_call import VoiceCallTool
 from .read_skill import ReadSkillTool
+from .tool_output import ReadToolOutputTool
 from .web import WebFetchTool, WebSearchTool
 
 
+def format_tool_schema(tool: AgentTool) -> dict[str, Any]:
+    """Format a tool as an OpenAI-style function schema"""
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.get_schema(),
+        },
+    }
+
+
+@dataclass(frozen=True)
+class ToolSchemas:
+    """Formatted function schemas for a set of tools"""
+
+    version: int
+    schemas: list[dict[str, Any]]
+    json_bytes: bytes
+
+
 class ToolRegistry:
-    """Registry of available tools"""
+    """
+    Registry of available tools
+
+    Formatted function schemas are cached per tool set and tagged with the
+    registry version; register() and unregister() bump the version and drop
+    the cache. The cached schema lists (and their serialized JSON) are
+    shared across requests and sessions, so callers must not modify them.
+    """
 
     def __init__(
         self,
@@ -38,6 +70,8 @@ class ToolRegistry:
         cron_callback: Any | None = None,
     ):
         self._tools: dict[str, AgentTool] = {}
+        self._version = 0
+        self._schema_cache: dict[tuple[str, ...] | None, ToolSchemas] = {}
         self._session_manager = session_manager
         self._channel_registry = channel_registry
         self.cron_callback = cron_callback
@@ -67,6 +101,10 @@ class ToolRegistry:
             self.register(SessionsHistoryTool(self._session_manager))
             self.register(SessionsSendTool(self._session_manager))
             self.register(SessionsSpawnTool(self._session_manager))
+            # Paging through large tool outputs stored in the workspace
+            self.register(
+                ReadToolOutputTool(BlobStore.for_workspace(self._session_manager.workspace_dir))
+            )
 
         # Advanced tools
         self.register(BrowserTool())
@@ -96,6 +134,61 @@ class ToolRegistry:
     def register(self, tool: AgentTool) -> None:
         """Register a tool"""
         self._tools[tool.name] = tool
+        self._invalidate()
+
+    def unregister(self, name: str) -> bool:
+        """
+        Unregister a tool
+
+        Args:
+            name: Tool name
+
+        Returns:
+            True if the tool was registered
+        """
+        if self._tools.pop(name, None) is None:
+            return False
+        self._invalidate()
+        return True
+
+    @property
+    def version(self) -> int:
+        """Registry version, incremented on every register/unregister"""
+        return self._version
+
+    def owns(self, tools: list[AgentTool]) -> bool:
+        """Check whether every tool is the instance registered under its name"""
+        return all(self._tools.get(tool.name) is tool for tool in tools)
+
+    def get_tool_schemas(self, tools: list[AgentTool] | None = None) -> ToolSchemas:
+        """
+        Get formatted function schemas, cached until the registry changes
+
+        Args:
+            tools: Registered tools to include (default: all, in registration order)
+
+        Returns:
+            ToolSchemas with the schema list and its serialized JSON
+        """
+        key = None if tools is None else tuple(tool.name for tool in tools)
+        cached = self._schema_cache.get(key)
+        if cached is not None:
+            return cached
+
+        selected = self.list_tools() if tools is None else tools
+        schemas = [format_tool_schema(tool) for tool in selected]
+        cached = ToolSchemas(
+            version=self._version,
+            schemas=schemas,
+            json_bytes=json.dumps(schemas, ensure_ascii=False).encode("utf-8"),
+        )
+        self._schema_cache[key] = cached
+        return cached
+
+    def _invalidate(self) -> None:
+        """Drop cached schemas after the tool set changed"""
+        self._version += 1
+        self._schema_cache.clear()
 
     def get(self, name: str) -> AgentTool | None:
         """Get tool by name"""
@@ -24,20 +24,16 @@ class SessionsListTool(AgentTool):
     async def execute(self, params: dict[str, Any]) -> ToolResult:
         """List sessions"""
         try:
-            session_ids = self.session_manager.list_sessions()
-
-            sessions_info = []
-            for session_id in session_ids:
-                session = self.session_manager.get_session(session_id)
-                sessions_info.append(
-                    {
-                        "session_id": session_id,
-                        "message_count": len(session.messages),
-                        "last_message": (
-                            session.messages[-1].timestamp if session.messages else None
-                        ),
-                    }
-                )
+            summaries = await self.session_manager.list_session_summaries()
+
+            sessions_info = [
+                {
+                    "session_id": summary.session_id,
+                    "message_count": summary.message_count,
+                    "last_message": summary.last_message_ts,
+                }
+                for summary in summaries
+            ]
 
             # Format output
             if sessions_info:
@@ -89,8 +85,7 @@ class SessionsHistoryTool(AgentTool):
             return ToolResult(success=False, content="", error="session_id required")
 
         try:
-            session = self.session_manager.get_session(session_id)
-            messages = session.get_messages(limit=limit)
+            messages = await self.session_manager.get_history(session_id, limit=limit)
 
             if not messages:
                 return ToolResult(
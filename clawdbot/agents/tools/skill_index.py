@@ -0,0 +1,110 @@
+"""
+Multi-pattern substring index for skill matching
+"""
+
+from collections import deque
+from collections.abc import Hashable, Iterable
+
+
+class TermIndex:
+    """
+    Aho-Corasick automaton mapping terms to the values that own them
+
+    ``search(text)`` returns every value with at least one term occurring in
+    ``text`` as a substring, in a single pass over the text. The cost does
+    not depend on how many terms or values are indexed.
+
+    Example:
+        index = TermIndex()
+        index.add("git", "github")
+        index.add("pull request", "github")
+        index.build()
+        index.search("open a pull request")  # {"github"}
+    """
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[set[Hashable]] = [set()]
+        # Values owning an empty term match every text
+        self._always: set[Hashable] = set()
+        self._built = True
+
+    def add(self, term: str, value: Hashable) -> None:
+        """
+        Add a term for a value
+
+        Args:
+            term: Substring to look for (matched as-is, callers normalize case)
+            value: Value returned when the term occurs
+        """
+        if not term:
+            self._always.add(value)
+            return
+
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            node = nxt
+        self._out[node].add(value)
+        self._built = False
+
+    def add_all(self, terms: Iterable[str], value: Hashable) -> None:
+        """Add several terms for the same value"""
+        for term in terms:
+            self.add(term, value)
+
+    def build(self) -> None:
+        """Compute failure links (called automatically by search if needed)"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Terms ending at the fallback state also end here
+                self._out[child] |= self._out[self._fail[child]]
+
+        self._built = True
+
+    def search(self, text: str) -> set[Hashable]:
+        """
+        Find all values with a term occurring in text
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of matched values
+        """
+        if not self._built:
+            self.build()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        matched = set(self._always)
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                matched |= out[node]
+        return matched
+
+    def __len__(self) -> int:
+        """Number of automaton states"""
+        return len(self._goto)
@@ -8,6 +8,8 @@ import yaml
 import logging
 from pathlib import Path
 
+from .skill_index import TermIndex
+
 logger = logging.getLogger(__name__)
 
 class SkillProvider:
@@ -16,6 +18,10 @@ class SkillProvider:
     def __init__(self, skills_dir: str | Path):
         self.skills_dir = Path(skills_dir)
         self.skills = {}
+        # Incremented whenever the skill set changes (used by prompt caches)
+        self.version = 0
+        self._index = TermIndex()
+        self._order: dict[str, int] = {}
         self.load_skills()
 
     def load_skills(self):
@@ -35,6 +41,19 @@ class SkillProvider:
                     except Exception as e:
                         logger.error(f"Failed to load skill from {skill_file}: {e}")
 
+        self._build_index()
+
+    def _build_index(self):
+        """Index lowercase name/description/tag terms of every skill"""
+        self._index = TermIndex()
+        self._order = {}
+        for position, (key, skill) in enumerate(self.skills.items()):
+            self._order[key] = position
+            terms = [skill.get("name"), skill.get("description"), *skill.get("tags", [])]
+            self._index.add_all((str(t).lower() for t in terms if t is not None), key)
+        self._index.build()
+        self.version += 1
+
     def _parse_skill_file(self, file_path: Path) -> dict | None:
         """Parse SKILL.md with YAML frontmatter"""
         content = file_path.read_text(encoding="utf-8")
@@ -59,17 +78,10 @@ class SkillProvider:
         }
 
     def find_skills(self, query: str) -> list[dict]:
-        """Find relevant skills based on query keywords and tags"""
-        query_lower = query.lower()
-        matched = []
-        for skill in self.skills.values():
-            # Check name, description, and tags
-            items_to_check = [skill["name"].lower(), skill["description"].lower()]
-            items_to_check.extend([tag.lower() for tag in skill.get("tags", [])])
-            
-            if any(item in query_lower for item in items_to_check):
-                matched.append(skill)
-        return matched
+        """Find skills whose name, description or a tag occurs in the query"""
+        # Single pass over the query, independent of the number of skills
+        keys = self._index.search(query.lower())
+        return [self.skills[key] for key in sorted(keys, key=self._order.__getitem__)]
 
     def get_system_prompt_segment(self, matched_skills: list[dict] | None = None) -> str:
         """Generate a summarized system prompt segment. 
@@ -0,0 +1,111 @@
+"""Large tool outputs - offloading and paged retrieval"""
+
+import logging
+from typing import Any
+
+from ..persistence.blobs import BlobStore
+from .base import AgentTool, ToolResult
+
+logger = logging.getLogger(__name__)
+
+# Name of the tool that pages through offloaded outputs
+READ_TOOL_OUTPUT = "read_tool_output"
+
+# Characters returned per read_tool_output call (default and maximum)
+DEFAULT_PAGE_SIZE = 8000
+MAX_PAGE_SIZE = 20000
+
+
+def offload_output(store: BlobStore, content: str, preview_chars: int = 2000) -> str:
+    """
+    Store a tool output and build the reference kept in the session
+
+    Args:
+        store: Blob store receiving the full output
+        content: Full tool output
+        preview_chars: Characters of the output kept inline (start and end)
+
+    Returns:
+        A preview of the output plus the handle to read the rest with
+    """
+    handle = store.put(content)
+    head_chars = preview_chars * 3 // 4
+    tail_chars = preview_chars - head_chars
+    omitted = len(content) - head_chars - tail_chars
+
+    parts = [content[:head_chars]]
+    if omitted > 0:
+        parts.append(f"\n[... {omitted} characters omitted ...]\n")
+        if tail_chars:
+            parts.append(content[-tail_chars:])
+    else:
+        parts.append(content[head_chars:])
+    parts.append(
+        f"\n\n[Full output: {len(content)} characters, stored as {handle}. "
+        f'Call read_tool_output with handle="{handle}" and an offset to read more.]'
+    )
+    return "".join(parts)
+
+
+class ReadToolOutputTool(AgentTool):
+    """Page through a tool output stored out of band"""
+
+    def __init__(self, store: BlobStore):
+        super().__init__()
+        self.name = READ_TOOL_OUTPUT
+        self.description = (
+            "Read part of a large tool output that was stored out of band. "
+            "Use the handle given in the truncated result."
+        )
+        # Pages are already small; storing them again would only add handles
+        self.offload = False
+        self.store = store
+
+    def get_schema(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "handle": {"type": "string", "description": "Handle of the stored output"},
+                "offset": {
+                    "type": "integer",
+                    "description": "First character to read (default: 0)",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": (
+                        f"Characters to read (default: {DEFAULT_PAGE_SIZE}, "
+                        f"max: {MAX_PAGE_SIZE})"
+                    ),
+                },
+            },
+            "required": ["handle"],
+        }
+
+    async def execute(self, params: dict[str, Any]) -> ToolResult:
+        """Read a page of a stored output"""
+        handle = str(params.get("handle", "")).strip()
+        if not handle:
+            return ToolResult(success=False, content="", error="handle is required")
+
+        try:
+            offset = max(0, int(params.get("offset") or 0))
+            limit = min(MAX_PAGE_SIZE, max(1, int(params.get("limit") or DEFAULT_PAGE_SIZE)))
+        except (TypeError, ValueError):
+            return ToolResult(success=False, content="", error="offset and limit must be integers")
+
+        content = self.store.get(handle)
+        if content is None:
+            return ToolResult(success=False, content="", error=f"No stored output {handle}")
+
+        end = min(len(content), offset + limit)
+        page = content[offset:end]
+        if end < len(content):
+            footer = f"\n\n[Characters {offset}-{end} of {len(content)}. Next offset: {end}]"
+        else:
+            footer = f"\n\n[Characters {offset}-{end} of {len(content)}. End of output]"
+
+        return ToolResult(
+            success=True,
+            content=page + footer,
+            metadata={"handle": handle, "offset": offset, "end": end, "total": len(content)},
+        )
@@ -5,18 +5,20 @@ This module provides OpenAI-compatible API endpoints for ClawdBot,
 allowing it to be used as a drop-in replacement for OpenAI in many applications.
 """
 
+import json
 import logging
 import os
 import time
 import uuid
 from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from ..agents.runtime import AgentRuntime
+from ..agents.runtime import AgentRuntime, get_runtime_pool
 from ..agents.session import SessionManager
+from ..agents.tokenizers import get_tokenizer
 from ..agents.tools.prompt_manager import get_prompt_manager
 
 logger = logging.getLogger(__name__)
@@ -188,7 +190,9 @@ async def get_model(model_id: str):
 
 @router.post("/chat/completions")
 async def chat_completions(
-    request: ChatCompletionRequest, authorization: str | None = Header(None)
+    request: ChatCompletionRequest,
+    http_request: Request,
+    authorization: str | None = Header(None),
 ):
     """
     Create chat completion
@@ -242,17 +246,23 @@ async def chat_completions(
     from ..config import get_settings
     settings = get_settings()
     
-    runtime = AgentRuntime(
-        model=model,
-        base_url=settings.agent.base_url,
-        api_key=settings.agent.api_key
-    )
-
     # Get tools from registry
     from ..agents.tools.registry import get_tool_registry
     tool_registry = get_tool_registry(_session_manager)
     tools = tool_registry.list_tools()
 
+    # Shared runtime (and provider connection pool) for this model
+    runtime = get_runtime_pool().get(
+        model,
+        base_url=settings.agent.base_url,
+        api_key=settings.agent.api_key,
+        tool_registry=tool_registry,
+    )
+
+    # Share the global queue fairly per API key (set by AuthMiddleware)
+    api_key = getattr(http_request.state, "api_key", None)
+    tenant = f"key:{api_key.key_id}" if api_key else None
+
     if request.stream:
         # Streaming response
         async def stream_response() -> AsyncIterator[str]:
@@ -282,6 +292,7 @@ async def chat_completions(
                     "",  # Empty message since we already added messages
                     tools=tools,
                     max_tokens=request.max_tokens or 4096,
+                    tenant=tenant,
                 ):
                     if event.type == "assistant":
                         delta = event.data.get("delta", {})
@@ -365,6 +376,11 @@ async def chat_completions(
                         yield f"data: {chunk.model_dump_json()}\n\n"
                         logger.info(f"Tool result streamed: {event.data.get('tool')}")
 
+                    elif event.type == "queue":
+                        # Queue position while the turn waits for a slot; an SSE
+                        # comment, so OpenAI clients that don't know it skip it
+                        yield f": queue {json.dumps(event.data)}\n\n"
+
                 # Send final chunk with usage if available
                 duration = (time.time() - start_time) * 1000
                 final_chunk = ChatCompletionChunk(
@@ -397,6 +413,9 @@ async def chat_completions(
 
     else:
         # Non-streaming response
+        try:
+            response_text = ""
+
             # Metadata tracking
             total_usage = None
             system_fingerprint = None
@@ -406,6 +425,7 @@ async def chat_completions(
                 "",  # Empty message since we already added messages
                 tools=tools,
                 max_tokens=request.max_tokens or 4096,
+                tenant=tenant,
             ):
                 if event.type == "assistant":
                     delta = event.data.get("delta", {})
@@ -420,8 +440,11 @@ async def chat_completions(
 
             # Fallback estimation if no usage reported
             if not total_usage:
-                prompt_tokens = sum(len(m.content) // 4 for m in request.messages if m.content)
-                completion_tokens = len(response_text) // 4
+                tokenizer = get_tokenizer(request.model)
+                prompt_tokens = tokenizer.count_messages(
+                    [{"role": m.role, "content": m.content} for m in request.messages]
+                )
+                completion_tokens = tokenizer.count(response_text)
                 total_usage = ChatCompletionUsage(
                     prompt_tokens=prompt_tokens,
                     completion_tokens=completion_tokens,
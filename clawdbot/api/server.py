@@ -12,7 +12,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
-from ..agents.runtime import AgentRuntime
+from ..agents.providers import get_provider_pool
+from ..agents.runtime import AgentRuntime, get_runtime_pool
 from ..agents.session import SessionManager
 from ..channels.registry import ChannelRegistry
 from ..monitoring import get_health_check, get_metrics
@@ -97,7 +98,14 @@ class ChannelSendResponse(BaseModel):
 
 
 # Import authentication
-from ..auth import setup_auth_middleware, verify_api_key
+from ..auth import (
+    SQLiteRateLimitBackend,
+    configure_rate_limiters,
+    get_api_key_manager,
+    get_rate_limit_registry,
+    setup_auth_middleware,
+    verify_api_key,
+)
 
 
 @asynccontextmanager
@@ -133,10 +141,28 @@ async def lifespan(app: FastAPI):
     # Initialize OpenAI-compatible API
     _init_openai_compat()
 
+    # Write API key last-used times in batches
+    api_keys = get_api_key_manager()
+    api_keys.start_last_used_flusher()
+
+    # Sweep recovered rate limit state outside the request path
+    rate_limits = get_rate_limit_registry()
+    rate_limits.start_expiry()
+
     yield
 
     logger.info("Shutting down API server...")
 
+    await api_keys.stop_last_used_flusher()
+    await rate_limits.stop_expiry()
+
+    # Persist any write-behind session state
+    if _session_manager:
+        _session_manager.close()
+
+    # Release pooled backend connections
+    await get_provider_pool().aclose()
+
 
 def create_app() -> FastAPI:
     """Create FastAPI application"""
@@ -156,6 +182,20 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Rate limits per route class and API key; each worker process builds its
+    # own app, so a SQLite backend makes all workers on the host share them
+    from ..config import get_settings
+
+    settings = get_settings()
+    backend = None
+    if settings.api.rate_limit_backend == "sqlite":
+        backend = SQLiteRateLimitBackend(
+            settings.api.rate_limit_db or settings.workspace_dir / ".ratelimit" / "limits.db",
+            busy_timeout=settings.api.rate_limit_busy_timeout,
+            fail_open=settings.api.rate_limit_fail_open,
+        )
+    configure_rate_limiters(backend, route_limits=settings.api.rate_limits)
+
     # Setup authentication middleware
     # Note: This adds API key validation and rate limiting to all endpoints
     # except those in skip_auth_paths
@@ -249,30 +289,43 @@ def create_app() -> FastAPI:
             # Get or create session
             session = _session_manager.get_session(request.session_id)
 
-            # Create runtime with specified model if provided
-            runtime = _runtime
-            if request.model:
-                runtime = AgentRuntime(model=request.model)
-
             # Get tools from registry
             from ..agents.tools.registry import get_tool_registry
             tool_registry = get_tool_registry(_session_manager)
             tools = tool_registry.list_tools()
 
+            # Use a pooled runtime for the specified model if provided
+            runtime = _runtime
+            if request.model:
+                runtime = get_runtime_pool().get(request.model, tool_registry=tool_registry)
+
             # Execute agent turn
             response_text = ""
+            queue = []
             async for event in runtime.run_turn(
-                session, request.message, tools=tools, max_tokens=request.max_tokens
+                session,
+                request.message,
+                tools=tools,
+                max_tokens=request.max_tokens,
+                # Share the global queue fairly per API key
+                tenant=f"key:{api_key.key_id}",
             ):
                 if event.type == "assistant" and "delta" in event.data:
                     delta = event.data["delta"]
                     if "text" in delta:
                         response_text += delta["text"]
+                elif event.type == "queue":
+                    # Queue positions the turn waited at (session and global lanes)
+                    queue.append(event.data)
 
             return AgentResponse(
                 session_id=request.session_id,
                 response=response_text,
-                metadata={"message_count": len(session.messages), "model": runtime.model_str},
+                metadata={
+                    "message_count": len(session.messages),
+                    "model": runtime.model_str,
+                    "queue": queue,
+                },
             )
 
         except Exception as e:
@@ -3,17 +3,37 @@ Authentication and authorization module
 """
 
 from .api_keys import APIKey, APIKeyManager, get_api_key_manager, verify_api_key
+from .backends import MemoryRateLimitBackend, RateLimitBackend, SQLiteRateLimitBackend
+from .key_store import JSONKeyStore, KeyStore, SQLiteKeyStore
 from .middleware import AuthMiddleware, setup_auth_middleware
-from .rate_limiter import RateLimiter, RateLimitExceeded, rate_limit
+from .rate_limiter import (
+    RateLimiter,
+    RateLimitExceeded,
+    RateLimitRegistry,
+    RateLimitResult,
+    configure_rate_limiters,
+    get_rate_limit_registry,
+    rate_limit,
+)
 
 __all__ = [
     "APIKeyManager",
     "APIKey",
     "verify_api_key",
     "get_api_key_manager",
+    "KeyStore",
+    "JSONKeyStore",
+    "SQLiteKeyStore",
     "RateLimiter",
     "RateLimitExceeded",
+    "RateLimitResult",
+    "RateLimitRegistry",
+    "get_rate_limit_registry",
     "rate_limit",
+    "configure_rate_limiters",
+    "RateLimitBackend",
+    "MemoryRateLimitBackend",
+    "SQLiteRateLimitBackend",
     "AuthMiddleware",
     "setup_auth_middleware",
 ]
@@ -2,17 +2,22 @@
 API key management and validation
 """
 
+import asyncio
 import hashlib
-import json
 import logging
 import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from datetime import UTC, datetime, timedelta
 
-from fastapi import Header, HTTPException, status
+from fastapi import Header, HTTPException, Request, status
 from pydantic import BaseModel, Field
 
+from .key_store import JSONKeyStore, KeyStore, SQLiteKeyStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,6 +58,16 @@ class APIKeyManager:
     """
     Manages API keys with validation and rotation
 
+    Keys are persisted in a KeyStore (SQLite by default, so creating or
+    revoking a key writes one row). Validation hashes a raw key once per
+    ``cache_ttl`` seconds: after that the hash is looked up in the store
+    again, which also picks up keys created or revoked by other processes.
+    Unknown keys are remembered (by hash) for ``negative_ttl`` seconds, and
+    ``avalidate_key`` runs store lookups in a worker thread so invalid keys
+    cannot make the event loop wait on the database.
+    Last-used timestamps are kept in memory and written in batches by
+    ``flush_last_used`` (run periodically by ``start_last_used_flusher``).
+
     Example:
         manager = APIKeyManager()
         key = manager.create_key("my-app", permissions={"read", "write"})
@@ -63,10 +78,50 @@ class APIKeyManager:
             print("Valid key!")
     """
 
-    def __init__(self, storage_path: str = "data/api_keys.json"):
+    def __init__(
+        self,
+        storage_path: str = "data/api_keys.db",
+        store: KeyStore | None = None,
+        cache_ttl: float = 60.0,
+        cache_size: int = 1024,
+        negative_ttl: float = 5.0,
+    ):
+        """
+        Initialize manager
+
+        Args:
+            storage_path: Key database (a ``.json`` path uses the legacy JSON file)
+            store: Key storage (overrides storage_path)
+            cache_ttl: Seconds a validated raw key is trusted before re-checking the store
+            cache_size: Maximum cached raw keys (and, separately, unknown key hashes)
+            negative_ttl: Seconds an unknown key is rejected without a store lookup
+        """
         self._keys: dict[str, APIKey] = {}
         self._hash_to_key: dict[str, str] = {}  # hash -> key_id mapping
         self.storage_path = Path(storage_path)
+        if store is None:
+            if self.storage_path.suffix == ".json":
+                store = JSONKeyStore(self.storage_path)
+            else:
+                # Import keys from the legacy JSON file next to the database
+                store = SQLiteKeyStore(
+                    self.storage_path, legacy_json=self.storage_path.with_suffix(".json")
+                )
+        self._store = store
+
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        # raw key -> (key_id, monotonic deadline)
+        self._cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.negative_ttl = negative_ttl
+        # hash of an unknown key -> monotonic deadline
+        self._invalid: OrderedDict[str, float] = OrderedDict()
+
+        # key_id -> last used timestamp not yet written
+        self._last_used_pending: dict[str, datetime] = {}
+        self._pending_lock = threading.Lock()
+        self._flusher: asyncio.Task | None = None
+
         self.load_keys()
 
     def create_key(
@@ -110,11 +165,11 @@ class APIKeyManager:
         )
 
         # Store
-        self._keys[key_id] = api_key
-        self._hash_to_key[key_hash] = key_id
+        self._remember(api_key)
+        self._invalid.pop(key_hash, None)
 
         # Persist
-        self.save_keys()
+        self._persist(api_key)
 
         logger.info(f"Created API key: {key_id} for {name}")
 
@@ -133,20 +188,46 @@ class APIKeyManager:
         if not raw_key or not raw_key.startswith("clb_"):
             return None
 
-        key_hash = self._hash_key(raw_key)
-        key_id = self._hash_to_key.get(key_hash)
+        now = time.monotonic()
+        cached = self._cache.get(raw_key)
+        if cached is not None and cached[1] > now:
+            api_key = self._keys.get(cached[0])
+        else:
+            key_hash = self._hash_key(raw_key)
+            if self._known_invalid(key_hash, now):
+                return None
+            api_key = self._resolve(raw_key, key_hash, self._fetch(key_hash), now)
 
-        if not key_id:
-            return None
+        return self._accept(api_key)
 
-        api_key = self._keys.get(key_id)
-        if not api_key or not api_key.is_valid():
+    async def avalidate_key(self, raw_key: str) -> APIKey | None:
+        """
+        Validate an API key without blocking the event loop
+
+        Same as validate_key, but a store lookup (cache miss) runs in a
+        worker thread.
+
+        Args:
+            raw_key: The raw API key string
+
+        Returns:
+            APIKey object if valid, None otherwise
+        """
+        if not raw_key or not raw_key.startswith("clb_"):
             return None
 
-        # Update last used
-        api_key.update_last_used()
+        now = time.monotonic()
+        cached = self._cache.get(raw_key)
+        if cached is not None and cached[1] > now:
+            api_key = self._keys.get(cached[0])
+        else:
+            key_hash = self._hash_key(raw_key)
+            if self._known_invalid(key_hash, now):
+                return None
+            fetched = await asyncio.to_thread(self._fetch, key_hash)
+            api_key = self._resolve(raw_key, key_hash, fetched, time.monotonic())
 
-        return api_key
+        return self._accept(api_key)
 
     def revoke_key(self, key_id: str) -> bool:
         """
@@ -160,7 +241,7 @@ class APIKeyManager:
         """
         if key_id in self._keys:
             self._keys[key_id].enabled = False
-            self.save_keys()
+            self._persist(self._keys[key_id])
             logger.info(f"Revoked API key: {key_id}")
             return True
         return False
@@ -179,7 +260,12 @@ class APIKeyManager:
             api_key = self._keys[key_id]
             del self._hash_to_key[api_key.key_hash]
             del self._keys[key_id]
-            self.save_keys()
+            with self._pending_lock:
+                self._last_used_pending.pop(key_id, None)
+            try:
+                self._store.delete(key_id)
+            except Exception as e:
+                logger.error(f"Failed to delete API key {key_id}: {e}")
             logger.info(f"Deleted API key: {key_id}")
             return True
         return False
@@ -196,6 +282,86 @@ class APIKeyManager:
         """Hash an API key"""
         return hashlib.sha256(raw_key.encode()).hexdigest()
 
+    def _accept(self, api_key: APIKey | None) -> APIKey | None:
+        """Check a looked-up key and record its use"""
+        if not api_key or not api_key.is_valid():
+            return None
+
+        # Update last used (written by flush_last_used)
+        api_key.update_last_used()
+        with self._pending_lock:
+            self._last_used_pending[api_key.key_id] = api_key.last_used
+
+        return api_key
+
+    def _known_invalid(self, key_hash: str, now: float) -> bool:
+        """Whether a key hash was recently not found in the store"""
+        deadline = self._invalid.get(key_hash)
+        if deadline is None:
+            return False
+        if deadline > now:
+            return True
+        del self._invalid[key_hash]
+        return False
+
+    def _fetch(self, key_hash: str) -> tuple[bool, APIKey | None]:
+        """
+        Read a key from the store (may run in a worker thread)
+
+        Returns:
+            (ok, key): ok is False if the store could not be read
+        """
+        try:
+            return True, self._store.get_by_hash(key_hash)
+        except Exception as e:
+            logger.error(f"API key lookup failed, using cached keys: {e}")
+            return False, None
+
+    def _resolve(
+        self, raw_key: str, key_hash: str, fetched: tuple[bool, APIKey | None], now: float
+    ) -> APIKey | None:
+        """Apply a store lookup to the in-memory index and caches"""
+        ok, stored = fetched
+        if not ok:
+            key_id = self._hash_to_key.get(key_hash)
+            return self._keys.get(key_id) if key_id else None
+
+        if stored is None:
+            # Deleted (possibly by another process) or never existed
+            key_id = self._hash_to_key.pop(key_hash, None)
+            if key_id:
+                self._keys.pop(key_id, None)
+            self._cache.pop(raw_key, None)
+            self._invalid[key_hash] = now + self.negative_ttl
+            self._invalid.move_to_end(key_hash)
+            while len(self._invalid) > self.cache_size:
+                self._invalid.popitem(last=False)
+            return None
+
+        current = self._keys.get(stored.key_id)
+        if current is not stored:
+            if current is not None and current.last_used:
+                stored.last_used = max(filter(None, (stored.last_used, current.last_used)))
+            self._remember(stored)
+
+        self._cache[raw_key] = (stored.key_id, now + self.cache_ttl)
+        self._cache.move_to_end(raw_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return stored
+
+    def _remember(self, api_key: APIKey) -> None:
+        """Index a key in memory"""
+        self._keys[api_key.key_id] = api_key
+        self._hash_to_key[api_key.key_hash] = api_key.key_id
+
+    def _persist(self, api_key: APIKey) -> None:
+        """Write one key to the store"""
+        try:
+            self._store.put(api_key)
+        except Exception as e:
+            logger.error(f"Failed to save API key {api_key.key_id}: {e}")
+
     def cleanup_expired(self) -> int:
         """
         Remove expired keys
@@ -211,50 +377,85 @@ class APIKeyManager:
         for key_id in expired:
             self.delete_key(key_id)
 
-        if expired:
-            self.save_keys()
-
         return len(expired)
 
-    def save_keys(self) -> None:
-        """Save keys to storage"""
+    def flush_last_used(self) -> int:
+        """
+        Write pending last-used timestamps in one batch
+
+        Returns:
+            Number of keys written
+        """
+        with self._pending_lock:
+            pending, self._last_used_pending = self._last_used_pending, {}
+        if not pending:
+            return 0
+
         try:
-            # Create directory if it doesn't exist
-            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+            self._store.update_last_used(pending)
+        except Exception as e:
+            logger.error(f"Failed to save API key last-used times: {e}")
+            with self._pending_lock:
+                for key_id, ts in pending.items():
+                    self._last_used_pending.setdefault(key_id, ts)
+            return 0
+        return len(pending)
+
+    async def aflush_last_used(self) -> int:
+        """Write pending last-used timestamps without blocking the event loop"""
+        return await asyncio.to_thread(self.flush_last_used)
+
+    def start_last_used_flusher(self, interval: float = 30.0) -> asyncio.Task:
+        """
+        Periodically flush last-used timestamps in the background
 
-            # Prepare data
-            data = [key.model_dump(mode="json") for key in self._keys.values()]
+        Args:
+            interval: Seconds between flushes
 
-            # Write to file
-            with open(self.storage_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        Returns:
+            The flusher task
+        """
+        if self._flusher is None or self._flusher.done():
+
+            async def run() -> None:
+                while True:
+                    await asyncio.sleep(interval)
+                    await self.aflush_last_used()
+
+            self._flusher = asyncio.create_task(run())
+        return self._flusher
+
+    async def stop_last_used_flusher(self) -> None:
+        """Stop the background flusher and write what is pending"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.aflush_last_used()
 
-            logger.debug(f"Saved {len(data)} API keys to {self.storage_path}")
+    def save_keys(self) -> None:
+        """Save all keys to storage"""
+        try:
+            self._store.put_many(list(self._keys.values()))
+            logger.debug(f"Saved {len(self._keys)} API keys to {self.storage_path}")
         except Exception as e:
             logger.error(f"Failed to save API keys: {e}")
 
     def load_keys(self) -> None:
         """Load keys from storage"""
-        if not self.storage_path.exists():
-            return
-
         try:
-            with open(self.storage_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            for key_data in data:
-                try:
-                    # Convert strings to datetime if needed (Pydantic handles ISO strings)
-                    api_key = APIKey(**key_data)
-                    self._keys[api_key.key_id] = api_key
-                    self._hash_to_key[api_key.key_hash] = api_key.key_id
-                except Exception as e:
-                    logger.error(f"Failed to parse API key data: {e}")
-
-            logger.info(f"Loaded {len(self._keys)} API keys from {self.storage_path}")
+            keys = self._store.load_all()
         except Exception as e:
             logger.error(f"Failed to load API keys: {e}")
+            return
 
+        for api_key in keys:
+            self._remember(api_key)
+        if keys:
+            logger.info(f"Loaded {len(self._keys)} API keys from {self.storage_path}")
 
 
 # Global API key manager
@@ -282,15 +483,22 @@ def get_api_key_manager() -> APIKeyManager:
 
 
 # FastAPI dependency
-async def verify_api_key(x_api_key: str | None = Header(None)) -> APIKey:
+async def verify_api_key(request: Request, x_api_key: str | None = Header(None)) -> APIKey:
     """
     Verify API key from header
 
+    Reuses the key AuthMiddleware already validated for this request
+    (``request.state.api_key``), so a key is validated once per request.
+
     Use as FastAPI dependency:
         @app.get("/protected")
         async def endpoint(api_key: APIKey = Depends(verify_api_key)):
             ...
     """
+    validated = getattr(request.state, "api_key", None)
+    if validated is not None:
+        return validated
+
     if not x_api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -299,7 +507,7 @@ async def verify_api_key(x_api_key: str | None = Header(None)) -> APIKey:
         )
 
     manager = get_api_key_manager()
-    api_key = manager.validate_key(x_api_key)
+    api_key = await manager.avalidate_key(x_api_key)
 
     if not api_key:
         raise HTTPException(
@@ -0,0 +1,281 @@
+"""
+Storage backends for rate limiter state
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+from ..monitoring.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for GCRA rate limiter state
+
+    A backend maps each key to its theoretical arrival time (TAT) and applies
+    one GCRA step atomically, so several limiters (or several processes)
+    sharing a backend enforce one combined limit.
+    """
+
+    #: Time source used by limiters on this backend by default
+    clock: Callable[[], float] = staticmethod(time.monotonic)
+
+    @abstractmethod
+    def update(self, key: str, now: float, interval: float, tolerance: float) -> tuple[bool, float]:
+        """
+        Apply one GCRA step for a key
+
+        Args:
+            key: Limited identifier (already namespaced by the limiter)
+            now: Current time from the limiter's clock
+            interval: Seconds per request at the sustained rate
+            tolerance: How far the arrival time may run ahead of now (interval * burst)
+
+        Returns:
+            (allowed, tat): whether the request is allowed, and the key's
+            arrival time after the step (unchanged when denied)
+        """
+
+    async def aupdate(
+        self, key: str, now: float, interval: float, tolerance: float
+    ) -> tuple[bool, float]:
+        """Apply one GCRA step from async code (see update)"""
+        return self.update(key, now, interval, tolerance)
+
+    @abstractmethod
+    def get(self, key: str) -> float | None:
+        """Get the stored arrival time for a key"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Forget a key"""
+
+    @abstractmethod
+    def clear(self, prefix: str = "") -> None:
+        """Forget all keys starting with prefix"""
+
+    @abstractmethod
+    def expire(self, now: float) -> int:
+        """
+        Drop keys whose allowance has fully recovered
+
+        Args:
+            now: Current time from the limiters' clock
+
+        Returns:
+            Number of keys removed
+        """
+
+    async def aexpire(self, now: float) -> int:
+        """Drop recovered keys from async code (see expire)"""
+        return self.expire(now)
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of keys stored"""
+
+    def close(self) -> None:
+        """Release resources"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process rate limiter state
+
+    Keys are kept in last-update order; every update drops a few of the
+    stalest keys once they have recovered, so idle clients are expired
+    incrementally without a background task.
+    """
+
+    # Idle keys examined per update
+    EXPIRE_BATCH = 4
+
+    def __init__(self):
+        self._tat: OrderedDict[str, float] = OrderedDict()
+
+    def update(self, key: str, now: float, interval: float, tolerance: float) -> tuple[bool, float]:
+        tat_map = self._tat
+        for _ in range(self.EXPIRE_BATCH):
+            if not tat_map:
+                break
+            oldest = next(iter(tat_map))
+            if tat_map[oldest] > now:
+                break
+            del tat_map[oldest]
+
+        tat = tat_map.get(key, now)
+        new_tat = max(tat, now) + interval
+        if new_tat - now > tolerance:
+            return False, tat
+
+        tat_map[key] = new_tat
+        tat_map.move_to_end(key)
+        return True, new_tat
+
+    def get(self, key: str) -> float | None:
+        return self._tat.get(key)
+
+    def delete(self, key: str) -> None:
+        self._tat.pop(key, None)
+
+    def clear(self, prefix: str = "") -> None:
+        if not prefix:
+            self._tat.clear()
+            return
+        for key in [k for k in self._tat if k.startswith(prefix)]:
+            del self._tat[key]
+
+    def expire(self, now: float) -> int:
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    tat REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rate_limits_tat ON rate_limits(tat);
+"""
+
+# One atomic GCRA step: insert or advance the arrival time only if allowed.
+# Returns no row when the request is denied.
+UPDATE_SQL = """
+INSERT INTO rate_limits (key, tat) VALUES (:key, :now + :interval)
+ON CONFLICT(key) DO UPDATE SET tat = max(tat, :now) + :interval
+    WHERE max(tat, :now) + :interval - :now <= :tolerance
+RETURNING tat
+"""
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Rate limiter state shared through a SQLite database in WAL mode
+
+    Every process on the host that opens the same file shares the limits,
+    so running the API server with several workers does not multiply them.
+    Each check is a single UPSERT, which SQLite applies atomically across
+    processes. Wall-clock time is used so stored values mean the same thing
+    in every process and across restarts.
+
+    Under contention: async callers (``aupdate``, used by AuthMiddleware)
+    run the UPSERT in a worker thread, so waiting for another process that
+    holds the write lock never stalls the event loop. A check waits up to
+    ``busy_timeout`` for the lock. If it still cannot get it, the request is
+    let through when ``fail_open`` is set (the default, so an overloaded
+    store does not take the API down) and denied otherwise. Every fail-open
+    decision is counted in ``rate_limit_fail_open_total``. A non-zero rate
+    there means the shared limit was not enforced for those requests; raise
+    the timeout or set ``fail_open=False`` if the limit must hold.
+
+    Recovered keys are not swept inline; run ``aexpire`` periodically (see
+    RateLimitRegistry.start_expiry).
+
+    Example:
+        backend = SQLiteRateLimitBackend(workspace / ".ratelimit.db")
+        limiter = RateLimiter(requests_per_minute=100, backend=backend)
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, db_path: Path | str, busy_timeout: float = 5.0, fail_open: bool = True):
+        """
+        Initialize backend
+
+        Args:
+            db_path: Database file (created if missing)
+            busy_timeout: Seconds to wait for another process holding the write lock
+            fail_open: Allow requests when the lock cannot be taken in time
+                (otherwise they are denied)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.fail_open = fail_open
+        self._fail_open_count = get_metrics().counter(
+            "rate_limit_fail_open_total", "Requests allowed because the rate limit store was busy"
+        )
+
+        self._conn = sqlite3.connect(
+            str(self.db_path), timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def update(self, key: str, now: float, interval: float, tolerance: float) -> tuple[bool, float]:
+        params = {"key": key, "now": now, "interval": interval, "tolerance": tolerance}
+        try:
+            with self._lock:
+                row = self._conn.execute(UPDATE_SQL, params).fetchone()
+                if row is not None:
+                    return True, row[0]
+                current = self._conn.execute(
+                    "SELECT tat FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            if self.fail_open:
+                self._fail_open_count.inc()
+                logger.warning(f"Rate limit store busy, allowing request: {e}")
+                return True, now
+            logger.warning(f"Rate limit store busy, denying request: {e}")
+            # Deny for one interval
+            return False, now + tolerance
+        return False, current[0] if current else now
+
+    async def aupdate(
+        self, key: str, now: float, interval: float, tolerance: float
+    ) -> tuple[bool, float]:
+        """Apply one GCRA step in a worker thread"""
+        return await asyncio.to_thread(self.update, key, now, interval, tolerance)
+
+    def get(self, key: str) -> float | None:
+        with self._lock:
+            row = self._conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def clear(self, prefix: str = "") -> None:
+        with self._lock:
+            if prefix:
+                self._conn.execute(
+                    "DELETE FROM rate_limits WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                )
+            else:
+                self._conn.execute("DELETE FROM rate_limits")
+
+    def expire(self, now: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+        if cursor.rowcount:
+            logger.debug(f"Expired {cursor.rowcount} idle rate limit keys")
+        return cursor.rowcount
+
+    async def aexpire(self, now: float) -> int:
+        """Sweep recovered keys in a worker thread"""
+        return await asyncio.to_thread(self.expire, now)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
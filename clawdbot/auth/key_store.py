@@ -0,0 +1,240 @@
+"""
+Persistent storage for API keys
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .api_keys import APIKey
+
+logger = logging.getLogger(__name__)
+
+
+class KeyStore(ABC):
+    """
+    Storage for API keys
+
+    Writes touch only the keys that changed, and last-used timestamps are
+    written in batches separately from key definitions.
+    """
+
+    @abstractmethod
+    def load_all(self) -> list[APIKey]:
+        """Load every stored key"""
+
+    @abstractmethod
+    def get_by_hash(self, key_hash: str) -> APIKey | None:
+        """Look up a key by the hash of its raw value"""
+
+    @abstractmethod
+    def put(self, api_key: APIKey) -> None:
+        """Insert or replace one key"""
+
+    def put_many(self, api_keys: list[APIKey]) -> None:
+        """Insert or replace several keys"""
+        for api_key in api_keys:
+            self.put(api_key)
+
+    @abstractmethod
+    def delete(self, key_id: str) -> None:
+        """Delete one key"""
+
+    @abstractmethod
+    def update_last_used(self, last_used: dict[str, datetime]) -> None:
+        """
+        Record last-used timestamps for several keys
+
+        Args:
+            last_used: key_id -> timestamp
+        """
+
+    def close(self) -> None:
+        """Release resources"""
+
+
+class JSONKeyStore(KeyStore):
+    """
+    Keys in a single JSON file (legacy format)
+
+    Every write rewrites the whole file; use SQLiteKeyStore for anything
+    beyond a handful of keys.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._keys: dict[str, APIKey] = {}
+
+    def load_all(self) -> list[APIKey]:
+        from .api_keys import APIKey
+
+        self._keys = {}
+        if not self.path.exists():
+            return []
+
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        for key_data in data:
+            try:
+                api_key = APIKey(**key_data)
+                self._keys[api_key.key_id] = api_key
+            except Exception as e:
+                logger.error(f"Failed to parse API key data: {e}")
+        return list(self._keys.values())
+
+    def get_by_hash(self, key_hash: str) -> APIKey | None:
+        for api_key in self._keys.values():
+            if api_key.key_hash == key_hash:
+                return api_key
+        return None
+
+    def put(self, api_key: APIKey) -> None:
+        self._keys[api_key.key_id] = api_key
+        self._write()
+
+    def put_many(self, api_keys: list[APIKey]) -> None:
+        for api_key in api_keys:
+            self._keys[api_key.key_id] = api_key
+        self._write()
+
+    def delete(self, key_id: str) -> None:
+        if self._keys.pop(key_id, None) is not None:
+            self._write()
+
+    def update_last_used(self, last_used: dict[str, datetime]) -> None:
+        for key_id, ts in last_used.items():
+            if key_id in self._keys:
+                self._keys[key_id].last_used = ts
+        self._write()
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = [key.model_dump(mode="json") for key in self._keys.values()]
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.path)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS api_keys (
+    key_id TEXT PRIMARY KEY,
+    key_hash TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL,
+    last_used TEXT
+);
+"""
+
+
+class SQLiteKeyStore(KeyStore):
+    """
+    Keys in a SQLite database, indexed by key id and hash
+
+    Creating or revoking a key writes one row; last-used timestamps live in
+    their own column and are updated in one transaction per batch. Several
+    API worker processes can share the database (WAL mode), and a key
+    created by one is found by the others through ``get_by_hash``.
+    """
+
+    def __init__(self, db_path: Path | str, legacy_json: Path | str | None = None):
+        """
+        Initialize store
+
+        Args:
+            db_path: Database file (created if missing)
+            legacy_json: JSON key file imported once if the database is empty
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        if legacy_json is not None:
+            self._import_legacy(Path(legacy_json))
+
+    def load_all(self) -> list[APIKey]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data, last_used FROM api_keys").fetchall()
+        return [key for key in (self._row_to_key(row) for row in rows) if key is not None]
+
+    def get_by_hash(self, key_hash: str) -> APIKey | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, last_used FROM api_keys WHERE key_hash = ?", (key_hash,)
+            ).fetchone()
+        return self._row_to_key(row) if row else None
+
+    def put(self, api_key: APIKey) -> None:
+        self.put_many([api_key])
+
+    def put_many(self, api_keys: list[APIKey]) -> None:
+        rows = [
+            (
+                key.key_id,
+                key.key_hash,
+                key.model_dump_json(exclude={"last_used"}),
+                key.last_used.isoformat() if key.last_used else None,
+            )
+            for key in api_keys
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO api_keys (key_id, key_hash, data, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key_id) DO UPDATE SET key_hash = excluded.key_hash, "
+                "data = excluded.data, last_used = coalesce(excluded.last_used, last_used)",
+                rows,
+            )
+
+    def delete(self, key_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM api_keys WHERE key_id = ?", (key_id,))
+
+    def update_last_used(self, last_used: dict[str, datetime]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE api_keys SET last_used = ? WHERE key_id = ?",
+                [(ts.isoformat(), key_id) for key_id, ts in last_used.items()],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _row_to_key(self, row: tuple[str, str | None]) -> APIKey | None:
+        from .api_keys import APIKey
+
+        data, last_used = row
+        try:
+            api_key = APIKey.model_validate_json(data)
+        except Exception as e:
+            logger.error(f"Failed to parse API key data: {e}")
+            return None
+        if last_used:
+            api_key.last_used = datetime.fromisoformat(last_used)
+        return api_key
+
+    def _import_legacy(self, path: Path) -> None:
+        """Copy keys from a legacy JSON file into an empty database"""
+        if not path.exists():
+            return
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM api_keys").fetchone()[0]
+        if count:
+            return
+
+        keys = JSONKeyStore(path).load_all()
+        if keys:
+            self.put_many(keys)
+            logger.info(f"Imported {len(keys)} API keys from {path}")
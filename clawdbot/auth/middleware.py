@@ -10,7 +10,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from .api_keys import get_api_key_manager
-from .rate_limiter import get_global_limiter
+from .rate_limiter import get_rate_limit_registry
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +19,8 @@ class AuthMiddleware(BaseHTTPMiddleware):
     """
     Authentication middleware
 
-    Validates API keys and enforces rate limits
+    Validates API keys and enforces rate limits per route class (chat,
+    admin, health, default) and per API key (``APIKey.rate_limit``)
     """
 
     def __init__(
@@ -41,7 +42,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
         ]
         self.enable_rate_limiting = enable_rate_limiting
         self.api_key_manager = get_api_key_manager()
-        self.rate_limiter = get_global_limiter()
+        self.rate_limits = get_rate_limit_registry()
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Process request through middleware"""
@@ -51,8 +52,9 @@ class AuthMiddleware(BaseHTTPMiddleware):
 
         # Check API key
         api_key = request.headers.get("x-api-key")
+        validated_key = None
         if api_key:
-            validated_key = self.api_key_manager.validate_key(api_key)
+            validated_key = await self.api_key_manager.avalidate_key(api_key)
             if validated_key:
                 # Attach to request state
                 request.state.api_key = validated_key
@@ -64,28 +66,34 @@ class AuthMiddleware(BaseHTTPMiddleware):
                     media_type="application/json",
                 )
 
-        # Rate limiting
+        # Rate limiting (O(1) checks that also yield the header values; shared
+        # backends run them off the event loop)
+        limit = None
         if self.enable_rate_limiting:
-            identifier = api_key if api_key else request.client.host
-            if not self.rate_limiter.check(identifier):
-                retry_after = self.rate_limiter.get_retry_after(identifier)
+            if validated_key:
+                identifier = f"key:{validated_key.key_id}"
+            else:
+                identifier = f"ip:{request.client.host}"
+            limit = await self.rate_limits.ahit(
+                request.method, request.url.path, identifier, validated_key
+            )
+            if not limit.allowed:
                 logger.warning(f"Rate limit exceeded for {identifier}")
                 return Response(
-                    content=f'{{"detail": "Rate limit exceeded. Try again in {retry_after}s"}}',
+                    content=f'{{"detail": "Rate limit exceeded. Try again in {limit.retry_after}s"}}',
                     status_code=429,
                     media_type="application/json",
-                    headers={"Retry-After": str(retry_after)},
+                    headers={"Retry-After": str(limit.retry_after)},
                 )
 
         # Process request
         response = await call_next(request)
 
         # Add rate limit headers
-        if api_key:
-            stats = self.rate_limiter.get_stats(api_key)
-            response.headers["X-RateLimit-Limit"] = str(stats["limit"])
-            response.headers["X-RateLimit-Remaining"] = str(stats["remaining"])
-            response.headers["X-RateLimit-Reset"] = str(stats["reset_in_seconds"])
+        if api_key and limit is not None:
+            response.headers["X-RateLimit-Limit"] = str(limit.limit)
+            response.headers["X-RateLimit-Remaining"] = str(limit.remaining)
+            response.headers["X-RateLimit-Reset"] = str(limit.reset_after)
 
         return response
 
@@ -2,14 +2,19 @@
 Rate limiting for API endpoints
 """
 
+import asyncio
 import logging
-import time
-from collections import defaultdict
+import math
+from collections import OrderedDict
 from collections.abc import Callable
+from dataclasses import dataclass
 from functools import wraps
 
 from fastapi import HTTPException, Request, status
 
+from .api_keys import APIKey
+from .backends import MemoryRateLimitBackend, RateLimitBackend
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,60 +29,127 @@ class RateLimitExceeded(HTTPException):
         )
 
 
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int  # Seconds until the next request is allowed (0 if allowed)
+    reset_after: int  # Seconds until the full burst is available again
+
+
 class RateLimiter:
     """
-    Token bucket rate limiter
+    GCRA (generic cell rate algorithm) rate limiter
+
+    Each identifier is tracked by a single "theoretical arrival time", so a
+    check is O(1) regardless of the rate. Requests are spaced at
+    ``window_seconds / requests_per_minute`` seconds on average, with up to
+    ``burst_size`` requests allowed back to back.
+
+    State lives in a RateLimitBackend: in process by default, or shared
+    between worker processes (SQLiteRateLimitBackend). Identifiers whose
+    allowance has fully recovered carry no state and are expired by the
+    backend, so clients that never come back do not accumulate.
 
     Example:
         limiter = RateLimiter(requests_per_minute=60)
 
         @app.get("/api/endpoint")
         async def endpoint(request: Request):
-            await limiter.check(request)
+            await limiter.check_request(request)
             ...
     """
 
-    def __init__(self, requests_per_minute: int = 60, burst_size: int | None = None):
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        burst_size: int | None = None,
+        clock: Callable[[], float] | None = None,
+        backend: RateLimitBackend | None = None,
+        namespace: str = "",
+        window_seconds: float = 60.0,
+    ):
         """
         Initialize rate limiter
 
         Args:
-            requests_per_minute: Requests allowed per minute
-            burst_size: Maximum burst size (default: 2x rate)
+            requests_per_minute: Requests allowed per window (a minute by default)
+            burst_size: Maximum requests allowed back to back (default: requests_per_minute)
+            clock: Time source in seconds (default: the backend's clock)
+            backend: State storage (default: a private in-memory backend)
+            namespace: Key prefix separating limiters that share a backend
+            window_seconds: Length of the rate window in seconds
         """
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self.clock = clock or self.backend.clock
+        self.namespace = namespace
         self.rate = requests_per_minute
-        self.burst_size = burst_size or (requests_per_minute * 2)
-        self.window_seconds = 60.0
+        self.burst_size = burst_size or requests_per_minute
+        self.window_seconds = window_seconds
 
-        # Track requests per identifier (IP, user, API key)
-        self._buckets: dict[str, list[float]] = defaultdict(list)
+        # Seconds between requests at the sustained rate
+        self._interval = self.window_seconds / self.rate
+        # How far the arrival time may run ahead of now
+        self._tolerance = self._interval * self.burst_size
 
-    def check(self, identifier: str) -> bool:
+    def hit(self, identifier: str) -> RateLimitResult:
         """
-        Check if request is allowed
+        Count a request and report the limit state
 
         Args:
             identifier: Unique identifier (IP, user ID, API key)
 
         Returns:
-            True if allowed, False if rate limited
+            RateLimitResult with the decision and header values
         """
-        now = time.time()
-        window_start = now - self.window_seconds
+        now = self.clock()
+        allowed, tat = self.backend.update(
+            self.namespace + identifier, now, self._interval, self._tolerance
+        )
+        return self._result(allowed, tat, now)
 
-        # Get bucket for this identifier
-        bucket = self._buckets[identifier]
+    async def ahit(self, identifier: str) -> RateLimitResult:
+        """Count a request from async code without blocking the loop (see hit)"""
+        now = self.clock()
+        allowed, tat = await self.backend.aupdate(
+            self.namespace + identifier, now, self._interval, self._tolerance
+        )
+        return self._result(allowed, tat, now)
+
+    def _result(self, allowed: bool, tat: float, now: float) -> RateLimitResult:
+        """Build the result of one GCRA step"""
+        if not allowed:
+            retry_after = max(tat, now) + self._interval - self._tolerance - now
+            return RateLimitResult(
+                allowed=False,
+                limit=self.rate,
+                remaining=0,
+                retry_after=max(1, math.ceil(retry_after)),
+                reset_after=math.ceil(tat - now),
+            )
+
+        return RateLimitResult(
+            allowed=True,
+            limit=self.rate,
+            remaining=int((self._tolerance - (tat - now)) / self._interval),
+            retry_after=0,
+            reset_after=math.ceil(tat - now),
+        )
 
-        # Remove old entries
-        bucket[:] = [t for t in bucket if t > window_start]
+    def check(self, identifier: str) -> bool:
+        """
+        Check if request is allowed
 
-        # Check if under limit
-        if len(bucket) >= self.rate:
-            return False
+        Args:
+            identifier: Unique identifier (IP, user ID, API key)
 
-        # Add this request
-        bucket.append(now)
-        return True
+        Returns:
+            True if allowed, False if rate limited
+        """
+        return self.hit(identifier).allowed
 
     def get_retry_after(self, identifier: str) -> int:
         """
@@ -89,14 +161,12 @@ class RateLimiter:
         Returns:
             Seconds until next request allowed
         """
-        bucket = self._buckets.get(identifier, [])
-        if not bucket:
+        tat = self.backend.get(self.namespace + identifier)
+        if tat is None:
             return 0
 
-        oldest = min(bucket)
-        time_until_reset = self.window_seconds - (time.time() - oldest)
-
-        return max(1, int(time_until_reset))
+        wait = tat + self._interval - self._tolerance - self.clock()
+        return max(1, math.ceil(wait)) if wait > 0 else 0
 
     async def check_request(self, request: Request) -> None:
         """
@@ -112,36 +182,45 @@ class RateLimiter:
         api_key = request.headers.get("x-api-key")
         identifier = api_key if api_key else request.client.host
 
-        if not self.check(identifier):
-            retry_after = self.get_retry_after(identifier)
+        result = self.hit(identifier)
+        if not result.allowed:
             logger.warning(f"Rate limit exceeded for {identifier}")
-            raise RateLimitExceeded(retry_after)
+            raise RateLimitExceeded(result.retry_after)
 
     def reset(self, identifier: str | None = None) -> None:
         """Reset rate limit for identifier or all"""
         if identifier:
-            if identifier in self._buckets:
-                del self._buckets[identifier]
+            self.backend.delete(self.namespace + identifier)
         else:
-            self._buckets.clear()
+            self.backend.clear(self.namespace)
 
     def get_stats(self, identifier: str) -> dict:
         """Get rate limit stats for identifier"""
-        bucket = self._buckets.get(identifier, [])
-        now = time.time()
-        window_start = now - self.window_seconds
-
-        # Clean old entries
-        bucket = [t for t in bucket if t > window_start]
+        tat = self.backend.get(self.namespace + identifier)
+        backlog = max(0.0, tat - self.clock()) if tat is not None else 0.0
+        current = math.ceil(backlog / self._interval - 1e-9) if backlog else 0
 
         return {
             "identifier": identifier,
-            "current_requests": len(bucket),
+            "current_requests": current,
             "limit": self.rate,
-            "remaining": max(0, self.rate - len(bucket)),
-            "reset_in_seconds": self.get_retry_after(identifier) if bucket else 0,
+            "remaining": max(0, int((self._tolerance - backlog) / self._interval)),
+            "reset_in_seconds": math.ceil(backlog),
         }
 
+    def __len__(self) -> int:
+        """Number of identifiers currently tracked by the backend"""
+        return len(self.backend)
+
+    def expire(self) -> int:
+        """
+        Drop every identifier whose allowance has fully recovered
+
+        Returns:
+            Number of identifiers removed
+        """
+        return self.backend.expire(self.clock())
+
 
 def rate_limit(
     requests_per_minute: int = 60, identifier_fn: Callable[[Request], str] | None = None
@@ -170,9 +249,9 @@ def rate_limit(
                     identifier = api_key if api_key else request.client.host
 
                 # Check rate limit
-                if not limiter.check(identifier):
-                    retry_after = limiter.get_retry_after(identifier)
-                    raise RateLimitExceeded(retry_after)
+                result = limiter.hit(identifier)
+                if not result.allowed:
+                    raise RateLimitExceeded(result.retry_after)
 
             return await func(*args, request=request, **kwargs)
 
@@ -181,22 +260,228 @@ def rate_limit(
     return decorator
 
 
-# Global rate limiters for different endpoints
-_global_limiter = RateLimiter(requests_per_minute=100)  # Global default
-_chat_limiter = RateLimiter(requests_per_minute=20)  # Chat endpoints
-_admin_limiter = RateLimiter(requests_per_minute=30)  # Admin endpoints
+# Default requests per minute for each route class
+DEFAULT_ROUTE_LIMITS: dict[str, int] = {
+    "default": 100,
+    "chat": 20,
+    "admin": 30,
+    "health": 600,
+}
+
+# (method or None for any, path prefix, route class); first match wins
+DEFAULT_ROUTE_RULES: list[tuple[str | None, str, str]] = [
+    (None, "/health", "health"),
+    (None, "/metrics", "health"),
+    ("POST", "/agent/chat", "chat"),
+    ("POST", "/v1/chat/completions", "chat"),
+    (None, "/channels", "admin"),
+    ("DELETE", "/", "admin"),
+]
+
+
+class RateLimitRegistry:
+    """
+    Rate limiters per route class and per API key
+
+    Every request is limited twice:
+
+    1. by its route class (chat, admin, health, default), per caller;
+    2. if the caller's API key sets ``rate_limit``, by that key's own budget
+       across all routes.
+
+    So a tenant bursting on chat cannot use up other tenants' allowance, and
+    a key with a lower limit cannot exceed it on any route. Limiters are
+    created on first use and the least recently used per-key limiters are
+    dropped beyond ``max_limiters``; their state lives in the backend, keyed
+    by caller, so dropping a limiter object does not reset anyone's budget.
+    Callers whose allowance has recovered are swept by ``start_expiry``.
+
+    Example:
+        registry = RateLimitRegistry(route_limits={"chat": 10})
+        result = registry.hit("POST", "/agent/chat", "key:abc", api_key)
+    """
+
+    def __init__(
+        self,
+        route_limits: dict[str, int] | None = None,
+        route_rules: list[tuple[str | None, str, str]] | None = None,
+        backend: RateLimitBackend | None = None,
+        max_limiters: int = 256,
+    ):
+        """
+        Initialize registry
+
+        Args:
+            route_limits: Requests per minute per route class (merged over the defaults)
+            route_rules: Path classification rules (default: DEFAULT_ROUTE_RULES)
+            backend: State storage shared by all limiters (default: in-memory)
+            max_limiters: Maximum per-key limiter objects kept
+        """
+        self.route_limits = {**DEFAULT_ROUTE_LIMITS, **(route_limits or {})}
+        self.route_rules = route_rules if route_rules is not None else DEFAULT_ROUTE_RULES
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self.max_limiters = max_limiters
+
+        self._route_limiters: dict[str, RateLimiter] = {}
+        self._key_limiters: OrderedDict[int, RateLimiter] = OrderedDict()
+        self._expiry: asyncio.Task | None = None
+
+    def classify(self, method: str, path: str) -> str:
+        """
+        Get the route class of a request
+
+        Args:
+            method: HTTP method
+            path: URL path
+
+        Returns:
+            Route class name
+        """
+        for rule_method, prefix, route_class in self.route_rules:
+            if (rule_method is None or rule_method == method) and path.startswith(prefix):
+                return route_class
+        return "default"
+
+    def route_limiter(self, route_class: str) -> RateLimiter:
+        """Get (or lazily create) the limiter for a route class"""
+        limiter = self._route_limiters.get(route_class)
+        if limiter is None:
+            rate = self.route_limits.get(route_class, self.route_limits["default"])
+            limiter = RateLimiter(
+                requests_per_minute=rate, backend=self.backend, namespace=f"{route_class}:"
+            )
+            self._route_limiters[route_class] = limiter
+        return limiter
+
+    def key_limiter(self, rate: int) -> RateLimiter:
+        """Get (or lazily create) the per-key limiter for a requests-per-minute rate"""
+        limiter = self._key_limiters.get(rate)
+        if limiter is None:
+            limiter = RateLimiter(
+                requests_per_minute=rate, backend=self.backend, namespace=f"key{rate}:"
+            )
+            self._key_limiters[rate] = limiter
+            while len(self._key_limiters) > self.max_limiters:
+                self._key_limiters.popitem(last=False)
+        else:
+            self._key_limiters.move_to_end(rate)
+        return limiter
+
+    def hit(
+        self, method: str, path: str, identity: str, api_key: APIKey | None = None
+    ) -> RateLimitResult:
+        """
+        Count a request against its route class and its API key budget
+
+        Args:
+            method: HTTP method
+            path: URL path
+            identity: Caller identity (API key id or client address)
+            api_key: Validated API key, if any
+
+        Returns:
+            The most restrictive RateLimitResult
+        """
+        result = self.route_limiter(self.classify(method, path)).hit(identity)
+        if not result.allowed or api_key is None or not api_key.rate_limit:
+            return result
+
+        key_result = self.key_limiter(api_key.rate_limit).hit(api_key.key_id)
+        if not key_result.allowed or key_result.remaining < result.remaining:
+            return key_result
+        return result
+
+    async def ahit(
+        self, method: str, path: str, identity: str, api_key: APIKey | None = None
+    ) -> RateLimitResult:
+        """Count a request from async code without blocking the loop (see hit)"""
+        result = await self.route_limiter(self.classify(method, path)).ahit(identity)
+        if not result.allowed or api_key is None or not api_key.rate_limit:
+            return result
+
+        key_result = await self.key_limiter(api_key.rate_limit).ahit(api_key.key_id)
+        if not key_result.allowed or key_result.remaining < result.remaining:
+            return key_result
+        return result
+
+    def start_expiry(self, interval: float = 30.0) -> asyncio.Task:
+        """
+        Periodically drop recovered callers from the backend in the background
+
+        Args:
+            interval: Seconds between sweeps
+
+        Returns:
+            The sweeper task
+        """
+        if self._expiry is None or self._expiry.done():
+
+            async def run() -> None:
+                while True:
+                    await asyncio.sleep(interval)
+                    try:
+                        await self.backend.aexpire(self.backend.clock())
+                    except Exception as e:
+                        logger.warning(f"Rate limit expiry failed: {e}")
+
+            self._expiry = asyncio.create_task(run())
+        return self._expiry
+
+    async def stop_expiry(self) -> None:
+        """Stop the background sweeper"""
+        if self._expiry is not None:
+            self._expiry.cancel()
+            try:
+                await self._expiry
+            except asyncio.CancelledError:
+                pass
+            self._expiry = None
+
+    def __len__(self) -> int:
+        """Number of limiter objects currently held"""
+        return len(self._route_limiters) + len(self._key_limiters)
+
+
+# Global rate limit registry (route class and per-key limiters)
+_registry = RateLimitRegistry()
+
+
+def get_rate_limit_registry() -> RateLimitRegistry:
+    """Get global rate limit registry"""
+    return _registry
 
 
 def get_global_limiter() -> RateLimiter:
     """Get global rate limiter"""
-    return _global_limiter
+    return _registry.route_limiter("default")
 
 
 def get_chat_limiter() -> RateLimiter:
     """Get chat rate limiter"""
-    return _chat_limiter
+    return _registry.route_limiter("chat")
 
 
 def get_admin_limiter() -> RateLimiter:
     """Get admin rate limiter"""
-    return _admin_limiter
+    return _registry.route_limiter("admin")
+
+
+def configure_rate_limiters(
+    backend: RateLimitBackend | None = None, route_limits: dict[str, int] | None = None
+) -> RateLimitRegistry:
+    """
+    Replace the global rate limit registry
+
+    Use a SQLiteRateLimitBackend so API worker processes on one host
+    enforce a single combined limit.
+
+    Args:
+        backend: State storage shared by all limiters
+        route_limits: Requests per minute per route class
+
+    Returns:
+        The new global RateLimitRegistry
+    """
+    global _registry
+    _registry = RateLimitRegistry(route_limits=route_limits, backend=backend)
+    return _registry
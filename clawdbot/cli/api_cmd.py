@@ -4,11 +4,16 @@ import asyncio
 import typer
 from rich.console import Console
 
-from ..agents.runtime import AgentRuntime
+from ..agents.providers import configure_provider_pool
+from ..agents.queuing import Priority, configure_queue_manager
+from ..agents.runtime import AgentRuntime, configure_runtime_pool
+from ..agents.persistence import SQLiteSessionStore
 from ..agents.session import SessionManager
+from ..agents.tokenizers import configure_tokenizer, warm_tokenizer
+from ..agents.tools.registry import get_tool_registry
 from ..channels.registry import ChannelRegistry
 from ..config import get_settings
-from ..monitoring import setup_logging
+from ..monitoring import configure_request_capture, setup_logging
 from ..api import run_api_server
 
 console = Console()
@@ -28,15 +33,81 @@ def api_start(
         setup_logging(
             level=settings.monitoring.log_level, format_type=settings.monitoring.log_format
         )
+        capture = settings.monitoring.request_capture
+        configure_request_capture(
+            capture.directory or settings.workspace_dir / ".captures",
+            enabled=capture.enabled,
+            sample_rate=capture.sample_rate,
+            max_bytes=capture.max_bytes,
+            max_files=capture.max_files,
+        )
+
+        # Shared provider clients and HTTP connection pools
+        provider_pool = configure_provider_pool(
+            max_connections=settings.agent.http_max_connections,
+            max_keepalive_connections=settings.agent.http_max_keepalive_connections,
+            keepalive_expiry=settings.agent.http_keepalive_expiry,
+        )
+        # Session serialization and global admission control, shared by all runtimes
+        queue_manager = None
+        if settings.agent.enable_queuing:
+            queue_manager = configure_queue_manager(
+                max_concurrent_global=settings.agent.max_concurrent_requests
+            )
+        # Runtime options from settings, shared by the default and pooled runtimes
+        runtime_options = {
+            "enable_context_management": settings.agent.enable_context_management,
+            "max_parallel_tools": settings.tools.max_parallel,
+            "tool_offload_threshold": settings.tools.offload_threshold,
+            "tool_offload_preview": settings.tools.offload_preview,
+        }
+        configure_runtime_pool(
+            provider_pool,
+            max_size=settings.agent.runtime_pool_size,
+            queue_manager=queue_manager,
+            **runtime_options,
+        )
+        if settings.agent.tokenizer_file:
+            configure_tokenizer(bpe_file=settings.agent.tokenizer_file)
+        # Load (and if needed download) token ranks before serving, off the loop
+        await warm_tokenizer(settings.agent.model)
 
         # Create components
         runtime = AgentRuntime(
             model=settings.agent.model,
             api_key=settings.agent.api_key,
             base_url=settings.agent.base_url,
-            enable_context_management=settings.agent.enable_context_management,
+            provider_pool=provider_pool,
+            queue_manager=queue_manager,
+            **runtime_options,
+        )
+        store = None
+        if settings.sessions.backend == "sqlite":
+            store = SQLiteSessionStore(
+                settings.sessions.sqlite_path
+                or settings.workspace_dir / ".sessions" / "sessions.db",
+                legacy_dir=settings.workspace_dir / ".sessions",
+            )
+        session_manager = SessionManager(
+            settings.workspace_dir,
+            write_behind=settings.sessions.write_behind,
+            flush_interval=settings.sessions.flush_interval,
+            fsync_on_end=settings.sessions.fsync_on_end,
+            store=store,
+            max_cached_sessions=settings.sessions.max_cached_sessions,
+            max_cached_bytes=settings.sessions.max_cached_bytes,
         )
-        session_manager = SessionManager(settings.workspace_dir)
+        async def run_scheduled_turn(session_id: str, message: str) -> None:
+            # Cron triggers run as a turn that yields to interactive traffic
+            session = session_manager.get_session(session_id)
+            tools = runtime.tool_registry.list_tools()
+            async for _ in runtime.run_turn(
+                session, message, tools=tools, priority=Priority.CRON, tenant=f"cron:{session_id}"
+            ):
+                pass
+
+        # Share the global registry's cached tool schemas with the runtime
+        runtime.tool_registry = get_tool_registry(session_manager, cron_callback=run_scheduled_turn)
         channel_registry = ChannelRegistry()
 
         # Run server
@@ -8,6 +8,8 @@ from .settings import (
     ChannelConfig,
     GatewayConfig,
     MonitoringConfig,
+    RequestCaptureConfig,
+    SessionConfig,
     Settings,
     ToolsConfig,
     get_agent_config,
@@ -24,8 +26,10 @@ __all__ = [
     "Settings",
     "AgentConfig",
     "ToolsConfig",
+    "SessionConfig",
     "ChannelConfig",
     "MonitoringConfig",
+    "RequestCaptureConfig",
     "APIConfig",
     "GatewayConfig",
     "get_settings",
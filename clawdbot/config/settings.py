@@ -3,7 +3,7 @@ Enhanced configuration with Pydantic settings
 """
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -20,6 +20,30 @@ class AgentConfig(BaseModel):
     )
     max_tokens: int = Field(default=4096, gt=0, description="Maximum tokens per response")
     base_url: str | None = Field(default=None, description="Base URL for OpenAI-compatible APIs")
+    http_max_connections: int = Field(
+        default=100, ge=1, description="Maximum concurrent connections to LLM backends"
+    )
+    http_max_keepalive_connections: int = Field(
+        default=20, ge=0, description="Maximum idle keep-alive connections to LLM backends"
+    )
+    http_keepalive_expiry: float = Field(
+        default=30.0, gt=0, description="Seconds an idle backend connection is kept open"
+    )
+    runtime_pool_size: int = Field(
+        default=32, ge=1, description="Maximum cached runtimes for per-request models"
+    )
+    enable_queuing: bool = Field(
+        default=False,
+        description="Run one turn per session at a time and cap provider calls "
+        "(max_concurrent_requests); waiting turns report their queue position",
+    )
+    max_concurrent_requests: int = Field(
+        default=10, ge=1, description="Maximum provider calls in flight across all sessions"
+    )
+    tokenizer_file: Path | None = Field(
+        default=None,
+        description="tiktoken-format BPE rank file used for token counts (preferred over tiktoken)",
+    )
 
     model_config = {"extra": "allow"}
 
@@ -33,6 +57,46 @@ class ToolsConfig(BaseModel):
         default=None, ge=1, description="Rate limit for tools"
     )
     sandbox_enabled: bool = Field(default=False, description="Enable sandbox execution")
+    max_parallel: int = Field(
+        default=4, ge=1, description="Maximum tool calls from one assistant message run at once"
+    )
+    offload_threshold: int = Field(
+        default=8000,
+        ge=0,
+        description="Store tool outputs longer than this many characters out of band (0 disables)",
+    )
+    offload_preview: int = Field(
+        default=2000, ge=0, description="Characters of an offloaded tool output kept in the session"
+    )
+
+    model_config = {"extra": "allow"}
+
+
+class SessionConfig(BaseModel):
+    """Session persistence configuration"""
+
+    write_behind: bool = Field(
+        default=False, description="Persist session writes from a background thread pool"
+    )
+    flush_interval: float = Field(
+        default=1.0, gt=0, description="Seconds between background session flushes"
+    )
+    fsync_on_end: bool = Field(default=True, description="fsync session data when a turn ends")
+    backend: Literal["file", "sqlite"] = Field(
+        default="file", description="Session storage backend"
+    )
+    sqlite_path: Path | None = Field(
+        default=None,
+        description="SQLite database path (default: <workspace>/.sessions/sessions.db)",
+    )
+    max_cached_sessions: int | None = Field(
+        default=1000, ge=1, description="Maximum sessions kept in memory (None for no limit)"
+    )
+    max_cached_bytes: int | None = Field(
+        default=256 * 1024 * 1024,
+        ge=1,
+        description="Maximum approximate bytes of sessions kept in memory (None for no limit)",
+    )
 
     model_config = {"extra": "allow"}
 
@@ -52,6 +116,24 @@ class ChannelConfig(BaseModel):
     model_config = {"extra": "allow"}
 
 
+class RequestCaptureConfig(BaseModel):
+    """Provider request capture configuration (debugging aid)"""
+
+    enabled: bool = Field(default=False, description="Write sampled provider requests to disk")
+    sample_rate: float = Field(
+        default=1.0, ge=0.0, le=1.0, description="Fraction of requests to capture"
+    )
+    directory: Path | None = Field(
+        default=None, description="Capture directory (default: <workspace>/.captures)"
+    )
+    max_bytes: int = Field(
+        default=50 * 1024 * 1024, ge=1, description="Maximum total size of captured requests"
+    )
+    max_files: int = Field(default=200, ge=1, description="Maximum number of capture files")
+
+    model_config = {"extra": "allow"}
+
+
 class MonitoringConfig(BaseModel):
     """Monitoring configuration"""
 
@@ -60,6 +142,9 @@ class MonitoringConfig(BaseModel):
     metrics_collection: bool = Field(default=True, description="Enable metrics collection")
     log_level: str = Field(default="INFO", description="Logging level")
     log_format: str = Field(default="colored", description="Log format (colored, json, simple)")
+    request_capture: RequestCaptureConfig = Field(
+        default_factory=RequestCaptureConfig, description="Provider request capture"
+    )
 
     model_config = {"extra": "allow"}
 
@@ -93,6 +178,27 @@ class APIConfig(BaseModel):
     cors_origins: list[str] = Field(
         default_factory=lambda: ["*"], description="CORS allowed origins"
     )
+    rate_limit_backend: Literal["memory", "sqlite"] = Field(
+        default="memory",
+        description="Rate limit state storage (sqlite shares limits across worker processes)",
+    )
+    rate_limit_db: Path | None = Field(
+        default=None,
+        description="SQLite rate limit database (default: <workspace>/.ratelimit/limits.db)",
+    )
+    rate_limit_busy_timeout: float = Field(
+        default=5.0,
+        gt=0,
+        description="Seconds a SQLite rate limit check waits for another worker's write lock",
+    )
+    rate_limit_fail_open: bool = Field(
+        default=True,
+        description="Allow requests when the SQLite rate limit store stays locked (else deny)",
+    )
+    rate_limits: dict[str, int] = Field(
+        default_factory=lambda: {"default": 100, "chat": 20, "admin": 30, "health": 600},
+        description="Requests per minute per route class (chat, admin, health, default)",
+    )
 
     model_config = {"extra": "allow"}
 
@@ -137,6 +243,10 @@ class Settings(BaseSettings):
 
     tools: ToolsConfig = Field(default_factory=ToolsConfig, description="Tools configuration")
 
+    sessions: SessionConfig = Field(
+        default_factory=SessionConfig, description="Session persistence configuration"
+    )
+
     channels: ChannelConfig = Field(
         default_factory=ChannelConfig, description="Channels configuration"
     )
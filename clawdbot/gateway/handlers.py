@@ -86,20 +86,17 @@ async def handle_sessions_list(connection: Any, params: dict[str, Any]) -> list[
     if not _session_manager:
         return []
 
-    session_ids = _session_manager.list_sessions()
-    sessions = []
-
-    for session_id in session_ids:
-        session = _session_manager.get_session(session_id)
-        sessions.append(
-            {
-                "sessionId": session_id,
-                "messageCount": len(session.messages),
-                "lastMessage": session.messages[-1].timestamp if session.messages else None,
-            }
-        )
-
-    return sessions
+    summaries = await _session_manager.list_session_summaries(
+        limit=params.get("limit"), offset=params.get("offset", 0)
+    )
+    return [
+        {
+            "sessionId": summary.session_id,
+            "messageCount": summary.message_count,
+            "lastMessage": summary.last_message_ts,
+        }
+        for summary in summaries
+    ]
 
 
 @register_handler("channels.list")
@@ -129,6 +126,9 @@ async def handle_agent(connection: Any, params: dict[str, Any]) -> dict[str, Any
     message = params.get("message", "")
     session_id = params.get("sessionId") or params.get("sessionKey", "main")
     model = params.get("model")
+    # Turns from one channel share its fair share of the global queue
+    channel_id = params.get("channelId") or params.get("channel")
+    tenant = f"channel:{channel_id}" if channel_id else None
 
     if not message:
         raise ValueError("message required")
@@ -147,16 +147,16 @@ async def handle_agent(connection: Any, params: dict[str, Any]) -> dict[str, Any
     accepted_at = datetime.now(UTC).isoformat() + "Z"
 
     # Execute agent turn in background
-    asyncio.create_task(_run_agent_turn(connection, run_id, session, message, tools, model))
+    asyncio.create_task(_run_agent_turn(connection, run_id, session, message, tools, model, tenant))
 
     return {"runId": run_id, "acceptedAt": accepted_at}
 
 
-async def _run_agent_turn(connection, run_id, session, message, tools, model):
+async def _run_agent_turn(connection, run_id, session, message, tools, model, tenant=None):
     """Execute agent turn and stream results"""
     try:
         # Stream events to client
-        async for event in _agent_runtime.run_turn(session, message, tools, model):
+        async for event in _agent_runtime.run_turn(session, message, tools, model, tenant=tenant):
             # Send event to client
             await connection.send_event(
                 "agent", {"runId": run_id, "type": event.type, "data": event.data}
@@ -196,8 +196,7 @@ async def handle_chat_history(connection: Any, params: dict[str, Any]) -> list[d
     if not _session_manager:
         return []
 
-    session = _session_manager.get_session(session_id)
-    messages = session.get_messages(limit=limit)
+    messages = await _session_manager.get_history(session_id, limit=limit)
 
     return [
         {"role": msg.role, "content": msg.content, "timestamp": msg.timestamp} for msg in messages
@@ -2,6 +2,7 @@
 Monitoring module for ClawdBot
 """
 
+from .capture import RequestCapture, configure_request_capture, get_request_capture
 from .health import (
     ComponentHealth,
     HealthCheck,
@@ -29,6 +30,7 @@ from .metrics import (
     get_metrics,
     histogram,
 )
+from .sketch import DDSketch
 
 __all__ = [
     # Health
@@ -48,6 +50,11 @@ __all__ = [
     "counter",
     "gauge",
     "histogram",
+    "DDSketch",
+    # Request capture
+    "RequestCapture",
+    "get_request_capture",
+    "configure_request_capture",
     # Logging
     "setup_logging",
     "get_logger",
@@ -0,0 +1,199 @@
+"""
+Sampled capture of LLM provider requests for debugging
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCapture:
+    """
+    Writes a sample of provider requests to a rotating directory
+
+    Capture is off by default. When enabled, ``capture()`` only decides
+    whether to sample the request and hands it to a single background
+    thread; serialization and disk I/O never run on the caller's (event
+    loop) thread. The directory is capped by file count and total bytes,
+    oldest captures are deleted first.
+
+    Example:
+        capture = RequestCapture(Path("captures"), enabled=True, sample_rate=0.01)
+        capture.capture("openai", params)
+    """
+
+    FILE_PREFIX = "request-"
+
+    def __init__(
+        self,
+        directory: Path,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_files: int = 200,
+    ):
+        """
+        Initialize request capture
+
+        Args:
+            directory: Directory to write captures to
+            enabled: Whether capture is active
+            sample_rate: Fraction of requests to capture (0.0 - 1.0)
+            max_bytes: Maximum total size of the capture directory
+            max_files: Maximum number of capture files kept
+        """
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+
+        self._executor: ThreadPoolExecutor | None = None
+        self._files: deque[tuple[Path, int]] | None = None
+        self._total_bytes = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def should_capture(self) -> bool:
+        """Decide whether the current request is sampled"""
+        if not self.enabled or self.sample_rate <= 0:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def capture(self, provider: str, params: dict[str, Any]) -> bool:
+        """
+        Capture a request if it is sampled
+
+        Args:
+            provider: Provider name (used in the file name)
+            params: Request parameters (copied shallowly; must not be mutated
+                in place afterwards)
+
+        Returns:
+            True if the request was queued for writing
+        """
+        if not self.should_capture():
+            return False
+
+        # Submit under the lock so flush() cannot shut the executor down
+        # between picking it and queueing the write
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="request-capture"
+                )
+            self._counter += 1
+            name = f"{self.FILE_PREFIX}{time.time_ns()}-{self._counter}-{provider}.json"
+            try:
+                self._executor.submit(self._write, name, dict(params))
+            except RuntimeError as e:
+                # Shut down from outside (e.g. interpreter exit); drop the capture
+                logger.debug(f"Request capture skipped: {e}")
+                self._executor = None
+                return False
+        return True
+
+    def flush(self) -> None:
+        """Wait until all queued captures are written"""
+        # Swapped out under the lock, so no capture can submit to it afterwards
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _write(self, name: str, params: dict[str, Any]) -> None:
+        """Serialize and write one capture, then enforce the caps (writer thread)"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self._files is None:
+                self._scan()
+
+            data = json.dumps(params, ensure_ascii=False, default=str)
+            path = self.directory / name
+            path.write_text(data, encoding="utf-8")
+
+            size = len(data.encode("utf-8"))
+            self._files.append((path, size))
+            self._total_bytes += size
+            self._rotate()
+        except Exception as e:
+            logger.error(f"Failed to write request capture: {e}")
+
+    def _scan(self) -> None:
+        """Index captures left over from previous runs, oldest first"""
+        files = []
+        for path in self.directory.glob(f"{self.FILE_PREFIX}*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, path, stat.st_size))
+        files.sort()
+        self._files = deque((path, size) for _, path, size in files)
+        self._total_bytes = sum(size for _, _, size in files)
+
+    def _rotate(self) -> None:
+        """Delete the oldest captures until within the caps"""
+        while self._files and (
+            len(self._files) > self.max_files or self._total_bytes > self.max_bytes
+        ):
+            path, size = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# Global request capture instance (disabled until configured)
+_capture: RequestCapture | None = None
+
+
+def get_request_capture() -> RequestCapture:
+    """Get global request capture"""
+    global _capture
+    if _capture is None:
+        _capture = RequestCapture(Path("./workspace/.captures"))
+    return _capture
+
+
+def configure_request_capture(
+    directory: Path,
+    enabled: bool = False,
+    sample_rate: float = 1.0,
+    max_bytes: int = 50 * 1024 * 1024,
+    max_files: int = 200,
+) -> RequestCapture:
+    """
+    Replace the global request capture
+
+    Args:
+        directory: Directory to write captures to
+        enabled: Whether capture is active
+        sample_rate: Fraction of requests to capture
+        max_bytes: Maximum total size of the capture directory
+        max_files: Maximum number of capture files kept
+
+    Returns:
+        The new global RequestCapture
+    """
+    global _capture
+    if _capture is not None:
+        _capture.flush()
+    _capture = RequestCapture(
+        directory,
+        enabled=enabled,
+        sample_rate=sample_rate,
+        max_bytes=max_bytes,
+        max_files=max_files,
+    )
+    return _capture
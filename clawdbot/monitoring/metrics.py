@@ -2,34 +2,116 @@
 Metrics collection for ClawdBot
 """
 
+import copy
 import logging
+import math
 import threading
 import time
+from bisect import bisect_left
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
 
+from .sketch import DDSketch
+
 logger = logging.getLogger(__name__)
 
 
+class _ShardedValue:
+    """
+    Per-thread value shards for lock-free increments
+
+    Each thread adds into its own one-element cell, so increments take no
+    lock and never contend; reading the value sums all cells. Cells are
+    only written by their owning thread, and the lock is taken only when
+    a thread makes its first increment.
+    """
+
+    _value: float
+    _lock: threading.Lock
+    _local: threading.local
+    _cells: list[list[float]]
+
+    def _add_shard(self) -> list[float]:
+        """Create the calling thread's cell"""
+        cell = [0.0]
+        with self._lock:
+            self._cells.append(cell)
+        self._local.cell = cell
+        return cell
+
+    def _shard_total(self) -> float:
+        """Sum of all threads' cells"""
+        return sum(cell[0] for cell in list(self._cells))
+
+    @property
+    def value(self) -> float:
+        """Get current value"""
+        return self._value + self._shard_total()
+
+
+class _Labelled:
+    """Pre-bound label handles for a metric"""
+
+    name: str
+    description: str
+    labels: dict[str, str]
+    _children: dict[tuple, "_Labelled"]
+    _collector: "MetricsCollector | None"
+
+    def with_labels(self, **labels: str):
+        """
+        Get a cached child metric with extra labels
+
+        Resolve the handle once and keep it; incrementing a handle skips the
+        collector lookup entirely.
+
+        Example:
+            tokens = metrics.counter("tokens_total", "Tokens streamed")
+            openai_tokens = tokens.with_labels(provider="openai")
+            openai_tokens.inc()  # per token
+
+        Args:
+            **labels: Label values added to this metric's labels
+
+        Returns:
+            Metric of the same type, registered with the same collector
+        """
+        key = tuple(sorted(labels.items()))
+        child = self._children.get(key)
+        if child is None:
+            child = self._make_child({**self.labels, **labels})
+            child = self._children.setdefault(key, child)
+        return child
+
+    def _make_child(self, labels: dict[str, str]) -> "_Labelled":
+        raise NotImplementedError
+
+
 @dataclass
-class Counter:
-    """Simple counter metric"""
+class Counter(_ShardedValue, _Labelled):
+    """Counter metric (increments are lock-free, see _ShardedValue)"""
 
     name: str
     description: str = ""
     labels: dict[str, str] = field(default_factory=dict)
     _value: float = 0.0
     _lock: threading.Lock = field(default_factory=threading.Lock)
+    _local: threading.local = field(default_factory=threading.local, repr=False)
+    _cells: list[list[float]] = field(default_factory=list, repr=False)
+    _children: dict = field(default_factory=dict, repr=False)
+    _collector: "MetricsCollector | None" = field(default=None, repr=False, compare=False)
 
     def inc(self, value: float = 1.0) -> None:
         """Increment counter"""
-        with self._lock:
-            self._value += value
+        try:
+            self._local.cell[0] += value
+        except AttributeError:
+            self._add_shard()[0] += value
 
-    @property
-    def value(self) -> float:
-        """Get current value"""
-        return self._value
+    def _make_child(self, labels: dict[str, str]) -> "Counter":
+        if self._collector is not None:
+            return self._collector.counter(self.name, self.description, labels)
+        return Counter(name=self.name, description=self.description, labels=labels)
 
     def to_dict(self) -> dict:
         """Convert to dictionary"""
@@ -38,39 +120,45 @@ class Counter:
             "type": "counter",
             "description": self.description,
             "labels": self.labels,
-            "value": self._value,
+            "value": self.value,
         }
 
 
 @dataclass
-class Gauge:
-    """Gauge metric (can go up and down)"""
+class Gauge(_ShardedValue, _Labelled):
+    """Gauge metric (can go up and down; inc/dec are lock-free)"""
 
     name: str
     description: str = ""
     labels: dict[str, str] = field(default_factory=dict)
     _value: float = 0.0
     _lock: threading.Lock = field(default_factory=threading.Lock)
+    _local: threading.local = field(default_factory=threading.local, repr=False)
+    _cells: list[list[float]] = field(default_factory=list, repr=False)
+    _children: dict = field(default_factory=dict, repr=False)
+    _collector: "MetricsCollector | None" = field(default=None, repr=False, compare=False)
 
     def set(self, value: float) -> None:
         """Set gauge value"""
         with self._lock:
-            self._value = value
+            # Shards keep their deltas; the base absorbs them
+            self._value = value - self._shard_total()
 
     def inc(self, value: float = 1.0) -> None:
         """Increment gauge"""
-        with self._lock:
-            self._value += value
+        try:
+            self._local.cell[0] += value
+        except AttributeError:
+            self._add_shard()[0] += value
 
     def dec(self, value: float = 1.0) -> None:
         """Decrement gauge"""
-        with self._lock:
-            self._value -= value
+        self.inc(-value)
 
-    @property
-    def value(self) -> float:
-        """Get current value"""
-        return self._value
+    def _make_child(self, labels: dict[str, str]) -> "Gauge":
+        if self._collector is not None:
+            return self._collector.gauge(self.name, self.description, labels)
+        return Gauge(name=self.name, description=self.description, labels=labels)
 
     def to_dict(self) -> dict:
         """Convert to dictionary"""
@@ -79,36 +167,49 @@ class Gauge:
             "type": "gauge",
             "description": self.description,
             "labels": self.labels,
-            "value": self._value,
+            "value": self.value,
         }
 
 
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
 @dataclass
-class Histogram:
-    """Histogram metric for measuring distributions"""
+class Histogram(_Labelled):
+    """
+    Histogram metric for measuring distributions
+
+    Observations are counted in the configured buckets (exported as
+    cumulative Prometheus ``_bucket`` series) and in a DDSketch, so
+    percentiles cover every observation since creation with bounded
+    relative error. Recording a value is O(1).
+    """
 
     name: str
     description: str = ""
     labels: dict[str, str] = field(default_factory=dict)
-    buckets: list[float] = field(
-        default_factory=lambda: [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
-    )
-    _values: list[float] = field(default_factory=list)
+    buckets: list[float] = field(default_factory=lambda: list(DEFAULT_BUCKETS))
+    relative_accuracy: float = 0.01
     _sum: float = 0.0
     _count: int = 0
     _lock: threading.Lock = field(default_factory=threading.Lock)
+    _children: dict = field(default_factory=dict, repr=False)
+    _collector: "MetricsCollector | None" = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.buckets = sorted({b for b in self.buckets if b != math.inf})
+        # Per-bucket (non-cumulative) counts; the last entry is the +Inf bucket
+        self._bucket_counts = [0] * (len(self.buckets) + 1)
+        self._sketch = DDSketch(self.relative_accuracy)
 
     def observe(self, value: float) -> None:
         """Record an observation"""
         with self._lock:
-            self._values.append(value)
+            self._bucket_counts[bisect_left(self.buckets, value)] += 1
+            self._sketch.add(value)
             self._sum += value
             self._count += 1
 
-            # Keep last 1000 values for percentile calculation
-            if len(self._values) > 1000:
-                self._values = self._values[-1000:]
-
     @property
     def count(self) -> int:
         """Get observation count"""
@@ -129,15 +230,63 @@ class Histogram:
     def percentile(self, p: float) -> float:
         """Get percentile value (0-100)"""
         with self._lock:
-            if not self._values:
-                return 0.0
+            return self._sketch.quantile(p / 100)
 
-            sorted_values = sorted(self._values)
-            idx = int(len(sorted_values) * p / 100)
-            return sorted_values[min(idx, len(sorted_values) - 1)]
+    def percentiles(self, ps: list[float]) -> list[float]:
+        """Get several percentile values (0-100) in one pass"""
+        with self._lock:
+            return self._sketch.quantiles([p / 100 for p in ps])
+
+    def bucket_counts(self) -> list[tuple[float, int]]:
+        """
+        Get cumulative bucket counts
+
+        Returns:
+            (upper bound, observations <= bound) pairs, ending with (inf, count)
+        """
+        with self._lock:
+            counts = list(self._bucket_counts)
+        cumulative = []
+        total = 0
+        for bound, n in zip([*self.buckets, math.inf], counts, strict=True):
+            total += n
+            cumulative.append((bound, total))
+        return cumulative
+
+    def _make_child(self, labels: dict[str, str]) -> "Histogram":
+        if self._collector is not None:
+            return self._collector.histogram(self.name, self.description, labels, self.buckets)
+        return Histogram(
+            name=self.name,
+            description=self.description,
+            labels=labels,
+            buckets=self.buckets,
+            relative_accuracy=self.relative_accuracy,
+        )
+
+    def merge(self, other: "Histogram") -> None:
+        """
+        Add another histogram's observations into this one
+
+        Args:
+            other: Histogram with the same buckets and relative accuracy
+        """
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+
+        with other._lock:
+            counts = list(other._bucket_counts)
+            sketch = copy.deepcopy(other._sketch)
+            total, count = other._sum, other._count
+        with self._lock:
+            self._bucket_counts = [a + b for a, b in zip(self._bucket_counts, counts, strict=True)]
+            self._sketch.merge(sketch)
+            self._sum += total
+            self._count += count
 
     def to_dict(self) -> dict:
         """Convert to dictionary"""
+        p50, p95, p99 = self.percentiles([50, 95, 99])
         return {
             "name": self.name,
             "type": "histogram",
@@ -146,9 +295,9 @@ class Histogram:
             "count": self._count,
             "sum": self._sum,
             "avg": self.avg,
-            "p50": self.percentile(50),
-            "p95": self.percentile(95),
-            "p99": self.percentile(99),
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
         }
 
 
@@ -196,6 +345,10 @@ class MetricsCollector:
         requests.inc()
         active.set(10)
 
+        # Bind labels once on hot paths
+        chat_requests = requests.with_labels(route="chat")
+        chat_requests.inc()
+
         with latency.time():
             await process_request()
 
@@ -215,22 +368,30 @@ class MetricsCollector:
     ) -> Counter:
         """Get or create a counter"""
         key = self._make_key(name, labels)
-        with self._lock:
-            if key not in self._counters:
-                self._counters[key] = Counter(
-                    name=name, description=description, labels=labels or {}
-                )
-            return self._counters[key]
+        metric = self._counters.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._counters.get(key)
+                if metric is None:
+                    metric = self._counters[key] = Counter(
+                        name=name, description=description, labels=labels or {}, _collector=self
+                    )
+        return metric
 
     def gauge(
         self, name: str, description: str = "", labels: dict[str, str] | None = None
     ) -> Gauge:
         """Get or create a gauge"""
         key = self._make_key(name, labels)
-        with self._lock:
-            if key not in self._gauges:
-                self._gauges[key] = Gauge(name=name, description=description, labels=labels or {})
-            return self._gauges[key]
+        metric = self._gauges.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._gauges.get(key)
+                if metric is None:
+                    metric = self._gauges[key] = Gauge(
+                        name=name, description=description, labels=labels or {}, _collector=self
+                    )
+        return metric
 
     def histogram(
         self,
@@ -241,16 +402,19 @@ class MetricsCollector:
     ) -> Histogram:
         """Get or create a histogram"""
         key = self._make_key(name, labels)
-        with self._lock:
-            if key not in self._histograms:
-                self._histograms[key] = Histogram(
-                    name=name,
-                    description=description,
-                    labels=labels or {},
-                    buckets=buckets
-                    or [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
-                )
-            return self._histograms[key]
+        metric = self._histograms.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._histograms.get(key)
+                if metric is None:
+                    metric = self._histograms[key] = Histogram(
+                        name=name,
+                        description=description,
+                        labels=labels or {},
+                        buckets=buckets or list(DEFAULT_BUCKETS),
+                        _collector=self,
+                    )
+        return metric
 
     def timer(self, name: str, description: str = "") -> Timer:
         """Create a timer context manager"""
@@ -275,40 +439,70 @@ class MetricsCollector:
         }
 
     def to_prometheus(self) -> str:
-        """Export metrics in Prometheus format"""
-        lines = []
+        """Export metrics in Prometheus text format"""
+        with self._lock:
+            counters = [m for m in self._counters.values() if not self._is_template(m)]
+            gauges = [m for m in self._gauges.values() if not self._is_template(m)]
+            histograms = [m for m in self._histograms.values() if not self._is_template(m)]
 
-        # Counters
-        for counter in self._counters.values():
-            labels = self._format_labels(counter.labels)
-            lines.append(f"# HELP {counter.name} {counter.description}")
-            lines.append(f"# TYPE {counter.name} counter")
-            lines.append(f"{counter.name}{labels} {counter.value}")
-
-        # Gauges
-        for gauge in self._gauges.values():
-            labels = self._format_labels(gauge.labels)
-            lines.append(f"# HELP {gauge.name} {gauge.description}")
-            lines.append(f"# TYPE {gauge.name} gauge")
-            lines.append(f"{gauge.name}{labels} {gauge.value}")
-
-        # Histograms
-        for hist in self._histograms.values():
-            labels = self._format_labels(hist.labels)
-            lines.append(f"# HELP {hist.name} {hist.description}")
-            lines.append(f"# TYPE {hist.name} histogram")
-            lines.append(f"{hist.name}_count{labels} {hist.count}")
-            lines.append(f"{hist.name}_sum{labels} {hist.sum}")
+        lines = []
+        # HELP/TYPE must appear once per metric name, before all of its series
+        for family in self._group_by_name(counters):
+            self._append_header(lines, family[0], "counter")
+            for counter in family:
+                labels = self._format_labels(counter.labels)
+                lines.append(f"{counter.name}{labels} {counter.value}")
+
+        for family in self._group_by_name(gauges):
+            self._append_header(lines, family[0], "gauge")
+            for gauge in family:
+                labels = self._format_labels(gauge.labels)
+                lines.append(f"{gauge.name}{labels} {gauge.value}")
+
+        for family in self._group_by_name(histograms):
+            self._append_header(lines, family[0], "histogram")
+            for hist in family:
+                for bound, count in hist.bucket_counts():
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    labels = self._format_labels({**hist.labels, "le": le})
+                    lines.append(f"{hist.name}_bucket{labels} {count}")
+                labels = self._format_labels(hist.labels)
+                lines.append(f"{hist.name}_sum{labels} {hist.sum}")
+                lines.append(f"{hist.name}_count{labels} {hist.count}")
 
         return "\n".join(lines)
 
+    def _is_template(self, metric) -> bool:
+        """Whether a metric is only used to bind labeled children (not exported)"""
+        if not metric._children:
+            return False
+        if isinstance(metric, Histogram):
+            return metric.count == 0
+        return not metric._cells and metric._value == 0
+
+    def _group_by_name(self, metrics: list) -> list[list]:
+        """Group metrics into families sharing a name, in first-seen order"""
+        families: dict[str, list] = {}
+        for metric in metrics:
+            families.setdefault(metric.name, []).append(metric)
+        return list(families.values())
+
+    def _append_header(self, lines: list[str], metric, kind: str) -> None:
+        """Append HELP and TYPE lines for a metric family"""
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+
     def _format_labels(self, labels: dict[str, str]) -> str:
         """Format labels for Prometheus"""
         if not labels:
             return ""
-        parts = [f'{k}="{v}"' for k, v in labels.items()]
+        parts = [f'{k}="{self._escape_label(v)}"' for k, v in labels.items()]
         return "{" + ",".join(parts) + "}"
 
+    def _escape_label(self, value: str) -> str:
+        """Escape a label value for the Prometheus text format"""
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
     def reset(self) -> None:
         """Reset all metrics"""
         with self._lock:
@@ -0,0 +1,187 @@
+"""
+Mergeable quantile sketch for histogram metrics
+"""
+
+import math
+from collections.abc import Iterable
+
+
+class _BinStore:
+    """Dense counts for a contiguous range of bin indexes"""
+
+    def __init__(self, max_bins: int):
+        self.max_bins = max_bins
+        self.bins: list[int] = []
+        self.offset = 0  # Bin index of bins[0]
+        self.count = 0
+
+    def add(self, index: int, count: int = 1) -> None:
+        bins = self.bins
+        if not bins:
+            self.offset = index
+            bins.append(0)
+        elif index < self.offset:
+            if self.offset + len(bins) - index > self.max_bins:
+                # Out of room: fold the lowest values into the lowest bin
+                index = self.offset
+            else:
+                bins[:0] = [0] * (self.offset - index)
+                self.offset = index
+        elif index >= self.offset + len(bins):
+            bins.extend([0] * (index - self.offset - len(bins) + 1))
+            if len(bins) > self.max_bins:
+                self._collapse_low(len(bins) - self.max_bins)
+
+        bins[index - self.offset] += count
+        self.count += count
+
+    def _collapse_low(self, n: int) -> None:
+        """Merge the n lowest bins into the next one"""
+        folded = sum(self.bins[: n + 1])
+        del self.bins[:n]
+        self.bins[0] = folded
+        self.offset += n
+
+    def items(self) -> Iterable[tuple[int, int]]:
+        """(index, count) for non-empty bins, ascending"""
+        offset = self.offset
+        return ((offset + i, c) for i, c in enumerate(self.bins) if c)
+
+    def merge(self, other: "_BinStore") -> None:
+        for index, count in other.items():
+            self.add(index, count)
+
+
+class DDSketch:
+    """
+    Quantile sketch with bounded relative error (DDSketch)
+
+    Values are counted in logarithmically sized bins, so recording is O(1)
+    and memory depends on the range of values, not on how many were seen.
+    Every quantile is within ``relative_accuracy`` of the true value over
+    the sketch's whole lifetime, and sketches with the same accuracy can be
+    merged exactly (e.g. to aggregate several workers).
+
+    Example:
+        sketch = DDSketch(relative_accuracy=0.01)
+        for latency in latencies:
+            sketch.add(latency)
+        p99 = sketch.quantile(0.99)
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        """
+        Initialize sketch
+
+        Args:
+            relative_accuracy: Maximum relative error of returned quantiles
+            max_bins: Bins per sign; beyond this the smallest values lose accuracy
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        # Values this close to zero share the zero bin
+        self._min_value = 1e-9
+
+        self._positive = _BinStore(max_bins)
+        self._negative = _BinStore(max_bins)
+        self._zero = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """Record a value"""
+        if value > self._min_value:
+            self._positive.add(math.ceil(math.log(value) / self._log_gamma))
+        elif value < -self._min_value:
+            self._negative.add(math.ceil(math.log(-value) / self._log_gamma))
+        else:
+            self._zero += 1
+
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated value (0.0 if the sketch is empty)
+        """
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: list[float]) -> list[float]:
+        """
+        Estimate several quantiles in one pass over the bins
+
+        Args:
+            qs: Quantiles between 0 and 1
+
+        Returns:
+            Estimated values, in the order of qs
+        """
+        if self.count == 0:
+            return [0.0] * len(qs)
+
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        results = [0.0] * len(qs)
+        pending = iter(order)
+        current = next(pending, None)
+        seen = 0
+
+        for value, count in self._bins_ascending():
+            seen += count
+            while current is not None and seen > qs[current] * (self.count - 1):
+                results[current] = min(max(value, self.min), self.max)
+                current = next(pending, None)
+            if current is None:
+                break
+
+        while current is not None:
+            results[current] = self.max
+            current = next(pending, None)
+        return results
+
+    def merge(self, other: "DDSketch") -> None:
+        """
+        Add another sketch's values into this one
+
+        Args:
+            other: Sketch with the same relative accuracy
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+
+        self._positive.merge(other._positive)
+        self._negative.merge(other._negative)
+        self._zero += other._zero
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bins_ascending(self) -> Iterable[tuple[float, int]]:
+        """(representative value, count) for every non-empty bin, ascending"""
+        for index, count in reversed(list(self._negative.items())):
+            yield -self._value(index), count
+        if self._zero:
+            yield 0.0, self._zero
+        for index, count in self._positive.items():
+            yield self._value(index), count
+
+    def _value(self, index: int) -> float:
+        """Representative value of a bin (within relative_accuracy of every value in it)"""
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def __len__(self) -> int:
+        """Number of recorded values"""
+        return self.count
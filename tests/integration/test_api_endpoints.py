@@ -95,6 +95,31 @@ class TestAgentEndpoints:
         # Will fail auth but endpoint exists
         assert response.status_code in [200, 401, 403]
 
+    def test_chat_reports_queue_position(self, test_app, client):
+        """Test that /agent/chat returns queue positions and queues per API key"""
+        from clawdbot.agents.runtime import AgentEvent
+        from clawdbot.auth import verify_api_key
+
+        runtime_kwargs = {}
+
+        async def run_turn(session, message, **kwargs):
+            runtime_kwargs.update(kwargs)
+            yield AgentEvent("queue", {"lane": "global", "position": 2, "active": 10})
+            yield AgentEvent("assistant", {"delta": {"type": "text_delta", "text": "done"}})
+
+        runtime = Mock(spec=AgentRuntime)
+        runtime.run_turn = run_turn
+        runtime.model_str = "m1"
+        set_runtime(runtime)
+        test_app.dependency_overrides[verify_api_key] = lambda: Mock(key_id="k1")
+
+        response = client.post("/agent/chat", json={"session_id": "s1", "message": "hi"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["response"] == "done"
+        assert runtime_kwargs["tenant"] == "key:k1"
+        assert data["metadata"]["queue"] == [{"lane": "global", "position": 2, "active": 10}]
+
 
 class TestChannelEndpoints:
     """Test channel management endpoints"""
@@ -125,6 +150,86 @@ class TestOpenAICompatibility:
         assert "data" in data
         assert len(data["data"]) > 0
 
+    @pytest.fixture
+    def pooled_runtime(self, temp_workspace):
+        """Pooled runtime for model "m1" answering from a fake provider"""
+        from clawdbot.agents.providers import LLMResponse, ProviderPool
+        from clawdbot.agents.runtime import configure_runtime_pool
+        from clawdbot.api import openai_compat
+        from clawdbot.config import get_settings
+
+        settings = get_settings()
+        pool = configure_runtime_pool(ProviderPool(), enable_context_management=False)
+        runtime = pool.get("m1", base_url=settings.agent.base_url, api_key=settings.agent.api_key)
+
+        async def fake_stream(messages, tools=None, max_tokens=4096, **kw):
+            yield LLMResponse(type="text_delta", content="pooled reply")
+            yield LLMResponse(
+                type="usage",
+                content={"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+            )
+            yield LLMResponse(type="done", content=None, finish_reason="stop")
+
+        runtime.provider.stream = fake_stream
+        openai_compat.set_runtime(Mock(spec=AgentRuntime))
+        openai_compat.set_session_manager(SessionManager(temp_workspace))
+        yield runtime
+        configure_runtime_pool()
+
+    def test_chat_completions_uses_pooled_runtime(self, client, pooled_runtime):
+        """Test /v1/chat/completions through the runtime pool"""
+        payload = {"model": "m1", "messages": [{"role": "user", "content": "hi"}]}
+
+        response = client.post("/v1/chat/completions", json=payload)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["choices"][0]["message"]["content"] == "pooled reply"
+        assert data["usage"]["total_tokens"] == 5
+
+        response = client.post("/v1/chat/completions", json={**payload, "stream": True})
+        assert response.status_code == 200
+        assert "pooled reply" in response.text
+        assert response.text.rstrip().endswith("data: [DONE]")
+
+    def test_chat_completions_queue_per_api_key(self, client, pooled_runtime):
+        """Test that turns share the global queue per API key, not per session"""
+        from clawdbot.agents.runtime import AgentEvent
+        from clawdbot.auth import APIKey, get_api_key_manager
+
+        seen = {}
+
+        async def run_turn(session, message, **kwargs):
+            seen.update(kwargs)
+            yield AgentEvent("assistant", {"delta": {"type": "text_delta", "text": "ok"}})
+
+        pooled_runtime.run_turn = run_turn
+        key = APIKey(key_id="k1", key_hash="h", name="client")
+        payload = {"model": "m1", "messages": [{"role": "user", "content": "hi"}]}
+
+        with patch.object(get_api_key_manager(), "avalidate_key", AsyncMock(return_value=key)):
+            response = client.post(
+                "/v1/chat/completions", json=payload, headers={"X-API-Key": "raw"}
+            )
+        assert response.status_code == 200
+        assert seen["tenant"] == "key:k1"
+
+    def test_streaming_reports_queue_position(self, client, pooled_runtime):
+        """Test that streamed completions carry queue positions as SSE comments"""
+        from clawdbot.agents.runtime import AgentEvent
+
+        async def run_turn(session, message, **kwargs):
+            yield AgentEvent("queue", {"lane": "session", "position": 1, "active": 1})
+            yield AgentEvent("assistant", {"delta": {"type": "text_delta", "text": "late"}})
+
+        pooled_runtime.run_turn = run_turn
+        payload = {"model": "m1", "messages": [{"role": "user", "content": "hi"}], "stream": True}
+
+        response = client.post("/v1/chat/completions", json=payload)
+        assert response.status_code == 200
+        events = response.text.split("\n\n")
+        assert events[1] == ': queue {"lane": "session", "position": 1, "active": 1}'
+        assert "late" in events[2]
+
 
 class TestRateLimiting:
     """Test rate limiting"""
@@ -4,7 +4,13 @@ Tests for context compaction
 
 import pytest
 
-from clawdbot.agents.compaction import CompactionManager, CompactionStrategy, TokenAnalyzer
+from clawdbot.agents.compaction import (
+    CompactionManager,
+    CompactionStrategy,
+    TokenAnalyzer,
+    repair_tool_sequence,
+    validate_tool_sequence,
+)
 
 
 class TestTokenAnalyzer:
@@ -148,3 +154,254 @@ class TestCompactionManager:
 
         # System message should always be present
         assert any(m["role"] == "system" for m in result)
+
+
+class TestTokenIndex:
+    """Test incremental token counts and prefix sums"""
+
+    @pytest.fixture
+    def index(self):
+        from clawdbot.agents.compaction import TokenIndex
+
+        index = TokenIndex()
+        # system(10), a(5), b(7), system(3), c(2), d(9)
+        for tokens, role in [(10, "s"), (5, "a"), (7, "b"), (3, "s"), (2, "c"), (9, "d")]:
+            index.append(tokens, is_system=role == "s")
+        return index
+
+    def test_totals(self, index):
+        assert len(index) == 6
+        assert index.total == 36
+        assert index.system_tokens == 13
+        assert index.other_tokens == 23
+        assert index.tokens_between(1, 3) == 12
+        assert index.needs_compaction(35)
+        assert not index.needs_compaction(36)
+
+    def test_budget_search(self, index):
+        # Non-system tokens in order: 5, 7, 2, 9
+        assert index.recent_others(11) == 2  # keeps 2 + 9
+        assert index.recent_others(10) == 3  # keeps 9
+        assert index.recent_others(8) == 4  # keeps nothing
+        assert index.recent_others(-1) == 4
+        assert index.recent_others(100, stop=1) == 1
+
+        assert index.leading_others(12) == 2
+        assert index.leading_others(4) == 0
+        assert index.leading_others(9, start=1) == 2
+        assert index.leading_others_tokens(2) == 12
+
+    def test_keep_recent_matches_greedy_reference(self):
+        import random
+
+        rng = random.Random(3)
+        analyzer = TokenAnalyzer()
+        manager = CompactionManager(analyzer, CompactionStrategy.KEEP_RECENT)
+
+        for _ in range(50):
+            # Tool results are grouped with their calls (see TestTurnGroups)
+            roles = ["user", "assistant", "system"]
+            messages = [
+                {"role": rng.choice(roles), "content": "w " * rng.randint(0, 40)}
+                for _ in range(rng.randint(1, 30))
+            ]
+            target = rng.randint(0, 300)
+
+            # What the strategy did before it used prefix sums
+            system = [m for m in messages if m["role"] == "system"]
+            expected, tokens = [], analyzer.estimate_messages_tokens(system)
+            for msg in reversed([m for m in messages if m["role"] != "system"]):
+                msg_tokens = analyzer.estimate_messages_tokens([msg])
+                if tokens + msg_tokens > target:
+                    break
+                expected.insert(0, msg)
+                tokens += msg_tokens
+            if analyzer.estimate_messages_tokens(messages) > target:
+                expected = system + expected
+            else:
+                expected = messages
+
+            assert manager.compact(messages, target) == expected
+
+    def test_sliding_window_keeps_order(self):
+        analyzer = TokenAnalyzer()
+        manager = CompactionManager(analyzer, CompactionStrategy.SLIDING_WINDOW)
+        messages = [{"role": "user", "content": f"message {i}"} for i in range(20)]
+        per_message = analyzer.message_tokens(messages[0])
+
+        result = manager.compact(messages, target_tokens=per_message * 5)
+
+        assert len(result) == 5
+        assert result == sorted(result, key=messages.index)
+
+    def test_session_messages_not_recounted(self, tmp_path):
+        from clawdbot.agents.session import Session
+
+        session = Session("s1", tmp_path)
+        session.add_system_message("You are helpful")
+        for i in range(30):
+            session.add_user_message(f"question {i} " * 10)
+
+        analyzer = TokenAnalyzer()
+        index = session.token_index(analyzer.tokenizer)
+        analyzer.tokenizer = None  # Any re-count would fail
+
+        manager = CompactionManager(analyzer, CompactionStrategy.KEEP_RECENT)
+        kept = manager.select(index, session.messages, target_tokens=index.total // 2)
+
+        assert kept[0] == 0
+        assert kept[1:] == list(range(kept[1], 31))
+        assert sum(index.counts[i] for i in kept) <= index.total // 2
+
+    @pytest.mark.slow
+    @pytest.mark.parametrize("size", [5_000, 50_000])
+    def test_benchmark_compaction(self, size):
+        """Benchmark: per-turn context check and compaction over long histories"""
+        import time
+
+        from clawdbot.agents.session import Message
+
+        analyzer = TokenAnalyzer()
+        roles = ["user", "assistant", "tool"]
+        messages = [Message(role="system", content="You are a helpful assistant")] + [
+            Message(
+                role=roles[i % 3],
+                content=f"turn {i} " + "lorem ipsum dolor " * 10,
+                tool_calls=[{"id": f"call_{i}"}] if i % 3 == 1 else None,
+                tool_call_id=f"call_{i - 1}" if i % 3 == 2 else None,
+            )
+            for i in range(size)
+        ]
+
+        # Before: build API dicts and count every message, every turn
+        start = time.perf_counter()
+        analyzer.estimate_messages_tokens([m.to_api_format() for m in messages])
+        full_count = time.perf_counter() - start
+
+        # After: the index is built once, then each turn appends and reads the total
+        manager = CompactionManager(analyzer)
+        index = manager.build_index(messages)
+        extra = Message(role="user", content="one more question")
+        start = time.perf_counter()
+        for _ in range(1000):
+            index.append(analyzer.message_tokens(extra))
+            index.needs_compaction(10**9)
+        incremental = (time.perf_counter() - start) / 1000
+
+        target = index.total // 3
+        history = messages + [extra] * 1000
+        for strategy in CompactionStrategy:
+            manager.strategy = strategy
+            kept = manager.select(index, history, target)
+            assert sum(index.counts[i] for i in kept) <= target
+            assert not validate_tool_sequence([history[i] for i in kept])
+
+        assert incremental * 100 < full_count
+
+
+class TestTurnGroups:
+    """Test that compaction keeps tool calls and their results together"""
+
+    @staticmethod
+    def conversation(turns):
+        """User question, assistant tool call, tool results, assistant answer per turn"""
+        messages = [{"role": "system", "content": "You are a helpful assistant"}]
+        for i in range(turns):
+            calls = [{"id": f"call_{i}_{j}"} for j in range(1 + i % 3)]
+            messages.append({"role": "user", "content": f"question {i} " * 10})
+            messages.append({"role": "assistant", "content": "", "tool_calls": calls})
+            for call in calls:
+                messages.append(
+                    {"role": "tool", "tool_call_id": call["id"], "content": "result " * (5 + i)}
+                )
+            messages.append({"role": "assistant", "content": f"answer {i} " * 8})
+        return messages
+
+    def test_validate_and_repair(self):
+        messages = self.conversation(2)
+        assert validate_tool_sequence(messages) == []
+        assert repair_tool_sequence(messages) is messages
+
+        # Drop the first call's result and the second turn's tool call
+        broken = [m for i, m in enumerate(messages) if i not in (3, 6)]
+        problems = validate_tool_sequence(broken)
+
+        assert len(problems) == 3  # one unanswered call, two orphaned results
+        repaired = repair_tool_sequence(broken)
+        assert validate_tool_sequence(repaired) == []
+        assert repaired == [messages[i] for i in (0, 1, 4, 5, 9)]
+
+    def test_session_messages(self, tmp_path):
+        from clawdbot.agents.session import Session
+
+        session = Session("s1", tmp_path)
+        session.add_user_message("run it")
+        session.add_assistant_message("", [{"id": "a"}, {"id": "b"}])
+        session.add_tool_message("b", "done")
+
+        assert validate_tool_sequence(session.messages)
+        session.add_tool_message("a", "done")
+        assert validate_tool_sequence(session.messages) == []
+
+    @pytest.mark.parametrize("strategy", list(CompactionStrategy))
+    def test_no_orphans(self, strategy):
+        analyzer = TokenAnalyzer()
+        manager = CompactionManager(analyzer, strategy)
+        messages = self.conversation(12)
+        total = analyzer.estimate_messages_tokens(messages)
+
+        for target in range(50, total, 37):
+            result = manager.compact(messages, target)
+
+            assert validate_tool_sequence(result) == [], target
+            assert analyzer.estimate_messages_tokens(result) <= target
+            assert result[0]["role"] == "system"
+
+    def test_knapsack_prefers_valuable_groups(self):
+        analyzer = TokenAnalyzer()
+        manager = CompactionManager(analyzer, CompactionStrategy.KEEP_IMPORTANT)
+        messages = [
+            {"role": "user", "content": "old question " * 20},
+            {"role": "assistant", "content": "important answer " * 20},
+            {"role": "tool", "tool_call_id": "x", "content": "stray result " * 20},
+            {"role": "user", "content": "recent question " * 20},
+        ]
+        per_message = analyzer.message_tokens(messages[1])
+
+        result = manager.compact(messages, target_tokens=per_message * 2)
+
+        # The stray tool result is never kept; the assistant answer and the
+        # most recent question are worth more than the old question
+        assert result == [messages[1], messages[3]]
+
+    def test_knapsack_fits_budget(self):
+        import random
+
+        from clawdbot.agents.compaction.groups import TurnGroup, select_groups
+
+        rng = random.Random(7)
+        for _ in range(100):
+            groups = [
+                TurnGroup(start=i, end=i + 1, tokens=rng.randint(0, 500), value=rng.random())
+                for i in range(rng.randint(0, 40))
+            ]
+            budget = rng.randint(0, 3000)
+
+            chosen = select_groups(groups, budget)
+
+            assert sum(g.tokens for g in chosen) <= budget
+            assert len({id(g) for g in chosen}) == len(chosen)
+
+    def test_knapsack_beats_greedy(self):
+        from clawdbot.agents.compaction.groups import TurnGroup, select_groups
+
+        # Greedy by value per token takes the small group and then cannot fit either large one
+        groups = [
+            TurnGroup(start=0, end=1, tokens=60, value=1.0),
+            TurnGroup(start=1, end=2, tokens=60, value=1.0),
+            TurnGroup(start=2, end=3, tokens=10, value=0.5),
+        ]
+
+        chosen = select_groups(groups, 120)
+
+        assert sorted(g.start for g in chosen) == [0, 1]
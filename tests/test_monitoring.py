@@ -161,6 +161,40 @@ class TestCounter:
         assert data["type"] == "counter"
         assert data["value"] == 1.0
 
+    def test_counter_threads(self):
+        import threading
+
+        counter = Counter(name="test")
+
+        def work():
+            for _ in range(10_000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value == 40_000
+        assert len(counter._cells) == 4
+
+    def test_with_labels_returns_registered_child(self):
+        metrics = MetricsCollector()
+        tokens = metrics.counter("tokens_total", "Tokens", labels={"service": "api"})
+
+        child = tokens.with_labels(provider="openai")
+        assert tokens.with_labels(provider="openai") is child
+        assert child is metrics.counter(
+            "tokens_total", labels={"service": "api", "provider": "openai"}
+        )
+
+        child.inc(3)
+        prom = metrics.to_prometheus().splitlines()
+        assert 'tokens_total{service="api",provider="openai"} 3.0' in prom
+        # The unused parent only binds labels and is not exported
+        assert 'tokens_total{service="api"} 0.0' not in prom
+
 
 class TestGauge:
     """Test Gauge metric"""
@@ -182,6 +216,22 @@ class TestGauge:
         gauge.dec(2.0)
         assert gauge.value == 3.0
 
+    def test_gauge_set_after_increments_from_threads(self):
+        import threading
+
+        gauge = Gauge(name="test_gauge")
+        thread = threading.Thread(target=lambda: gauge.inc(7.0))
+        thread.start()
+        thread.join()
+        gauge.inc(2.0)
+
+        gauge.set(1.0)
+        assert gauge.value == 1.0
+
+        gauge.dec()
+        assert gauge.value == 0.0
+        assert gauge.with_labels(pool="a").value == 0.0
+
 
 class TestHistogram:
     """Test Histogram metric"""
@@ -220,6 +270,80 @@ class TestHistogram:
         assert "p95" in data
         assert "p99" in data
 
+    def test_percentiles_cover_full_lifetime(self):
+        hist = Histogram(name="test")
+        # Early slow requests must still show up after many fast ones
+        for _ in range(100):
+            hist.observe(10.0)
+        for _ in range(5000):
+            hist.observe(0.01)
+
+        assert hist.percentile(99) == pytest.approx(10.0, rel=0.01)
+        assert hist.percentile(50) == pytest.approx(0.01, rel=0.01)
+
+    def test_percentile_relative_accuracy(self):
+        import random
+
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-3, 1.5) for _ in range(20000)]
+        hist = Histogram(name="test")
+        for value in values:
+            hist.observe(value)
+
+        values.sort()
+        for p in (50, 90, 99, 99.9):
+            exact = values[int(p / 100 * (len(values) - 1))]
+            assert hist.percentile(p) == pytest.approx(exact, rel=0.02)
+
+    def test_cumulative_buckets(self):
+        hist = Histogram(name="test", buckets=[1.0, 0.1, 0.5])
+        for value in (0.05, 0.1, 0.3, 0.7, 3.0):
+            hist.observe(value)
+
+        assert hist.bucket_counts() == [(0.1, 2), (0.5, 3), (1.0, 4), (float("inf"), 5)]
+
+    def test_merge(self):
+        a, b = Histogram(name="a"), Histogram(name="b")
+        for i in range(1, 101):
+            (a if i % 2 else b).observe(i / 100)
+
+        a.merge(b)
+
+        assert a.count == 100
+        assert a.bucket_counts()[-1] == (float("inf"), 100)
+        assert a.percentile(50) == pytest.approx(0.5, rel=0.03)
+
+
+class TestDDSketch:
+    """Test quantile sketch"""
+
+    def test_empty(self):
+        from clawdbot.monitoring import DDSketch
+
+        assert DDSketch().quantile(0.5) == 0.0
+
+    def test_negative_zero_and_positive_values(self):
+        from clawdbot.monitoring import DDSketch
+
+        sketch = DDSketch()
+        for value in (-5.0, -1.0, 0.0, 1.0, 5.0):
+            sketch.add(value)
+
+        assert sketch.quantiles([0.0, 0.5, 1.0]) == [-5.0, 0.0, 5.0]
+        assert sketch.quantile(0.25) == pytest.approx(-1.0, rel=0.01)
+
+    def test_bounded_bins(self):
+        from clawdbot.monitoring import DDSketch
+
+        sketch = DDSketch(relative_accuracy=0.01, max_bins=64)
+        for exponent in range(-30, 30):
+            sketch.add(10.0**exponent)
+
+        assert len(sketch._positive.bins) <= 64
+        assert sketch.count == 60
+        # High quantiles stay accurate; only the smallest values are folded
+        assert sketch.quantile(1.0) == pytest.approx(1e29, rel=0.01)
+
 
 class TestMetricsCollector:
     """Test MetricsCollector class"""
@@ -285,6 +409,23 @@ class TestMetricsCollector:
         assert "http_requests" in prom
         assert "counter" in prom
 
+    def test_prometheus_histogram_buckets(self):
+        metrics = MetricsCollector()
+        for route in ("chat", "admin"):
+            hist = metrics.histogram(
+                "latency_seconds", "Latency", labels={"route": route}, buckets=[0.1, 1.0]
+            )
+            hist.observe(0.05)
+            hist.observe(0.5)
+
+        prom = metrics.to_prometheus().splitlines()
+
+        assert prom.count("# TYPE latency_seconds histogram") == 1
+        assert 'latency_seconds_bucket{route="chat",le="0.1"} 1' in prom
+        assert 'latency_seconds_bucket{route="chat",le="1.0"} 2' in prom
+        assert 'latency_seconds_bucket{route="admin",le="+Inf"} 2' in prom
+        assert 'latency_seconds_count{route="admin"} 2' in prom
+
     def test_reset(self):
         metrics = MetricsCollector()
         metrics.counter("test").inc()
@@ -317,3 +458,159 @@ class TestTimer:
 
         assert hist.count == 1
         assert hist.avg >= 0.1
+
+
+class TestRequestCapture:
+    """Test sampled provider request capture"""
+
+    def test_disabled_by_default(self, tmp_path):
+        from clawdbot.monitoring.capture import RequestCapture
+
+        capture = RequestCapture(tmp_path / "captures")
+        assert capture.capture("openai", {"model": "m"}) is False
+        capture.flush()
+        assert not (tmp_path / "captures").exists()
+
+    def test_writes_in_background(self, tmp_path):
+        import json
+
+        from clawdbot.monitoring.capture import RequestCapture
+
+        capture = RequestCapture(tmp_path / "captures", enabled=True)
+        assert capture.capture("openai", {"model": "m", "messages": [{"role": "user"}]})
+        capture.flush()
+
+        files = list((tmp_path / "captures").glob("request-*-openai.json"))
+        assert len(files) == 1
+        assert json.loads(files[0].read_text())["model"] == "m"
+
+    def test_sampling(self, tmp_path):
+        from clawdbot.monitoring.capture import RequestCapture
+
+        capture = RequestCapture(tmp_path / "captures", enabled=True, sample_rate=0.0)
+        assert not any(capture.capture("openai", {}) for _ in range(100))
+
+        capture = RequestCapture(tmp_path / "captures", enabled=True, sample_rate=0.5)
+        sampled = sum(capture.should_capture() for _ in range(2000))
+        assert 800 < sampled < 1200
+
+    def test_rotation_caps_files_and_bytes(self, tmp_path):
+        from clawdbot.monitoring.capture import RequestCapture
+
+        directory = tmp_path / "captures"
+        capture = RequestCapture(directory, enabled=True, max_files=3)
+        for i in range(10):
+            capture.capture("openai", {"i": i})
+        capture.flush()
+
+        files = sorted(directory.glob("request-*.json"), key=lambda p: p.stat().st_mtime_ns)
+        assert len(files) == 3
+        assert '"i": 9' in files[-1].read_text()
+
+        # Leftover files are counted against the byte cap after a restart
+        capture = RequestCapture(directory, enabled=True, max_bytes=2_000)
+        capture.capture("openai", {"payload": "x" * 1_500})
+        capture.flush()
+        assert sum(p.stat().st_size for p in directory.glob("request-*.json")) <= 2_000
+
+    def test_capture_races_flush(self, tmp_path):
+        """Test concurrent flushes never make capture() raise or lose a queued write"""
+        import threading
+
+        from clawdbot.monitoring.capture import RequestCapture
+
+        directory = tmp_path / "captures"
+        capture = RequestCapture(directory, enabled=True, max_files=10_000)
+        stop = threading.Event()
+
+        def flusher():
+            while not stop.is_set():
+                capture.flush()
+
+        thread = threading.Thread(target=flusher)
+        thread.start()
+        try:
+            queued = sum(capture.capture("openai", {"i": i}) for i in range(500))
+        finally:
+            stop.set()
+            thread.join()
+        capture.flush()
+
+        assert queued == 500
+        assert len(list(directory.glob("request-*.json"))) == 500
+
+    def test_shut_down_executor_drops_capture(self, tmp_path):
+        from clawdbot.monitoring.capture import RequestCapture
+
+        capture = RequestCapture(tmp_path / "captures", enabled=True)
+        assert capture.capture("openai", {})
+        capture._executor.shutdown(wait=True)
+
+        assert not capture.capture("openai", {})
+        # A fresh executor is started for the next capture
+        assert capture.capture("openai", {})
+        capture.flush()
+
+    @pytest.mark.slow
+    def test_benchmark_counter_increment(self):
+        """Benchmark: ns per increment for looked-up and pre-bound counters"""
+        import time
+
+        metrics = MetricsCollector()
+        n = 200_000
+        labels = {"provider": "openai", "model": "gpt"}
+
+        start = time.perf_counter()
+        for _ in range(n):
+            metrics.counter("tokens_total", labels=labels).inc()
+        lookup = (time.perf_counter() - start) / n
+
+        handle = metrics.counter("tokens_total").with_labels(**labels)
+        start = time.perf_counter()
+        for _ in range(n):
+            handle.inc()
+        bound = (time.perf_counter() - start) / n
+
+        assert handle.value == 2 * n
+        assert bound < lookup
+
+    @pytest.mark.slow
+    def test_benchmark_turn_overhead(self, tmp_path, monkeypatch):
+        """Benchmark: per-request cost of the removed debug dump vs. the capture hook"""
+        import json
+        import time
+
+        from clawdbot.monitoring.capture import RequestCapture
+
+        monkeypatch.chdir(tmp_path)
+        # ~100k-token context: 400 messages of ~1k characters
+        messages = [
+            {"role": "user" if i % 2 else "assistant", "content": "word " * 200}
+            for i in range(400)
+        ]
+        params = {"model": "m", "messages": messages, "max_tokens": 4096, "stream": True}
+        iterations = 20
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            # What every request used to do before the network call
+            json.dumps(messages, ensure_ascii=False)
+            with open("openai_request_debug.json", "w", encoding="utf-8") as f:
+                json.dump(params, f, ensure_ascii=False, indent=2)
+        legacy = (time.perf_counter() - start) / iterations
+
+        capture = RequestCapture(tmp_path / "captures")
+        start = time.perf_counter()
+        for _ in range(iterations):
+            capture.capture("openai", params)
+        disabled = (time.perf_counter() - start) / iterations
+
+        capture = RequestCapture(tmp_path / "captures", enabled=True)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            capture.capture("openai", params)
+        enabled = (time.perf_counter() - start) / iterations
+        capture.flush()
+
+        assert disabled < legacy / 100
+        assert enabled < legacy / 10
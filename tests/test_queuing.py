@@ -3,10 +3,11 @@ Tests for session queuing
 """
 
 import asyncio
+import time
 
 import pytest
 
-from clawdbot.agents.queuing import Lane, QueueManager
+from clawdbot.agents.queuing import FairLane, Lane, Priority, QueueManager
 
 
 class TestLane:
@@ -74,6 +75,79 @@ class TestLane:
         with pytest.raises(asyncio.TimeoutError):
             await lane.enqueue(slow_task, timeout=0.1)
 
+    @pytest.mark.asyncio
+    async def test_handoff_without_polling(self):
+        """Test that a queued task starts as soon as the slot frees"""
+        lane = Lane("test", max_concurrent=1)
+        release = asyncio.Event()
+        order = []
+
+        async def first():
+            await release.wait()
+            order.append("end-1")
+
+        async def second():
+            order.append("start-2")
+
+        t1 = asyncio.create_task(lane.enqueue(first))
+        t2 = asyncio.create_task(lane.enqueue(second))
+        await asyncio.sleep(0)
+        assert lane.active == 1 and lane.queued == 1
+
+        release.set()
+        # A few bare event loop iterations are enough; the old worker polled
+        # on a 100 ms timer and would not have started the second task yet
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert order == ["end-1", "start-2"]
+
+        await asyncio.gather(t1, t2)
+        assert lane.is_idle
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that cancelling a queued task frees its place"""
+        lane = Lane("test", max_concurrent=1)
+        release = asyncio.Event()
+        order = []
+
+        async def task(value):
+            order.append(value)
+            await release.wait()
+
+        t1 = asyncio.create_task(lane.enqueue(lambda: task(1)))
+        t2 = asyncio.create_task(lane.enqueue(lambda: task(2)))
+        t3 = asyncio.create_task(lane.enqueue(lambda: task(3)))
+        await asyncio.sleep(0)
+        assert lane.queued == 2
+
+        t2.cancel()
+        await asyncio.sleep(0)
+        assert lane.queued == 1
+
+        release.set()
+        await asyncio.gather(t1, t3)
+        assert order == [1, 3]
+        assert t2.cancelled()
+        assert lane.active == 0 and lane.is_idle
+
+    @pytest.mark.asyncio
+    async def test_timeout_releases_slot(self):
+        """Test that a timed-out task gives its slot to the next one"""
+        lane = Lane("test", max_concurrent=1)
+
+        async def slow_task():
+            await asyncio.sleep(10)
+
+        async def fast_task():
+            return "fast"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await lane.enqueue(slow_task, timeout=0.05)
+
+        assert await lane.enqueue(fast_task, timeout=1) == "fast"
+        assert lane.is_idle
+
 
 class TestQueueManager:
     """Test QueueManager class"""
@@ -167,3 +241,200 @@ class TestQueueManager:
         assert "global" in stats
         assert "sessions" in stats
         assert stats["total_sessions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_idle_lanes_reaped(self):
+        """Test that idle session lanes are reaped after idle_ttl"""
+        manager = QueueManager(idle_ttl=0.05)
+
+        async def task():
+            return "ok"
+
+        await manager.enqueue_session("session-1", task)
+        manager.get_session_lane("session-2")
+        assert manager.get_stats()["total_sessions"] == 2
+
+        await asyncio.sleep(0.1)
+
+        stats = manager.get_stats()
+        assert stats["total_sessions"] == 0
+        assert stats["reaped_sessions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_busy_lane_not_reaped(self):
+        """Test that a lane in use is kept past idle_ttl"""
+        manager = QueueManager(idle_ttl=0.02)
+        lane = manager.get_session_lane("session-1")
+
+        async def task():
+            await asyncio.sleep(0.06)
+
+        await manager.enqueue_session("session-1", task)
+        # Reused before its own idle timer fired
+        assert manager.get_session_lane("session-1") is lane
+
+        await asyncio.sleep(0.05)
+        assert "session-1" not in manager._session_lanes
+
+
+class TestFairLane:
+    """Test weighted-fair scheduling in FairLane"""
+
+    async def _dispatch_order(self, lane, requests):
+        """Hold the only slot, queue requests, then record the order they run"""
+        order = []
+        assert lane.try_acquire()
+
+        async def waiter(label, tenant, priority):
+            async with lane.slot(tenant, priority):
+                order.append(label)
+
+        tasks = [asyncio.create_task(waiter(*r)) for r in requests]
+        await asyncio.sleep(0)
+        assert lane.queued == len(requests)
+
+        lane.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    @pytest.mark.asyncio
+    async def test_priority_weights(self):
+        """Test classes share slots in proportion to their weights"""
+        lane = FairLane("global", max_concurrent=1)
+        requests = [(f"cron-{i}", "cron", Priority.CRON) for i in range(10)]
+        requests += [(f"chat-{i}", "user", Priority.INTERACTIVE) for i in range(10)]
+
+        order = await self._dispatch_order(lane, requests)
+
+        # Default weights 8:1 -> one cron turn per eight interactive turns
+        assert sum(label.startswith("cron") for label in order[:9]) == 1
+        assert [label for label in order if label.startswith("chat")] == [
+            f"chat-{i}" for i in range(10)
+        ]
+        assert lane.is_idle
+
+    @pytest.mark.asyncio
+    async def test_tenant_round_robin(self):
+        """Test one tenant's backlog does not delay other tenants"""
+        lane = FairLane("global", max_concurrent=1)
+        requests = [(f"heavy-{i}", "heavy", Priority.INTERACTIVE) for i in range(5)]
+        requests += [("light", "light", Priority.INTERACTIVE)]
+
+        order = await self._dispatch_order(lane, requests)
+
+        assert order[:2] == ["heavy-0", "light"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_removed(self):
+        """Test cancelling a queued task frees its place"""
+        lane = FairLane("global", max_concurrent=1)
+        assert lane.try_acquire()
+
+        task = asyncio.create_task(lane.acquire("t", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        assert lane.get_stats()["classes"]["background"]["queued"] == 1
+
+        task.cancel()
+        await asyncio.sleep(0)
+        assert lane.queued == 0
+
+        lane.release()
+        assert lane.is_idle
+
+    @pytest.mark.asyncio
+    async def test_queue_manager_priority(self):
+        """Test QueueManager passes tenant and priority to the global lane"""
+        manager = QueueManager(max_concurrent_global=1)
+
+        async def task():
+            return "done"
+
+        result = await manager.enqueue_both("s1", task, priority=Priority.CRON)
+        assert result == "done"
+        assert isinstance(manager.get_global_lane(), FairLane)
+
+
+async def _simulate(lane, background_jobs=200, interactive_jobs=40, workers=4):
+    """Interactive arrivals during a background flood; returns interactive waits"""
+    waits = []
+
+    async def job(priority, tenant, record):
+        enqueued = time.perf_counter()
+        if isinstance(lane, FairLane):
+            await lane.acquire(tenant=tenant, priority=priority)
+        else:
+            await lane.acquire()
+        if record:
+            waits.append(time.perf_counter() - enqueued)
+        try:
+            await asyncio.sleep(0.005)
+        finally:
+            lane.release()
+
+    flood = [
+        asyncio.create_task(job(Priority.BACKGROUND, "batch", False))
+        for _ in range(background_jobs)
+    ]
+    interactive = []
+    for i in range(interactive_jobs):
+        await asyncio.sleep(0.003)
+        interactive.append(asyncio.create_task(job(Priority.INTERACTIVE, f"user-{i % 8}", True)))
+
+    await asyncio.gather(*flood, *interactive)
+    waits.sort()
+    return waits
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_benchmark_interactive_tail_latency_under_flood():
+    """Benchmark interactive wait time under a background flood, FIFO vs fair"""
+    fifo = await _simulate(Lane("fifo", max_concurrent=4))
+    fair = await _simulate(FairLane("fair", max_concurrent=4))
+
+    def p99(waits):
+        return waits[int(len(waits) * 0.99)]
+
+    # Under FIFO interactive turns queue behind the whole flood
+    assert p99(fair) < p99(fifo) / 5
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_benchmark_enqueue_to_start_1k_sessions():
+    """Benchmark release-to-start handoff delay with 1k concurrent sessions"""
+    manager = QueueManager(max_concurrent_per_session=1, max_concurrent_global=1000)
+    sessions = 1000
+    per_session = 3
+    runs: dict[int, list[tuple[float, float]]] = {i: [] for i in range(sessions)}
+
+    async def turn(index: int):
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        runs[index].append((start, time.perf_counter()))
+
+    async def session_load(index: int):
+        # All turns of a session are enqueued at once, so turns 2..n wait in
+        # the session lane and start when the previous turn releases its slot
+        await asyncio.gather(
+            *(
+                manager.enqueue_session(f"session-{index}", lambda: turn(index))
+                for _ in range(per_session)
+            )
+        )
+
+    await asyncio.gather(*(session_load(i) for i in range(sessions)))
+
+    delays = []
+    for spans in runs.values():
+        assert len(spans) == per_session
+        for (_, previous_end), (start, _) in zip(spans, spans[1:]):
+            # One turn per session at a time
+            assert start >= previous_end
+            delays.append(start - previous_end)
+
+    delays.sort()
+    p99 = delays[int(len(delays) * 0.99)]
+    assert len(delays) == sessions * (per_session - 1)
+    # Well below the 100 ms polling interval of the old worker loop
+    assert p99 < 0.05
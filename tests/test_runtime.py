@@ -83,3 +83,397 @@ class TestAgentEvent:
 
         tool = AgentEvent("tool", {"toolName": "bash"})
         assert tool.type == "tool"
+
+
+class SleepTool:
+    """Minimal tool that sleeps and records concurrency"""
+
+    active = 0
+    peak = 0
+
+    def __init__(self, name: str, delay: float, serial: bool = False):
+        self.name = name
+        self.description = name
+        self.delay = delay
+        self.serial = serial
+
+    def get_schema(self):
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, params):
+        import asyncio
+
+        from clawdbot.agents.tools.base import ToolResult
+
+        SleepTool.active += 1
+        SleepTool.peak = max(SleepTool.peak, SleepTool.active)
+        if self.serial:
+            assert SleepTool.active == 1
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            SleepTool.active -= 1
+        return ToolResult(success=True, content=f"{self.name} done")
+
+
+class TestParallelTools:
+    """Test concurrent execution of tool calls from one assistant message"""
+
+    @pytest.fixture(autouse=True)
+    def reset_counters(self):
+        SleepTool.active = 0
+        SleepTool.peak = 0
+
+    def _runtime(self, tool_names, **kwargs):
+        from clawdbot.agents.providers import LLMResponse
+
+        runtime = AgentRuntime(enable_context_management=False, **kwargs)
+        calls = {"n": 0}
+
+        async def fake_stream(messages, tools=None, max_tokens=4096, **kw):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                yield LLMResponse(
+                    type="tool_call",
+                    content=None,
+                    tool_calls=[
+                        {"id": f"call_{i}", "name": name, "arguments": {}}
+                        for i, name in enumerate(tool_names)
+                    ],
+                )
+                yield LLMResponse(type="done", content=None, finish_reason="tool_calls")
+            else:
+                yield LLMResponse(type="text_delta", content="ok")
+                yield LLMResponse(type="done", content=None, finish_reason="stop")
+
+        runtime.provider.stream = fake_stream
+        return runtime
+
+    @pytest.mark.asyncio
+    async def test_tools_run_concurrently_in_call_order(self, temp_workspace):
+        """Test that results stream as they finish but are stored in call order"""
+        tools = [SleepTool("slow", 0.3), SleepTool("mid", 0.2), SleepTool("fast", 0.1)]
+        runtime = self._runtime(["slow", "mid", "fast"])
+        session = Session("parallel", temp_workspace)
+
+        events = [e async for e in runtime.run_turn(session, "go", tools=tools)]
+
+        # All three were in flight at once, and finished shortest first
+        assert SleepTool.peak == 3
+        results = [e.data["tool"] for e in events if e.type == "tool_result"]
+        assert results == ["fast", "mid", "slow"]
+
+        tool_messages = [m for m in session.messages if m.role == "tool"]
+        assert [m.tool_call_id for m in tool_messages] == ["call_0", "call_1", "call_2"]
+        assert session.messages[1].role == "assistant"
+        assert session.messages[1].tool_calls
+
+    @pytest.mark.asyncio
+    async def test_serial_tools_run_alone(self, temp_workspace):
+        """Test that serial tools wait for earlier calls and block later ones"""
+        tools = [
+            SleepTool("read_a", 0.05),
+            SleepTool("read_b", 0.05),
+            SleepTool("edit", 0.05, serial=True),
+            SleepTool("read_c", 0.05),
+        ]
+        runtime = self._runtime(["read_a", "read_b", "edit", "read_c"])
+        session = Session("serial", temp_workspace)
+
+        events = [e async for e in runtime.run_turn(session, "go", tools=tools)]
+
+        order = [(e.type, e.data["tool"]) for e in events if e.type in ("tool_use", "tool_result")]
+        edit_start = order.index(("tool_use", "edit"))
+        edit_end = order.index(("tool_result", "edit"))
+        assert edit_end == edit_start + 1
+        assert ("tool_result", "read_a") in order[:edit_start]
+        assert ("tool_result", "read_b") in order[:edit_start]
+        assert SleepTool.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, temp_workspace):
+        """Test max_parallel_tools bounds concurrent calls"""
+        names = [f"t{i}" for i in range(6)]
+        tools = [SleepTool(name, 0.02) for name in names]
+        runtime = self._runtime(names, max_parallel_tools=2)
+        session = Session("limit", temp_workspace)
+
+        events = [e async for e in runtime.run_turn(session, "go", tools=tools)]
+
+        assert SleepTool.peak == 2
+        assert len([e for e in events if e.type == "tool_result"]) == 6
+        tool_ids = [m.tool_call_id for m in session.messages if m.role == "tool"]
+        assert tool_ids == [f"call_{i}" for i in range(6)]
+
+
+class TestRuntimePool:
+    """Test pooled runtimes and providers"""
+
+    def test_provider_pool_shares_clients(self):
+        from clawdbot.agents.providers import ProviderPool
+
+        pool = ProviderPool(max_connections=10)
+        a = pool.get_provider("m1", base_url="http://backend/v1", api_key="k")
+        b = pool.get_provider("m1", base_url="http://backend/v1", api_key="k")
+        c = pool.get_provider("m2", base_url="http://backend/v1", api_key="k")
+
+        assert a is b
+        assert a is not c
+        assert len(pool) == 2
+        # Both OpenAI clients share the pool's HTTP connection pool
+        assert a.get_client()._client is pool.http_client
+        assert c.get_client()._client is pool.http_client
+
+    def test_provider_pool_is_bounded(self):
+        from clawdbot.agents.providers import ProviderPool
+
+        pool = ProviderPool(max_size=2)
+        first = pool.get_provider("m1")
+        pool.get_provider("m2")
+        assert pool.get_provider("m1") is first  # m1 is now most recently used
+        pool.get_provider("m3")
+
+        assert len(pool) == 2
+        assert pool.get_provider("m1") is first
+        assert len(pool) == 2
+
+    def test_runtime_pool_reuses_runtimes(self):
+        from clawdbot.agents.providers import ProviderPool
+        from clawdbot.agents.runtime import RuntimePool
+
+        pool = RuntimePool(ProviderPool(), max_size=2)
+        first = pool.get("m1", base_url="http://backend/v1")
+        assert pool.get("m1", base_url="http://backend/v1") is first
+        assert pool.get("m1", base_url="http://other/v1") is not first
+
+        pool.get("m2")
+        assert len(pool) == 2
+        assert pool.get("m1", base_url="http://backend/v1") is not first
+
+    def test_runtime_pool_applies_defaults(self):
+        from clawdbot.agents.providers import ProviderPool
+        from clawdbot.agents.runtime import configure_runtime_pool, get_runtime_pool
+
+        pool = configure_runtime_pool(
+            ProviderPool(),
+            max_parallel_tools=2,
+            tool_offload_threshold=100,
+            enable_context_management=False,
+        )
+        try:
+            runtime = get_runtime_pool().get("m1")
+            assert runtime.max_parallel_tools == 2
+            assert runtime.tool_offload_threshold == 100
+            assert runtime.context_manager is None
+            # Per-call options override the pool defaults
+            assert pool.get("m2", max_parallel_tools=8).max_parallel_tools == 8
+        finally:
+            configure_runtime_pool()
+
+    def test_failover_uses_pool(self):
+        from clawdbot.agents.providers import ProviderPool
+
+        providers = ProviderPool()
+        runtime = AgentRuntime(model="m1", provider_pool=providers)
+        original = runtime.provider
+
+        switched = runtime._provider_for("openai-compatible/m2")
+
+        assert switched is not original
+        assert runtime._provider_for("m1") is original
+        assert switched is providers.get_provider("m2")
+
+    @pytest.mark.asyncio
+    async def test_failover_is_per_turn(self, temp_workspace):
+        """Test that failing over does not switch the shared runtime's model"""
+        from clawdbot.agents.providers import LLMResponse, ProviderPool
+
+        providers = ProviderPool()
+        runtime = AgentRuntime(
+            model="m1",
+            provider_pool=providers,
+            fallback_models=["m2"],
+            enable_context_management=False,
+        )
+        primary = runtime.provider
+        calls = []
+
+        def fake_stream(name, fail):
+            async def stream(messages, tools=None, max_tokens=4096, **kw):
+                calls.append(name)
+                if fail:
+                    raise Exception("503 server error")
+                yield LLMResponse(type="text_delta", content=f"from {name}")
+                yield LLMResponse(type="done", content=None, finish_reason="stop")
+
+            return stream
+
+        primary.stream = fake_stream("m1", fail=len(calls) == 0)
+        providers.get_provider("m2").stream = fake_stream("m2", fail=False)
+
+        session = Session("failover", temp_workspace)
+        events = [e async for e in runtime.run_turn(session, "hi")]
+        assert [e.data["to"] for e in events if e.type == "failover"] == ["m2"]
+        assert session.messages[-1].content == "from m2"
+        assert runtime.provider is primary
+        assert runtime.model_name == "m1"
+
+        # The next turn starts on the primary model again
+        primary.stream = fake_stream("m1", fail=False)
+        [e async for e in runtime.run_turn(session, "again")]
+        assert calls == ["m1", "m2", "m1"]
+        assert session.messages[-1].content == "from m1"
+
+
+class TestBackgroundSummaries:
+    """Test the provider used for rolling summaries"""
+
+    @pytest.mark.asyncio
+    async def test_summary_calls_use_global_lane_and_failover(self):
+        import asyncio
+
+        from clawdbot.agents.compaction import CompactionStrategy
+        from clawdbot.agents.providers import LLMResponse, ProviderPool
+        from clawdbot.agents.queuing import QueueManager
+
+        providers = ProviderPool()
+        runtime = AgentRuntime(
+            model="m1",
+            provider_pool=providers,
+            fallback_models=["m2"],
+            compaction_strategy=CompactionStrategy.SUMMARIZE,
+            queue_manager=QueueManager(max_concurrent_global=1),
+        )
+        lane = runtime.queue_manager.get_global_lane()
+        calls = []
+
+        async def failing(messages, **kw):
+            calls.append(("m1", lane.active))
+            raise Exception("503 server error")
+            yield
+
+        async def working(messages, **kw):
+            calls.append(("m2", lane.active))
+            yield LLMResponse(type="text_delta", content="summary")
+            yield LLMResponse(type="done", content=None, finish_reason="stop")
+
+        runtime.provider.stream = failing
+        providers.get_provider("m2").stream = working
+
+        # Summaries wait for the global lane at background priority
+        assert lane.try_acquire()
+        summarizer = runtime.background_summarizer.summarizer
+        task = asyncio.create_task(summarizer.summarize([{"role": "user", "content": "hi"}]))
+        await asyncio.sleep(0)
+        assert lane.get_stats()["classes"]["background"]["queued"] == 1
+        assert calls == []
+
+        lane.release()
+        assert await task == "[SUMMARY]\nsummary"
+        # Each attempt held the only global slot
+        assert calls == [("m1", 1), ("m2", 1)]
+        assert lane.is_idle
+        assert runtime.provider is providers.get_provider("m1")
+
+
+class TestQueuedTurns:
+    """Test session serialization and global admission control in run_turn"""
+
+    def _runtime(self, queue_manager, delay=0.05):
+        import asyncio
+
+        from clawdbot.agents.providers import LLMResponse
+
+        runtime = AgentRuntime(enable_context_management=False, queue_manager=queue_manager)
+        runtime.in_flight = 0
+        runtime.peak = 0
+
+        async def fake_stream(messages, tools=None, max_tokens=4096, **kw):
+            runtime.in_flight += 1
+            runtime.peak = max(runtime.peak, runtime.in_flight)
+            await asyncio.sleep(delay)
+            runtime.in_flight -= 1
+            yield LLMResponse(type="text_delta", content=f"reply to {messages[-1].content}")
+            yield LLMResponse(type="done", content=None, finish_reason="stop")
+
+        runtime.provider.stream = fake_stream
+        return runtime
+
+    @pytest.mark.asyncio
+    async def test_same_session_turns_serialized(self, temp_workspace):
+        """Test that concurrent messages on one session do not interleave"""
+        import asyncio
+
+        from clawdbot.agents.queuing import QueueManager
+
+        runtime = self._runtime(QueueManager())
+        session = Session("chat", temp_workspace)
+
+        async def turn(text):
+            return [e async for e in runtime.run_turn(session, text)]
+
+        first, second = await asyncio.gather(turn("one"), turn("two"))
+
+        assert not [e for e in first if e.type == "queue"]
+        queued = [e.data for e in second if e.type == "queue"]
+        assert queued == [{"lane": "session", "position": 1, "active": 1}]
+        assert [(m.role, m.content) for m in session.messages] == [
+            ("user", "one"),
+            ("assistant", "reply to one"),
+            ("user", "two"),
+            ("assistant", "reply to two"),
+        ]
+        assert runtime.queue_manager.get_session_lane("chat").is_idle
+
+    @pytest.mark.asyncio
+    async def test_global_lane_caps_provider_calls(self, temp_workspace):
+        """Test the global lane bounds in-flight provider calls across sessions"""
+        import asyncio
+
+        from clawdbot.agents.queuing import QueueManager
+        from clawdbot.monitoring.metrics import get_metrics
+
+        runtime = self._runtime(QueueManager(max_concurrent_global=2))
+        waits = get_metrics().histogram("agent_queue_wait_seconds", labels={"lane": "global"})
+        before = waits.count
+
+        async def turn(i):
+            session = Session(f"s{i}", temp_workspace)
+            return [e async for e in runtime.run_turn(session, "hi")]
+
+        results = await asyncio.gather(*(turn(i) for i in range(5)))
+
+        assert runtime.peak == 2
+        queued = [e.data for events in results for e in events if e.type == "queue"]
+        assert queued and all(q["lane"] == "global" for q in queued)
+        assert waits.count - before == 5
+        assert runtime.queue_manager.get_global_lane().is_idle
+
+    @pytest.mark.asyncio
+    async def test_abandoned_queued_turn_releases_nothing(self, temp_workspace):
+        """Test that closing a turn while it waits leaves the lane consistent"""
+        import asyncio
+
+        from clawdbot.agents.queuing import QueueManager
+
+        runtime = self._runtime(QueueManager())
+        session = Session("chat", temp_workspace)
+
+        running = asyncio.create_task(
+            asyncio.wait_for(_collect(runtime.run_turn(session, "one")), 5)
+        )
+        await asyncio.sleep(0.01)
+
+        waiting = runtime.run_turn(session, "two")
+        event = await waiting.__anext__()
+        assert event.type == "queue"
+        await waiting.aclose()
+
+        await running
+        lane = runtime.queue_manager.get_session_lane("chat")
+        assert lane.is_idle and lane.active == 0
+        assert [m.content for m in session.messages if m.role == "user"] == ["one"]
+
+
+async def _collect(events):
+    return [e async for e in events]
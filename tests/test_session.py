@@ -3,6 +3,7 @@ Tests for Session Management
 """
 
 import json
+from datetime import datetime
 
 import pytest
 
@@ -169,3 +170,640 @@ class TestSessionManager:
         # Session should not exist
         sessions = manager.list_sessions()
         assert "test-session" not in sessions
+
+
+class TestSessionJournal:
+    """Test journaled session persistence"""
+
+    def test_append_does_not_rewrite_snapshot(self, temp_workspace):
+        """Test that adding a message appends to the journal only"""
+        session = Session("test-session", temp_workspace)
+        session.add_user_message("Message 1")
+
+        journal_file = temp_workspace / ".sessions" / "test-session.jsonl"
+        assert journal_file.exists()
+        assert not session._session_file.exists()
+
+        session.add_user_message("Message 2")
+        lines = journal_file.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1])["message"]["content"] == "Message 2"
+
+    def test_replay_journal_and_metadata(self, temp_workspace):
+        """Test loading replays messages and metadata from the journal"""
+        session = Session("test-session", temp_workspace)
+        session.add_user_message("Hello")
+        session.add_assistant_message("Hi")
+        session.set_metadata("channel", "telegram")
+
+        reloaded = Session("test-session", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["Hello", "Hi"]
+        assert reloaded.get_metadata("channel") == "telegram"
+
+    def test_snapshot_compacts_journal(self, temp_workspace, monkeypatch):
+        """Test that a snapshot is taken once the journal grows"""
+        monkeypatch.setattr(Session, "SNAPSHOT_MIN_RECORDS", 3)
+        session = Session("test-session", temp_workspace)
+        for i in range(5):
+            session.add_user_message(f"Message {i}")
+
+        assert session._session_file.exists()
+        reloaded = Session("test-session", temp_workspace)
+        assert [m.content for m in reloaded.messages] == [f"Message {i}" for i in range(5)]
+
+    def test_snapshot_then_stale_journal_not_replayed(self, temp_workspace):
+        """Test that records already folded into a snapshot are skipped"""
+        session = Session("test-session", temp_workspace)
+        session.add_user_message("Message 1")
+        journal_file = temp_workspace / ".sessions" / "test-session.jsonl"
+        stale = journal_file.read_text()
+
+        # Simulate a crash between snapshot and journal truncation
+        session._save()
+        journal_file.write_text(stale)
+
+        reloaded = Session("test-session", temp_workspace)
+        assert len(reloaded.messages) == 1
+
+    def test_torn_journal_line_is_ignored(self, temp_workspace):
+        """Test that a partially written final record does not break loading"""
+        session = Session("test-session", temp_workspace)
+        session.add_user_message("Complete")
+        journal_file = temp_workspace / ".sessions" / "test-session.jsonl"
+        with open(journal_file, "a") as f:
+            f.write('{"op": "message", "seq": 2, "mess')
+
+        reloaded = Session("test-session", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["Complete"]
+
+    def test_legacy_session_file_migrates(self, temp_workspace):
+        """Test that a legacy full-rewrite .json session is loaded as a snapshot"""
+        sessions_dir = temp_workspace / ".sessions"
+        sessions_dir.mkdir()
+        legacy = {
+            "session_id": "legacy",
+            "messages": [{"role": "user", "content": "Old message"}],
+            "metadata": {"k": "v"},
+            "created_at": "2025-01-01T00:00:00",
+            "updated_at": "2025-01-01T00:00:00",
+        }
+        (sessions_dir / "legacy.json").write_text(json.dumps(legacy, indent=2))
+
+        session = Session("legacy", temp_workspace)
+        session.add_user_message("New message")
+
+        reloaded = Session("legacy", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["Old message", "New message"]
+        assert reloaded.get_metadata("k") == "v"
+        assert reloaded.created_at == "2025-01-01T00:00:00"
+
+    def test_replace_messages_persists(self, temp_workspace):
+        """Test replacing history writes a snapshot"""
+        session = Session("test-session", temp_workspace)
+        session.add_user_message("A")
+        session.add_user_message("B")
+        session.replace_messages([Message(role="user", content="B")])
+
+        reloaded = Session("test-session", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["B"]
+
+    def test_manager_lists_and_deletes_journal_only_sessions(self, temp_workspace):
+        """Test sessions that only have a journal are listed and deleted"""
+        manager = SessionManager(temp_workspace)
+        manager.get_session("journal-only").add_user_message("Hi")
+
+        assert "journal-only" in manager.list_sessions()
+        assert manager.delete_session("journal-only")
+        assert "journal-only" not in manager.list_sessions()
+
+    @pytest.mark.slow
+    def test_benchmark_write_cost_flat(self, temp_workspace):
+        """Benchmark: per-message write cost stays flat up to 10k messages"""
+        import time
+
+        session = Session("bench", temp_workspace)
+        content = "x" * 200
+        window = 1000
+        timings = []
+
+        for _ in range(10):
+            start = time.perf_counter()
+            for _ in range(window):
+                session.add_user_message(content)
+            timings.append((time.perf_counter() - start) / window)
+
+        first, last = timings[0], timings[-1]
+        # Full rewrites would make the last window ~10x the first; journaling keeps it flat
+        assert last < first * 4
+
+        reloaded = Session("bench", temp_workspace)
+        assert len(reloaded.messages) == 10 * window
+
+
+class TestWriteBehind:
+    """Test write-behind session persistence"""
+
+    def test_mutations_are_deferred(self, temp_workspace):
+        """Test that mutations are queued instead of written inline"""
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        session = manager.get_session("wb")
+        session.add_user_message("Hello")
+        session.set_metadata("k", "v")
+
+        journal_file = temp_workspace / ".sessions" / "wb.jsonl"
+        assert not journal_file.exists()
+        assert len(session._pending) == 2
+
+        manager.close()
+        reloaded = Session("wb", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["Hello"]
+        assert reloaded.get_metadata("k") == "v"
+
+    @pytest.mark.asyncio
+    async def test_flush_coalesces_records(self, temp_workspace):
+        """Test that one flush writes all queued records"""
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        session = manager.get_session("wb")
+        for i in range(5):
+            session.add_user_message(f"Message {i}")
+
+        await session.flush()
+
+        journal_file = temp_workspace / ".sessions" / "wb.jsonl"
+        assert len(journal_file.read_text().splitlines()) == 5
+        assert session._pending == []
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_background_interval_flush(self, temp_workspace):
+        """Test that the timer thread flushes dirty sessions"""
+        import asyncio
+
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=0.05)
+        session = manager.get_session("wb")
+        session.add_user_message("Hello")
+
+        journal_file = temp_workspace / ".sessions" / "wb.jsonl"
+        for _ in range(40):
+            if journal_file.exists():
+                break
+            await asyncio.sleep(0.05)
+
+        assert journal_file.exists()
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_clear_and_replace_are_journaled(self, temp_workspace):
+        """Test that clear/replace survive a reload in write-behind mode"""
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        session = manager.get_session("wb")
+        session.add_user_message("A")
+        session.clear()
+        session.add_user_message("B")
+        session.add_user_message("C")
+        session.replace_messages([Message(role="user", content="C")])
+        await manager.flush()
+
+        reloaded = Session("wb", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["C"]
+        manager.close()
+
+    def test_delete_drops_pending(self, temp_workspace):
+        """Test that deleting a session discards unwritten records"""
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        manager.get_session("wb").add_user_message("Hello")
+        manager.delete_session("wb")
+        manager.close()
+
+        assert "wb" not in manager.list_sessions()
+
+    @pytest.mark.asyncio
+    async def test_metrics_exported(self, temp_workspace):
+        """Test queue depth and flush lag metrics"""
+        from clawdbot.monitoring.metrics import get_metrics
+
+        metrics = get_metrics()
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        session = manager.get_session("wb")
+        depth = metrics.gauge("session_write_queue_depth")
+        lag = metrics.histogram("session_flush_lag_seconds")
+        depth_before, lag_before = depth.value, lag.count
+
+        session.add_user_message("Hello")
+        assert depth.value == depth_before + 1
+
+        await session.flush()
+        assert depth.value == depth_before
+        assert lag.count == lag_before + 1
+        manager.close()
+
+    def test_snapshot_during_mutation_is_consistent(self, temp_workspace, monkeypatch):
+        """Test a flush racing a mutation never snapshots a message without its seq"""
+        import threading
+
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        session = manager.get_session("wb")
+        session.add_user_message("one")
+        # Snapshot on the racing flush only, so a later snapshot cannot mask it
+        snapshot_due = iter([True])
+        monkeypatch.setattr(
+            session._store, "needs_snapshot", lambda *args: next(snapshot_due, False)
+        )
+
+        original_record = Session._record
+        flushers = []
+
+        def record_with_concurrent_flush(self, record):
+            # Give a flush the chance to run between the append and seq assignment
+            if not flushers:
+                flusher = threading.Thread(target=self.write_pending)
+                flushers.append(flusher)
+                flusher.start()
+                flusher.join(timeout=0.2)
+            original_record(self, record)
+
+        monkeypatch.setattr(Session, "_record", record_with_concurrent_flush)
+        session.add_user_message("two")
+        flushers[0].join()
+        manager.close()
+
+        reloaded = Session("wb", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["one", "two"]
+
+    @pytest.mark.asyncio
+    async def test_failed_append_is_retried(self, temp_workspace, monkeypatch):
+        """Test records survive a failed store append and are written next flush"""
+        from clawdbot.monitoring.metrics import get_metrics
+
+        depth = get_metrics().gauge("session_write_queue_depth")
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60)
+        session = manager.get_session("wb")
+        depth_before = depth.value
+
+        original_append = session._store.append
+        calls = []
+
+        def append_fails_once(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OSError("No space left on device")
+            return original_append(*args, **kwargs)
+
+        monkeypatch.setattr(session._store, "append", append_fails_once)
+        session.add_user_message("one")
+        await session.flush()
+
+        assert len(session._pending) == 1
+        assert session._dirty_since is not None
+        assert manager._writer.pending_sessions == 1
+        assert depth.value == depth_before + 1
+
+        session.add_user_message("two")
+        await session.flush()
+        assert session._pending == []
+        assert depth.value == depth_before
+        manager.close()
+
+        reloaded = Session("wb", temp_workspace)
+        assert [m.content for m in reloaded.messages] == ["one", "two"]
+
+
+class TestSQLiteSessionStore:
+    """Test the SQLite session backend"""
+
+    @pytest.fixture
+    def store(self, temp_workspace):
+        from clawdbot.agents.persistence import SQLiteSessionStore
+
+        store = SQLiteSessionStore(temp_workspace / ".sessions" / "sessions.db")
+        yield store
+        store.close()
+
+    def test_round_trip(self, temp_workspace, store):
+        """Test messages, metadata and replace survive a reload"""
+        session = Session("s1", temp_workspace, store=store)
+        session.add_user_message("A")
+        session.add_assistant_message("B")
+        session.set_metadata("k", "v")
+        session.replace_messages([Message(role="user", content="C")])
+        session.add_user_message("D")
+
+        reloaded = Session("s1", temp_workspace, store=store)
+        assert [m.content for m in reloaded.messages] == ["C", "D"]
+        assert reloaded.get_metadata("k") == "v"
+        assert reloaded._seq == session._seq
+
+    @pytest.mark.asyncio
+    async def test_summaries_paginate_without_loading(self, temp_workspace, store):
+        """Test listing, counting and pagination"""
+        manager = SessionManager(temp_workspace, store=store)
+        for i in range(5):
+            session = manager.get_session(f"s{i}")
+            for _ in range(i + 1):
+                session.add_user_message("hi")
+        manager._sessions.clear()
+
+        assert await manager.count_sessions() == 5
+        page = await manager.list_session_summaries(limit=2, offset=1)
+        assert [s.session_id for s in page] == ["s3", "s2"]
+        assert [s.message_count for s in page] == [4, 3]
+        assert page[0].last_message_ts
+        # Listing must not pull sessions into memory
+        assert len(manager._sessions) == 0
+
+    @pytest.mark.asyncio
+    async def test_history_limit(self, temp_workspace, store):
+        """Test that history returns the last N messages in order"""
+        manager = SessionManager(temp_workspace, store=store)
+        session = manager.get_session("s1")
+        for i in range(10):
+            session.add_user_message(f"m{i}")
+        manager._sessions.clear()
+
+        history = await manager.get_history("s1", limit=3)
+        assert [m.content for m in history] == ["m7", "m8", "m9"]
+
+    def test_cleanup_old_sessions(self, temp_workspace, store):
+        """Test that age-based cleanup deletes only stale sessions"""
+        manager = SessionManager(temp_workspace, store=store)
+        manager.get_session("fresh").add_user_message("new")
+        stale = manager.get_session("stale")
+        stale.add_user_message("old")
+        store.write_snapshot(
+            "stale", {**stale._snapshot_state(), "updated_at": "2000-01-01T00:00:00+00:00"}
+        )
+
+        assert manager.cleanup_old_sessions(max_age_days=30) == 1
+        assert manager.list_sessions() == ["fresh"]
+        assert "stale" not in manager._sessions
+
+    def test_write_behind_flushes_to_sqlite(self, temp_workspace, store):
+        """Test the flusher works against the SQLite backend"""
+        manager = SessionManager(temp_workspace, write_behind=True, flush_interval=60, store=store)
+        session = manager.get_session("wb")
+        session.add_user_message("Hello")
+        assert not store.exists("wb")
+
+        manager._writer.close()
+        manager._writer = None
+        assert store.get_messages("wb") == [session.messages[0].model_dump()]
+
+    def test_file_sessions_imported_once(self, temp_workspace):
+        """Test existing file sessions are imported into an empty database"""
+        from clawdbot.agents.persistence import SQLiteSessionStore
+
+        file_manager = SessionManager(temp_workspace)
+        file_manager.get_session("old").add_user_message("kept")
+        file_manager.get_session("old").set_metadata("k", "v")
+        file_manager.close()
+
+        sessions_dir = temp_workspace / ".sessions"
+        db = sessions_dir / "sessions.db"
+        store = SQLiteSessionStore(db, legacy_dir=sessions_dir)
+        manager = SessionManager(temp_workspace, store=store)
+        assert manager.list_sessions() == ["old"]
+        session = manager.get_session("old")
+        assert [m.content for m in session.messages] == ["kept"]
+        assert session.get_metadata("k") == "v"
+        store.write_snapshot("new", {"messages": []})
+        store.delete("old")
+        store.close()
+
+        # A non-empty database is not re-imported
+        store = SQLiteSessionStore(db, legacy_dir=sessions_dir)
+        assert store.list_session_ids() == ["new"]
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_async_queries_share_one_connection(self, temp_workspace, store):
+        """Test async queries reuse a single aiosqlite connection"""
+        store.write_snapshot(
+            "s1",
+            {
+                "messages": [{"role": "user", "content": "hi"}],
+                "updated_at": "2030-01-01T00:00:00+00:00",
+            },
+        )
+
+        assert await store.acount() == 1
+        conn = store._adb
+        assert [s.session_id for s in await store.alist_summaries()] == ["s1"]
+        assert len(await store.aget_messages("s1")) == 1
+        assert await store.adelete_older_than(datetime(2000, 1, 1)) == []
+        assert store._adb is conn is not None
+
+
+class TestSessionCache:
+    """Test the bounded LRU of live sessions"""
+
+    def test_evicts_least_recently_used(self, temp_workspace):
+        """Test count-bounded LRU eviction and reload from disk"""
+        manager = SessionManager(temp_workspace, max_cached_sessions=2)
+        manager.get_session("a").add_user_message("from a")
+        manager.get_session("b")
+        manager.get_session("a")  # a is now most recently used
+        manager.get_session("c")
+
+        assert "a" in manager._sessions
+        assert "b" not in manager._sessions
+        assert len(manager._sessions) == 2
+
+        manager.get_session("b")
+        assert "a" not in manager._sessions
+        assert [m.content for m in manager.get_session("a").messages] == ["from a"]
+
+    def test_byte_bound(self, temp_workspace):
+        """Test that the byte bound evicts large idle sessions"""
+        manager = SessionManager(temp_workspace, max_cached_sessions=None, max_cached_bytes=20_000)
+        manager.get_session("big").add_user_message("x" * 15_000)
+        manager.get_session("small").add_user_message("y")
+        manager.get_session("big2").add_user_message("z" * 15_000)
+        # Growth is noticed on the next access
+        manager.get_session("small")
+
+        assert "big" not in manager._sessions
+        assert "small" in manager._sessions
+        assert manager._sessions.total_bytes <= 20_000
+
+    def test_byte_total_is_maintained(self, temp_workspace):
+        """Test the running byte total follows appends, replaces, clears and evictions"""
+        manager = SessionManager(temp_workspace, max_cached_sessions=2, max_cached_bytes=10**9)
+        cache = manager._sessions
+
+        def actual():
+            return sum(s.approx_bytes for s in cache.values())
+
+        a = manager.get_session("a")
+        a.add_user_message("x" * 100)
+        b = manager.get_session("b")
+        b.add_user_message("y" * 50)
+        assert cache.total_bytes == actual() > 0
+
+        a.replace_messages([Message(role="user", content="short")])
+        b.clear()
+        assert cache.total_bytes == actual()
+
+        manager.get_session("c").add_user_message("z" * 10)
+        assert "a" not in cache
+        a.add_user_message("evicted sessions no longer count")
+        assert cache.total_bytes == actual()
+
+        manager.delete_session("b")
+        assert cache.total_bytes == actual()
+
+    def test_eviction_releases_store_journal(self, temp_workspace):
+        """Test the file store forgets journals of evicted sessions"""
+        manager = SessionManager(temp_workspace, max_cached_sessions=1)
+        for i in range(5):
+            manager.get_session(f"s{i}").add_user_message("hi")
+
+        assert set(manager.store._journals) == {"s4"}
+        assert [m.content for m in manager.get_session("s0").messages] == ["hi"]
+
+    @pytest.mark.asyncio
+    async def test_write_behind_eviction_releases_after_flush(self, temp_workspace):
+        """Test the journal is released only once the eviction flush is done"""
+        manager = SessionManager(
+            temp_workspace, write_behind=True, flush_interval=60, max_cached_sessions=1
+        )
+        import asyncio
+
+        manager.get_session("first").add_user_message("keep me")
+        manager.get_session("second")
+        # Released from the flush's done callback, on a flusher thread
+        for _ in range(100):
+            if "first" not in manager.store._journals:
+                break
+            await asyncio.sleep(0.01)
+
+        assert "first" not in manager.store._journals
+        manager.close()
+        assert [m.content for m in Session("first", temp_workspace).messages] == ["keep me"]
+
+    def test_pinned_sessions_are_not_evicted(self, temp_workspace):
+        """Test that sessions with an active turn stay in memory"""
+        manager = SessionManager(temp_workspace, max_cached_sessions=1)
+        active = manager.get_session("active")
+        active.pin()
+        manager.get_session("other")
+
+        assert "active" in manager._sessions
+        assert "other" in manager._sessions
+
+        active.unpin()
+        manager.get_session("third")
+        assert "active" not in manager._sessions
+
+    @pytest.mark.asyncio
+    async def test_write_behind_eviction_flushes(self, temp_workspace):
+        """Test that evicted write-behind sessions are persisted, not lost"""
+        manager = SessionManager(
+            temp_workspace, write_behind=True, flush_interval=60, max_cached_sessions=1
+        )
+        first = manager.get_session("first")
+        first.add_user_message("keep me")
+        manager.get_session("second")
+
+        # Either still flushing (same object) or reloaded from disk
+        assert [m.content for m in manager.get_session("first").messages] == ["keep me"]
+        await manager.flush()
+        manager.close()
+        assert [m.content for m in Session("first", temp_workspace).messages] == ["keep me"]
+
+    def test_metrics_exported(self, temp_workspace):
+        """Test hit/miss/eviction counters"""
+        from clawdbot.monitoring.metrics import get_metrics
+
+        metrics = get_metrics()
+        hits = metrics.counter("session_cache_hits_total")
+        misses = metrics.counter("session_cache_misses_total")
+        evictions = metrics.counter("session_cache_evictions_total")
+        before = (hits.value, misses.value, evictions.value)
+
+        manager = SessionManager(temp_workspace, max_cached_sessions=1)
+        manager.get_session("a")
+        manager.get_session("a")
+        manager.get_session("b")
+
+        assert hits.value == before[0] + 1
+        assert misses.value == before[1] + 2
+        assert evictions.value == before[2] + 1
+
+
+class TestLLMMessageCache:
+    """Test the incremental provider-format history"""
+
+    def test_extends_incrementally(self, temp_workspace):
+        session = Session("llm", temp_workspace)
+        session.add_user_message("A")
+        first = session.get_llm_messages()
+        head = first[0]
+
+        session.add_assistant_message("B", tool_calls=[{"id": "1", "type": "function"}])
+        session.add_tool_message("1", "result", name="bash")
+        second = session.get_llm_messages()
+
+        assert second[0] is head
+        assert [m.role for m in second] == ["user", "assistant", "tool"]
+        assert second[2].to_api_format() == {
+            "role": "tool",
+            "content": "result",
+            "tool_call_id": "1",
+            "name": "bash",
+        }
+
+    def test_invalidated_on_replace_and_clear(self, temp_workspace):
+        session = Session("llm", temp_workspace)
+        session.add_user_message("A")
+        session.add_user_message("B")
+        session.get_llm_messages()
+
+        session.replace_messages([Message(role="user", content="summary")])
+        assert [m.content for m in session.get_llm_messages()] == ["summary"]
+
+        session.clear()
+        assert session.get_llm_messages() == []
+        session.add_user_message("C")
+        assert [m.content for m in session.get_llm_messages()] == ["C"]
+
+    @pytest.mark.slow
+    def test_benchmark_per_iteration_flat(self, temp_workspace):
+        """Benchmark: per-loop conversion cost does not grow with history length"""
+        import time
+
+        from clawdbot.agents.providers import LLMMessage
+
+        def legacy(session):
+            return [
+                LLMMessage(
+                    role=m.role,
+                    content=m.content,
+                    tool_calls=m.tool_calls,
+                    tool_call_id=m.tool_call_id,
+                    name=m.name,
+                )
+                for m in session.get_messages()
+            ]
+
+        timings = {}
+        for size in (1_000, 20_000):
+            session = Session(f"bench-{size}", temp_workspace)
+            session.messages = [Message(role="user", content="x" * 100) for _ in range(size)]
+            session.get_llm_messages()
+
+            rounds = 50
+            start = time.perf_counter()
+            for _ in range(rounds):
+                session.messages.append(Message(role="tool", content="r", tool_call_id="1"))
+                session.get_llm_messages()
+            cached = (time.perf_counter() - start) / rounds
+
+            start = time.perf_counter()
+            for _ in range(5):
+                legacy(session)
+            rebuild = (time.perf_counter() - start) / 5
+            timings[size] = (cached, rebuild)
+
+        small, large = timings[1_000][0], timings[20_000][0]
+        assert large < small * 5 + 20e-6
+        assert large < timings[20_000][1] / 50
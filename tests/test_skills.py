@@ -54,3 +54,70 @@ def test_skill_eligibility():
     is_eligible, reason = loader.check_eligibility(skill)
     assert not is_eligible
     assert "nonexistent-binary-12345" in reason
+
+
+def _write_skill(root: Path, name: str, description: str, tags: list[str]) -> None:
+    skill_dir = root / name
+    skill_dir.mkdir()
+    (skill_dir / "SKILL.md").write_text(
+        f"---\nname: {name}\ndescription: {description}\ntags: [{', '.join(tags)}]\n---\n\n"
+        f"Instructions for {name}.\n"
+    )
+
+
+def test_skill_provider_index_matching(tmp_path):
+    """Test indexed skill matching keeps substring semantics and skill order"""
+    from clawdbot.agents.tools.skill_loader import SkillProvider
+
+    _write_skill(tmp_path, "github", "Use the gh CLI", ["pull request", "PR"])
+    _write_skill(tmp_path, "weather", "Get the forecast", ["Rain"])
+    _write_skill(tmp_path, "notes", "Take notes", [])
+    provider = SkillProvider(tmp_path)
+
+    def names(query):
+        return sorted(s["name"] for s in provider.find_skills(query))
+
+    assert names("Open a Pull Request on GitHub") == ["github"]
+    assert names("will it rain tomorrow? also take notes") == ["notes", "weather"]
+    assert names("nothing relevant") == []
+    # Substring semantics, as before: "pr" occurs inside "print"
+    assert names("print this") == ["github"]
+
+    order = list(provider.skills)
+    matched = [s["name"] for s in provider.find_skills("github weather notes")]
+    assert matched == [n for n in order if n in matched]
+
+
+def test_term_index_overlapping_terms():
+    """Test Aho-Corasick matching with overlapping and nested terms"""
+    from clawdbot.agents.tools.skill_index import TermIndex
+
+    index = TermIndex()
+    index.add("he", "a")
+    index.add("she", "b")
+    index.add("hers", "c")
+    index.add("his", "d")
+    assert index.search("ushers") == {"a", "b", "c"}
+    assert index.search("this") == {"d"}
+    assert index.search("xyz") == set()
+
+
+def test_prompt_manager_caching(tmp_path):
+    """Test prompt file mtime invalidation and memoized assembly"""
+    import os
+
+    from clawdbot.agents.tools.prompt_manager import PromptManager
+
+    (tmp_path / "base.md").write_text("Base {{SKILLS_SUMMARY}}")
+    (tmp_path / "soul.md").write_text("Soul v1")
+    manager = PromptManager(tmp_path)
+
+    first = manager.get_full_system_prompt("hello")
+    assert "Soul v1" in first
+    assert manager.get_full_system_prompt("hello") is first
+
+    soul = tmp_path / "soul.md"
+    soul.write_text("Soul v2 changed")
+    stat = soul.stat()
+    os.utime(soul, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert "Soul v2 changed" in manager.get_full_system_prompt("hello")
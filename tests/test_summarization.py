@@ -2,9 +2,25 @@
 Tests for message summarization
 """
 
+import asyncio
+
 import pytest
 
-from clawdbot.agents.summarization import MessageSummarizer, SummarizationStrategy
+from clawdbot.agents.compaction import (
+    CompactionManager,
+    CompactionStrategy,
+    TokenAnalyzer,
+    validate_tool_sequence,
+)
+from clawdbot.agents.providers.base import LLMProvider, LLMResponse
+from clawdbot.agents.session import Session
+from clawdbot.agents.summarization import (
+    SUMMARY_HEADER,
+    SUMMARY_KEY,
+    BackgroundSummarizer,
+    MessageSummarizer,
+    SummarizationStrategy,
+)
 
 
 class TestSummarizationStrategy:
@@ -201,3 +217,241 @@ class TestSummarizationIntegration:
 
         # Should preserve order (with fallback)
         assert len(summary) > 0
+
+
+class FakeProvider(LLMProvider):
+    """Provider answering every request with a short summary, after a simulated latency"""
+
+    def __init__(self, latency=0.0, reply=None):
+        super().__init__("fake")
+        self.latency = latency
+        self.reply = reply
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def stream(self, messages, tools=None, max_tokens=4096, **kwargs):
+        self.requests.append(messages)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.release.wait()
+            await asyncio.sleep(self.latency)
+            text = self.reply(messages) if self.reply else f"summary {len(self.requests)}"
+        finally:
+            self.active -= 1
+        yield LLMResponse(type="text_delta", content=text)
+        yield LLMResponse(type="done", content=None)
+
+    def get_client(self):
+        return None
+
+    @property
+    def provider_name(self):
+        return "fake"
+
+
+def echo_first_line(messages):
+    """Reply with the first line of the text to summarize"""
+    return f"<{messages[-1].content.splitlines()[0]}>"
+
+
+class TestConcurrentSummarization:
+    """Test bounded parallel batch and hierarchical summarization"""
+
+    @pytest.mark.asyncio
+    async def test_batches_run_concurrently_in_order(self):
+        provider = FakeProvider(latency=0.05, reply=echo_first_line)
+        summarizer = MessageSummarizer(provider)
+        batches = [[{"role": "user", "content": f"Batch {i}"}] for i in range(20)]
+
+        summaries = await summarizer.summarize_batch(batches, max_concurrency=5)
+
+        assert summaries == [f"[SUMMARY]\n<User: Batch {i}>" for i in range(20)]
+        assert provider.max_active == 5
+
+    @pytest.mark.asyncio
+    async def test_timeout_falls_back_to_truncation(self):
+        provider = FakeProvider(reply=echo_first_line)
+        slow = provider.stream
+
+        async def stream(messages, **kwargs):
+            if "Slow" in messages[-1].content:
+                await asyncio.sleep(10)
+            async for response in slow(messages, **kwargs):
+                yield response
+
+        provider.stream = stream
+        summarizer = MessageSummarizer(provider)
+        batches = [
+            [{"role": "user", "content": "Fast"}],
+            [{"role": "user", "content": "Slow"}],
+        ]
+
+        summaries = await summarizer.summarize_batch(batches, timeout=0.05)
+
+        assert summaries == ["[SUMMARY]\n<User: Fast>", "User: Slow"]
+
+    @pytest.mark.asyncio
+    async def test_hierarchical_map_reduce(self):
+        provider = FakeProvider(latency=0.01, reply=echo_first_line)
+        summarizer = MessageSummarizer(provider)
+        messages = [{"role": "system", "content": "You are helpful"}] + [
+            {"role": "user", "content": f"message {i} " + "word " * 50} for i in range(40)
+        ]
+
+        summary = await summarizer.summarize_hierarchical(
+            messages, chunk_tokens=120, fan_in=4, max_concurrency=8
+        )
+
+        merges = [
+            request[-1].content
+            for request in provider.requests
+            if request[0].content == summarizer.REDUCE_PROMPT
+        ]
+        # 20 chunks of 2 messages, merged 20 -> 5 -> 2 -> 1
+        assert len(provider.requests) - len(merges) == 20
+        assert len(merges) == 5 + 2 + 1
+        assert all(text.startswith("Part 1:\n<") for text in merges)
+        assert provider.max_active == 8
+        assert summary == "System: You are helpful\n\n[SUMMARY OF CONVERSATION]\n<Part 1:>"
+
+    @pytest.mark.asyncio
+    async def test_hierarchical_short_history(self):
+        provider = FakeProvider(reply=echo_first_line)
+        summarizer = MessageSummarizer(provider)
+
+        summary = await summarizer.summarize_hierarchical([{"role": "user", "content": "Hi"}])
+
+        assert summary == "[SUMMARY]\n<User: Hi>"
+        assert len(provider.requests) == 1
+
+
+class TestBackgroundSummarizer:
+    """Test rolling summaries prepared between turns"""
+
+    TARGET = 600
+
+    @pytest.fixture
+    def provider(self):
+        return FakeProvider()
+
+    @pytest.fixture
+    def background(self, provider):
+        manager = CompactionManager(TokenAnalyzer(), CompactionStrategy.SUMMARIZE)
+        return BackgroundSummarizer(
+            MessageSummarizer(provider), manager, max_summary_tokens=100, min_batch_tokens=200
+        )
+
+    @pytest.fixture
+    def session(self, tmp_path):
+        session = Session("s1", tmp_path)
+        session.add_system_message("You are helpful")
+        return session
+
+    @staticmethod
+    def add_turns(session, start, count):
+        for i in range(start, start + count):
+            session.add_user_message(f"question {i} " * 10)
+            session.add_assistant_message("", [{"id": f"call_{i}"}])
+            session.add_tool_message(f"call_{i}", f"result {i} " * 10)
+            session.add_assistant_message(f"answer {i} " * 10)
+
+    @pytest.mark.asyncio
+    async def test_incremental_updates(self, background, provider, session):
+        self.add_turns(session, 0, 3)
+        assert not await background.update(session, self.TARGET)
+        assert provider.requests == []
+
+        self.add_turns(session, 3, 10)
+        assert await background.update(session, self.TARGET)
+        first = background.get_summary(session)
+        assert first.text.endswith("summary 1")
+        assert first.version == 1
+        # Tool results stay with their calls
+        assert session.messages[1 + first.covered].role != "tool"
+
+        # Nothing new has aged out
+        assert not await background.update(session, self.TARGET)
+
+        self.add_turns(session, 13, 5)
+        assert await background.update(session, self.TARGET)
+        second = background.get_summary(session)
+        assert second.version == 2
+        assert second.covered > first.covered
+        # Only the newly aged-out messages are sent, with the previous summary
+        prompt = provider.requests[-1][-1].content
+        assert "summary 1" in prompt
+        assert "question 0 " not in prompt
+
+    @pytest.mark.asyncio
+    async def test_compact_swaps_in_summary(self, background, provider, session):
+        assert not background.compact(session, self.TARGET)
+
+        self.add_turns(session, 0, 20)
+        await background.update(session, self.TARGET)
+        calls = len(provider.requests)
+
+        assert background.compact(session, self.TARGET)
+
+        assert len(provider.requests) == calls  # No LLM call on the critical path
+        assert session.messages[0].content == "You are helpful"
+        assert session.messages[1].content.startswith(SUMMARY_HEADER)
+        assert session.messages[1].content.endswith(f"summary {calls}")
+        assert session.messages[-1].content.startswith("answer 19")
+        assert session.count_tokens() <= self.TARGET
+        assert validate_tool_sequence(session.messages) == []
+
+        summary = background.get_summary(session)
+        assert summary.covered == 0
+        assert summary.text.endswith(f"summary {calls}")
+
+        # The next compaction replaces the summary message instead of adding one
+        self.add_turns(session, 20, 10)
+        await background.update(session, self.TARGET)
+        assert background.compact(session, self.TARGET)
+        summaries = [m for m in session.messages if (m.content or "").startswith(SUMMARY_HEADER)]
+        assert len(summaries) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_update_discarded(self, background, provider, session):
+        self.add_turns(session, 0, 20)
+        provider.release.clear()
+
+        task = background.schedule(session, self.TARGET)
+        assert background.schedule(session, self.TARGET) is None  # Already running
+        await asyncio.sleep(0)
+        session.clear()
+        provider.release.set()
+        await background.wait()
+
+        assert task.result() is False
+        assert session.get_metadata(SUMMARY_KEY) is None
+
+    @pytest.mark.asyncio
+    async def test_session_pinned_while_updating(self, background, provider, session):
+        self.add_turns(session, 0, 20)
+        provider.release.clear()
+
+        background.schedule(session, self.TARGET)
+        await asyncio.sleep(0)
+        # The session cache cannot evict the session while its summary is pending
+        assert session.is_pinned
+
+        provider.release.set()
+        await background.wait()
+        assert not session.is_pinned
+        assert background.get_summary(session) is not None
+
+    @pytest.mark.asyncio
+    async def test_summary_dropped_with_history(self, background, session):
+        self.add_turns(session, 0, 20)
+        await background.update(session, self.TARGET)
+        background.compact(session, self.TARGET)
+
+        session.clear()
+
+        assert background.get_summary(session) is None
+        assert not background.compact(session, self.TARGET)
@@ -0,0 +1,216 @@
+"""
+Tests for token counting
+"""
+
+import base64
+
+import pytest
+
+from clawdbot.agents.compaction import TokenAnalyzer
+from clawdbot.agents.session import Message, Session
+from clawdbot.agents.tokenizers import (
+    MESSAGE_OVERHEAD,
+    ApproximateTokenizer,
+    BPETokenizer,
+    Tokenizer,
+    configure_tokenizer,
+    encoding_for_model,
+    get_tokenizer,
+)
+
+
+class CountingTokenizer(Tokenizer):
+    """One token per character, recording every call"""
+
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return len(text or "")
+
+
+@pytest.fixture
+def ranks():
+    """Byte ranks plus merges building 'hello'"""
+    table = {bytes([b]): b for b in range(256)}
+    for token in (b"he", b"ll", b"hell", b"hello", b" w", b" wo"):
+        table[token] = len(table)
+    return table
+
+
+class TestApproximateTokenizer:
+    """Test the dependency-free estimate"""
+
+    def test_empty(self):
+        tokenizer = ApproximateTokenizer()
+        assert tokenizer.count("") == 0
+        assert tokenizer.count(None) == 0
+
+    def test_prose(self):
+        tokenizer = ApproximateTokenizer()
+        # cl100k: Hello| world|!| This| is| a| test| message|.
+        assert tokenizer.count("Hello world! This is a test message.") == 9
+
+    def test_code_and_cjk_not_undercounted(self):
+        tokenizer = ApproximateTokenizer()
+        code = "for (i = 0; i < n; i++) { x[i] = y[i] * 2; }"
+        cjk = "这是一个测试句子用于计算令牌"
+
+        assert tokenizer.count(code) > len(code) // 4
+        assert tokenizer.count(cjk) >= len(cjk)
+
+
+class TestBPETokenizer:
+    """Test the pure-Python BPE tokenizer"""
+
+    def test_merges(self, ranks):
+        tokenizer = BPETokenizer(ranks)
+
+        assert tokenizer.encode("hello") == [ranks[b"hello"]]
+        assert tokenizer.encode("hello world") == [
+            ranks[b"hello"],
+            ranks[b" wo"],
+            ord("r"),
+            ord("l"),
+            ord("d"),
+        ]
+        assert tokenizer.count("hello world") == 5
+
+    def test_from_file(self, ranks, tmp_path):
+        path = tmp_path / "tiny.tiktoken"
+        path.write_bytes(
+            b"\n".join(base64.b64encode(token) + b" %d" % rank for token, rank in ranks.items())
+        )
+
+        tokenizer = BPETokenizer.from_file(path)
+
+        assert tokenizer.name == "bpe:tiny"
+        assert tokenizer.encode("hello") == [ranks[b"hello"]]
+
+
+class TestRegistry:
+    """Test tokenizer selection"""
+
+    def teardown_method(self):
+        configure_tokenizer()
+
+    def test_encoding_for_model(self):
+        assert encoding_for_model("openai/gpt-4o-mini") == "o200k_base"
+        assert encoding_for_model("gpt-4") == "cl100k_base"
+        assert encoding_for_model("anthropic/claude-opus") == "cl100k_base"
+        assert encoding_for_model(None) == "cl100k_base"
+
+    def test_shared_per_encoding(self):
+        assert get_tokenizer("gpt-4") is get_tokenizer("claude-opus")
+
+    def test_local_bpe_file(self, ranks, tmp_path):
+        path = tmp_path / "tiny.tiktoken"
+        path.write_bytes(
+            b"\n".join(base64.b64encode(token) + b" %d" % rank for token, rank in ranks.items())
+        )
+        configure_tokenizer(bpe_file=path)
+
+        assert isinstance(get_tokenizer("gpt-4"), BPETokenizer)
+
+    def test_lazy_load_never_downloads(self, tmp_path, monkeypatch):
+        """Test that an uncached tiktoken encoding falls back instead of downloading"""
+        from clawdbot.agents.tokenizers import TiktokenTokenizer
+
+        loads = []
+        monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(TiktokenTokenizer, "__init__", lambda self, name: loads.append(name))
+        configure_tokenizer()
+
+        assert isinstance(get_tokenizer("gpt-4"), ApproximateTokenizer)
+        assert loads == []
+
+    @pytest.mark.asyncio
+    async def test_warm_tokenizer(self, monkeypatch):
+        """Test warm-up installs the loaded tokenizer and gives up after the timeout"""
+        import time
+
+        from clawdbot.agents.tokenizers import registry, warm_tokenizer
+
+        tokenizer = CountingTokenizer()
+        monkeypatch.setattr(registry, "_load", lambda encoding, allow_download=False: tokenizer)
+        assert await warm_tokenizer("gpt-4") is tokenizer
+        assert get_tokenizer("gpt-4") is tokenizer
+
+        fallback = ApproximateTokenizer()
+
+        def stalled_download(encoding, allow_download=False):
+            if allow_download:
+                time.sleep(0.5)
+                return CountingTokenizer()
+            return fallback
+
+        monkeypatch.setattr(registry, "_load", stalled_download)
+        assert await warm_tokenizer("gpt-4o", timeout=0.05) is fallback
+
+    def test_override(self):
+        tokenizer = CountingTokenizer()
+        configure_tokenizer(tokenizer)
+
+        assert get_tokenizer("gpt-4o") is tokenizer
+        assert TokenAnalyzer("claude").tokenizer is tokenizer
+
+    def test_count_message(self):
+        tokenizer = CountingTokenizer()
+        message = {
+            "role": "assistant",
+            "content": "hi",
+            "tool_calls": [{"id": "1"}],
+            "name": "bot",
+        }
+
+        assert tokenizer.count_message(message) == MESSAGE_OVERHEAD + 2 + len('[{"id": "1"}]') + 3
+
+
+class TestCachedCounts:
+    """Test per-message caching and the session running total"""
+
+    def test_message_counted_once(self):
+        tokenizer = CountingTokenizer()
+        msg = Message(role="user", content="hello")
+
+        assert msg.count_tokens(tokenizer) == MESSAGE_OVERHEAD + 5
+        assert msg.count_tokens(tokenizer) == MESSAGE_OVERHEAD + 5
+        assert tokenizer.calls == 1
+
+        analyzer = TokenAnalyzer(tokenizer=tokenizer)
+        assert analyzer.estimate_messages_tokens([msg, msg]) == 2 * (MESSAGE_OVERHEAD + 5)
+        assert tokenizer.calls == 1
+
+    def test_session_running_total(self, tmp_path):
+        tokenizer = CountingTokenizer()
+        session = Session("s1", tmp_path)
+        assert session.count_tokens(tokenizer) == 0
+
+        for i in range(50):
+            session.add_user_message("x" * i)
+        # Counted at append time
+        assert tokenizer.calls == 50
+
+        expected = sum(MESSAGE_OVERHEAD + i for i in range(50))
+        assert session.count_tokens(tokenizer) == expected
+        assert session.count_tokens() == expected
+        assert tokenizer.calls == 50
+
+    def test_session_total_after_replace_and_tokenizer_switch(self, tmp_path):
+        tokenizer = CountingTokenizer()
+        session = Session("s1", tmp_path)
+        session.add_user_message("hello")
+        session.add_assistant_message("world!")
+        assert session.count_tokens(tokenizer) == 2 * MESSAGE_OVERHEAD + 11
+
+        session.replace_messages(session.messages[1:])
+        assert session.count_tokens(tokenizer) == MESSAGE_OVERHEAD + 6
+
+        approx = ApproximateTokenizer()
+        assert session.count_tokens(approx) == MESSAGE_OVERHEAD + approx.count("world!")
+
+        session.clear()
+        assert session.count_tokens(approx) == 0
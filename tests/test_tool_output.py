@@ -0,0 +1,172 @@
+"""
+Tests for large tool output offloading
+"""
+
+import pytest
+
+from clawdbot.agents.persistence import BlobStore
+from clawdbot.agents.runtime import AgentRuntime
+from clawdbot.agents.session import Session
+from clawdbot.agents.tools.base import ToolResult
+from clawdbot.agents.tools.tool_output import ReadToolOutputTool, offload_output
+
+
+class PageTool:
+    """Minimal tool returning a fixed output"""
+
+    def __init__(self, name: str, content: str):
+        self.name = name
+        self.description = name
+        self.content = content
+        self.serial = False
+
+    def get_schema(self):
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, params):
+        return ToolResult(success=True, content=self.content)
+
+
+def html_page(size: int) -> str:
+    """Deterministic HTML-ish text of the given length"""
+    row = "<tr><td>row</td><td>value</td></tr>\n"
+    return ("<html><body><table>\n" + row * (size // len(row) + 1))[:size]
+
+
+class TestBlobStore:
+    """Test the content-addressed blob store"""
+
+    def test_put_get_dedup(self, temp_workspace):
+        store = BlobStore.for_workspace(temp_workspace)
+
+        handle = store.put("hello world")
+
+        assert store.is_handle(handle)
+        assert store.put("hello world") == handle
+        assert store.get(handle) == "hello world"
+        assert store.read(handle, offset=6, limit=3) == "wor"
+        assert store.read(handle, offset=6) == "world"
+        assert len(list((temp_workspace / ".blobs").rglob("*"))) == 2  # One dir, one blob
+
+    def test_unknown_and_malformed_handles(self, temp_workspace):
+        store = BlobStore.for_workspace(temp_workspace)
+
+        assert store.get("0" * 64) is None
+        assert store.get("../../etc/passwd") is None
+        assert not store.exists("abc")
+
+
+class TestReadToolOutputTool:
+    """Test paging through stored outputs"""
+
+    @pytest.mark.asyncio
+    async def test_paging(self, temp_workspace):
+        store = BlobStore.for_workspace(temp_workspace)
+        content = html_page(25000)
+        handle = store.put(content)
+        tool = ReadToolOutputTool(store)
+
+        first = await tool.execute({"handle": handle})
+        assert first.success
+        assert first.content.startswith(content[:8000])
+        assert "Next offset: 8000" in first.content
+
+        last = await tool.execute({"handle": handle, "offset": 20000, "limit": 100000})
+        assert last.metadata == {"handle": handle, "offset": 20000, "end": 25000, "total": 25000}
+        assert "End of output" in last.content
+
+    @pytest.mark.asyncio
+    async def test_errors(self, temp_workspace):
+        tool = ReadToolOutputTool(BlobStore.for_workspace(temp_workspace))
+
+        assert not (await tool.execute({})).success
+        assert not (await tool.execute({"handle": "f" * 64})).success
+        assert not (await tool.execute({"handle": "f" * 64, "offset": "x"})).success
+
+
+class TestOffloading:
+    """Test that the session keeps previews of large outputs"""
+
+    def test_preview(self, temp_workspace):
+        store = BlobStore.for_workspace(temp_workspace)
+        content = "A" * 3000 + "B" * 5000 + "C" * 2000
+
+        reference = offload_output(store, content, preview_chars=1000)
+
+        assert reference.startswith("A" * 750 + "\n[... 9000 characters omitted ...]\n")
+        assert "C" * 250 + "\n\n[Full output: 10000 characters" in reference
+        assert store.put(content) in reference
+
+    def _runtime(self, tool_name, **kwargs):
+        from clawdbot.agents.providers import LLMResponse
+
+        runtime = AgentRuntime(enable_context_management=False, **kwargs)
+        calls = {"n": 0}
+
+        async def fake_stream(messages, tools=None, max_tokens=4096, **kw):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                yield LLMResponse(
+                    type="tool_call",
+                    content=None,
+                    tool_calls=[{"id": "call_0", "name": tool_name, "arguments": {}}],
+                )
+                yield LLMResponse(type="done", content=None, finish_reason="tool_calls")
+            else:
+                yield LLMResponse(type="text_delta", content="ok")
+                yield LLMResponse(type="done", content=None, finish_reason="stop")
+
+        runtime.provider.stream = fake_stream
+        return runtime
+
+    @pytest.mark.asyncio
+    async def test_large_output_offloaded(self, temp_workspace):
+        content = html_page(100_000)
+        runtime = self._runtime("web_fetch")
+        session = Session("offload", temp_workspace)
+        tools = [
+            PageTool("web_fetch", content),
+            ReadToolOutputTool(BlobStore.for_workspace(temp_workspace)),
+        ]
+
+        events = [e async for e in runtime.run_turn(session, "go", tools=tools)]
+
+        # Clients still see the full result
+        assert [e.data["result"] for e in events if e.type == "tool_result"] == [content]
+
+        tool_message = next(m for m in session.messages if m.role == "tool")
+        assert len(tool_message.content) < 2500
+        handle = BlobStore.for_workspace(temp_workspace).put(content)
+        assert handle in tool_message.content
+
+        page = await ReadToolOutputTool(BlobStore.for_workspace(temp_workspace)).execute(
+            {"handle": handle, "offset": 50_000, "limit": 100}
+        )
+        assert page.content.startswith(content[50_000:50_100])
+
+    @pytest.mark.asyncio
+    async def test_small_output_and_disabled(self, temp_workspace):
+        content = html_page(20_000)
+
+        runtime = self._runtime("small")
+        session = Session("small", temp_workspace)
+        [e async for e in runtime.run_turn(session, "go", tools=[PageTool("small", "tiny")])]
+        assert next(m for m in session.messages if m.role == "tool").content == "tiny"
+
+        runtime = self._runtime("big", tool_offload_threshold=0)
+        session = Session("disabled", temp_workspace)
+        [e async for e in runtime.run_turn(session, "go", tools=[PageTool("big", content)])]
+        assert next(m for m in session.messages if m.role == "tool").content == content
+        assert not (temp_workspace / ".blobs").exists()
+
+    @pytest.mark.asyncio
+    async def test_kept_inline_without_read_tool(self, temp_workspace):
+        """Test outputs are not offloaded when the model cannot read them back"""
+        content = html_page(100_000)
+        runtime = self._runtime("web_fetch")
+        session = Session("no-reader", temp_workspace)
+
+        [e async for e in runtime.run_turn(session, "go", tools=[PageTool("web_fetch", content)])]
+
+        assert next(m for m in session.messages if m.role == "tool").content == content
+        assert not (temp_workspace / ".blobs").exists()
@@ -63,3 +63,48 @@ async def test_tool_profile_filtering():
     full_tools = registry.get_tools_by_profile("full")
 
     assert len(minimal_tools) < len(full_tools)
+
+
+def test_tool_schema_cache():
+    """Test schema cache reuse and invalidation on register/unregister"""
+    import json
+
+    from clawdbot.agents.tools.registry import ToolRegistry
+
+    registry = ToolRegistry()
+    first = registry.get_tool_schemas()
+    assert registry.get_tool_schemas() is first
+    assert json.loads(first.json_bytes) == first.schemas
+    assert [s["function"]["name"] for s in first.schemas] == [t.name for t in registry.list_tools()]
+
+    subset = registry.get_tools_by_profile("coding")
+    coding = registry.get_tool_schemas(subset)
+    assert len(coding.schemas) == len(subset)
+    assert registry.get_tool_schemas(subset) is coding
+
+    version = registry.version
+    assert registry.unregister("bash")
+    assert registry.version == version + 1
+    second = registry.get_tool_schemas()
+    assert second is not first
+    assert "bash" not in {s["function"]["name"] for s in second.schemas}
+    assert not registry.unregister("bash")
+
+    registry.register(ReadFileTool())
+    assert registry.get_tool_schemas() is not second
+
+
+def test_runtime_uses_registry_schemas():
+    """Test that the runtime reuses cached schemas for registry tools"""
+    from clawdbot.agents.runtime import AgentRuntime
+    from clawdbot.agents.tools.registry import ToolRegistry
+
+    registry = ToolRegistry()
+    runtime = AgentRuntime(tool_registry=registry)
+    tools = registry.list_tools()
+
+    assert runtime._format_tools(tools) is registry.get_tool_schemas(tools).schemas
+    # Tools not owned by the registry are formatted directly
+    foreign = [ReadFileTool()]
+    assert runtime._format_tools(foreign)[0]["function"]["name"] == "read_file"
+    assert runtime._format_tools([]) is None